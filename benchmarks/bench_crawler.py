@@ -0,0 +1,52 @@
+"""Benchmark crawler: pages/s et octets économisés par le cache HTTP conditionnel
+
+Usage: python benchmarks/bench_crawler.py [--listings 4000] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import FixtureSite
+from modules.crawler import AsyncCrawler, ResponseCache
+from modules.scraper import NinjaScraperLVI
+
+
+async def run(args, tmp):
+    site = FixtureSite(listings=args.listings).start()
+    crawler = AsyncCrawler(concurrency=args.concurrency, per_host_delay=0,
+                           cache=ResponseCache(os.path.join(tmp, "http.db")))
+    scraper = NinjaScraperLVI([site.url], crawler)
+    try:
+        for label, mutate in (("froid", None), ("inchangé", None), ("1 annonce modifiée", True)):
+            if mutate:
+                site.update("L000000", price=1)
+            before = dict(crawler.stats)
+            start = time.monotonic()
+            listings = (await scraper.crawl_listings(max_pages=10000)).items
+            elapsed = time.monotonic() - start
+            delta = {k: crawler.stats[k] - before[k] for k in crawler.stats}
+            pages = delta["fetched"] + delta["not_modified"]
+            print(f"{label:>20}: {pages} pages en {elapsed:.2f}s ({pages / elapsed:,.0f} pages/s), "
+                  f"{len(listings)} annonces, {delta['fetched']} téléchargées, {delta['not_modified']} en 304, "
+                  f"{delta['bytes_downloaded'] / 1e3:,.0f} ko reçus, {delta['bytes_saved'] / 1e3:,.0f} ko économisés")
+    finally:
+        await scraper.aclose()
+        site.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--listings", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Benchmark résolution d'entités: temps par prospect quand N grandit
+
+Usage: python benchmarks/bench_dedup.py [--sizes 10000,100000,300000] [--dup-ratio 0.2]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dedup import resolve
+from modules.prospect import Prospect
+from modules.zone import ZONE_EMMANUEL
+
+STREETS = ["Rue des Palmiers", "Avenue de Toulouse", "Chemin des Oliviers", "Rue du Lez", "Place de la Mairie"]
+
+
+def synthetic(n: int, dup_ratio: float):
+    rng = random.Random(7)
+    communes = list(ZONE_EMMANUEL.values())
+    originals = []
+    for i in range(int(n * (1 - dup_ratio))):
+        originals.append({
+            "title": f"Bien {i}",
+            "address": f"{rng.randint(1, 300)} {rng.choice(STREETS)} {i % 997}, {rng.choice(communes)}",
+            "price": str(rng.randrange(150000, 2000000, 1000)),
+            "type": f"Maison {rng.randint(40, 400)}m²",
+            "source": "DPE ADEME",
+        })
+    prospects = list(originals)
+    for original in rng.sample(originals, n - len(originals)):
+        prospects.append({**original, "title": "Doublon", "source": "Scraping"})
+    rng.shuffle(prospects)
+    return prospects
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,100000,300000")
+    parser.add_argument("--dup-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for n in map(int, args.sizes.split(",")):
+        prospects = [Prospect.from_dict(p) for p in synthetic(n, args.dup_ratio)]
+        start = time.monotonic()
+        unique = resolve(prospects)
+        elapsed = time.monotonic() - start
+        print(f"N={n:>7}: {elapsed:6.2f}s, {elapsed / n * 1e6:5.1f} µs/prospect, "
+              f"{n - len(unique)} doublons fusionnés")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark ingestion DPE sur un dump synthétique (lignes/s, mémoire max)
+
+Usage: python benchmarks/bench_dpe_ingest.py [--rows 500000] [--zone-ratio 0.05]
+"""
+import argparse
+import csv
+import gzip
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dpe_ingest import DPEStore
+from modules.zone import ZONE_EMMANUEL
+
+HEADER = ["N°DPE", "Date_réception_DPE", "Code_INSEE_(BAN)", "Adresse_(BAN)", "Etiquette_DPE",
+          "Surface_habitable_logement", "Type_bâtiment", "Conso_5_usages_é_finale"]
+
+
+def write_dump(path: str, rows: int, zone_ratio: float):
+    rng = random.Random(42)
+    zone = list(ZONE_EMMANUEL)
+    with gzip.open(path, "wt", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        for i in range(rows):
+            insee = rng.choice(zone) if rng.random() < zone_ratio else f"{rng.randint(1, 95):02d}{rng.randint(1, 999):03d}"
+            writer.writerow([
+                f"23{i:011d}", f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", insee,
+                f"{rng.randint(1, 200)} Rue des Tests, Commune {insee}", rng.choice("ABCDEFG"),
+                f"{rng.uniform(20, 250):.1f}", rng.choice(["maison", "appartement"]), f"{rng.uniform(50, 400):.1f}",
+            ])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--zone-ratio", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        dump = os.path.join(tmp, "dpe.csv.gz")
+        write_dump(dump, args.rows, args.zone_ratio)
+        store = DPEStore(os.path.join(tmp, "dpe.db"))
+
+        start = time.monotonic()
+        first = store.ingest_file(dump)
+        elapsed = time.monotonic() - start
+        print(f"dump: {args.rows} lignes, {os.path.getsize(dump) / 1e6:.1f} Mo gzip")
+        print(f"1ère ingestion: {elapsed:.2f}s, {args.rows / elapsed:,.0f} lignes/s, "
+              f"{first['written']} DPE zone écrits")
+
+        start = time.monotonic()
+        second = store.ingest_file(dump)
+        elapsed = time.monotonic() - start
+        print(f"réingestion (watermark): {elapsed:.2f}s, {args.rows / elapsed:,.0f} lignes/s, "
+              f"{second['written']} écrits, {second['skipped_old']} ignorés")
+
+        print(f"mémoire max: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+
+
+if __name__ == "__main__":
+    main()
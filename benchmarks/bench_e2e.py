@@ -0,0 +1,263 @@
+"""Benchmark de bout en bout: l'application réelle contre un Ollama simulé et un site d'annonces local
+
+Lance StubOllama + FixtureSite, démarre l'application (uvicorn) dans un sous-processus isolé
+(données dans un dossier temporaire), puis charge chaque endpoint à concurrence fixe.
+Mesure p50/p95/p99, débit, erreurs et retard de la boucle d'événements de l'application.
+Les résultats sont enregistrés en JSON; --compare signale les régressions (code retour 1).
+
+Usage: python benchmarks/bench_e2e.py [--endpoints health,dashboard,scan,scan-cached,predictions]
+           [--requests 200] [--concurrency 16] [--latency 0.05] [--token-rate 200] [--load-time 0]
+           [--failure-rate 0] [--timeout-rate 0] [--output results.json] [--compare ancien.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import httpx
+from benchmarks.fixture_site import FixtureSite
+from benchmarks.stub_ollama import StubOllama
+
+ENDPOINTS = {
+    "health": ("GET", "/health"),
+    "dashboard": ("GET", "/"),
+    "scan": ("GET", "/api/ultra/scan?refresh=true"),
+    "scan-cached": ("GET", "/api/ultra/scan"),
+    "predictions": ("GET", "/api/ai/predictions"),
+}
+
+
+class LoopLag:
+    """Retard de la boucle d'événements: dépassement mesuré d'un sleep périodique"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.samples.append((time.monotonic() - start - self.interval) * 1000)
+
+    def snapshot(self):
+        samples, self.samples = self.samples, []
+        return summarize(samples)
+
+
+def percentile(ordered, p: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(round(p * len(ordered))) - 1))]
+
+
+def summarize(samples):
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 2),
+        "p50_ms": round(percentile(ordered, 0.50), 2),
+        "p95_ms": round(percentile(ordered, 0.95), 2),
+        "p99_ms": round(percentile(ordered, 0.99), 2),
+        "max_ms": round(ordered[-1], 2),
+    }
+
+
+def serve(port: int):
+    """Mode sous-processus: l'application + sonde de retard de boucle exposée pour le banc"""
+    import uvicorn
+    import main as app_main
+
+    lag = LoopLag()
+    app_main.app.add_event_handler("startup", lag.start)
+    app_main.app.add_api_route("/__bench/lag", lag.snapshot, methods=["GET"])
+    uvicorn.run(app_main.app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"L'application s'est arrêtée (code {process.returncode})")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("L'application n'a pas démarré à temps")
+
+
+async def load(client: httpx.AsyncClient, method: str, path: str, requests: int, concurrency: int):
+    latencies, errors, statuses = [], 0, {}
+    remaining = iter(range(requests))
+    first_ms = None
+
+    async def worker():
+        nonlocal errors, first_ms
+        for _ in remaining:
+            start = time.monotonic()
+            try:
+                response = await client.request(method, path)
+                ok = response.status_code < 400
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            except httpx.HTTPError as e:
+                ok = False
+                statuses[type(e).__name__] = statuses.get(type(e).__name__, 0) + 1
+            ms = (time.monotonic() - start) * 1000
+            if first_ms is None:
+                first_ms = ms
+            latencies.append(ms)
+            errors += not ok
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "statuses": {str(k): v for k, v in statuses.items()},
+        "throughput_rps": round(requests / elapsed, 1),
+        "first_ms": round(first_ms, 2) if first_ms is not None else None,
+        "latency": summarize(latencies),
+    }
+
+
+async def run(args, tmp: str):
+    stub = StubOllama(latency=args.latency, token_rate=args.token_rate, load_time=args.load_time,
+                      failure_rate=args.failure_rate, timeout_rate=args.timeout_rate).start()
+    site = FixtureSite(listings=args.listings).start()
+    port = free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": ROOT,
+        "OLLAMA_BASE_URL": stub.url,
+        "SCRAPER_URLS": site.url,
+        "SCRAPER_HOST_DELAY": "0",
+        "LVI_RULES": os.path.join(ROOT, "config", "lvi_rules.json"),
+    }
+    # cwd temporaire: toutes les bases data/... de l'application y sont créées
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", str(port)], cwd=tmp, env=env)
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout,
+                                     limits=httpx.Limits(max_connections=args.concurrency)) as client:
+            await wait_ready(client, process)
+            for name in args.endpoints.split(","):
+                method, path = ENDPOINTS[name]
+                (await client.get("/__bench/lag")).json()  # remise à zéro
+                result = await load(client, method, path, args.requests, args.concurrency)
+                result["loop_lag"] = (await client.get("/__bench/lag")).json()
+                results[name] = result
+                lat = result["latency"]
+                print(f"{name:>12}: {result['throughput_rps']:>8,.1f} req/s  p50 {lat.get('p50_ms', 0):>8.1f} ms  "
+                      f"p95 {lat.get('p95_ms', 0):>8.1f} ms  p99 {lat.get('p99_ms', 0):>8.1f} ms  "
+                      f"erreurs {result['errors']}  retard boucle p99 {result['loop_lag'].get('p99_ms', 0):.1f} ms")
+            health = (await client.get("/health")).json()
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+        stub.stop()
+        site.stop()
+    return results, health, dict(stub.stats)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(current, previous, tolerance: float) -> int:
+    """Affiche l'écart avec un run précédent; nombre de régressions (p95 ou débit hors tolérance)"""
+    regressions = 0
+    print(f"comparaison avec {previous['meta'].get('commit')} ({previous['meta'].get('timestamp')})")
+    for name, result in current["endpoints"].items():
+        old = previous["endpoints"].get(name)
+        if not old or not old["latency"].get("count"):
+            continue
+        p95, old_p95 = result["latency"].get("p95_ms", 0), old["latency"]["p95_ms"]
+        rps, old_rps = result["throughput_rps"], old["throughput_rps"]
+        worse = p95 > old_p95 * (1 + tolerance) or rps < old_rps * (1 - tolerance)
+        regressions += worse
+        print(f"{name:>12}: p95 {old_p95:.1f} -> {p95:.1f} ms ({(p95 / old_p95 - 1) * 100 if old_p95 else 0:+.0f}%)  "
+              f"débit {old_rps:.1f} -> {rps:.1f} req/s ({(rps / old_rps - 1) * 100 if old_rps else 0:+.0f}%)"
+              f"{'  RÉGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "--serve":
+        return serve(int(sys.argv[2]))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--endpoints", default="health,scan,scan-cached,predictions")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--listings", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="s avant le premier token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="tokens/s")
+    parser.add_argument("--load-time", type=float, default=0.0, help="chargement du modèle (s)")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="fichier JSON (défaut: benchmarks/results/e2e-<date>.json)")
+    parser.add_argument("--compare", default=None, help="résultats JSON d'un run précédent")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+    unknown = set(args.endpoints.split(",")) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"endpoints inconnus: {', '.join(sorted(unknown))} (disponibles: {', '.join(ENDPOINTS)})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        endpoints, health, stub_stats = asyncio.run(run(args, tmp))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "args": vars(args),
+        },
+        "endpoints": endpoints,
+        "stub": stub_stats,
+        "ollama": health.get("ollama"),
+    }
+    output = args.output or os.path.join(ROOT, "benchmarks", "results",
+                                         f"e2e-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"résultats: {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(report, json.load(f), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Benchmark index de similarité: recherche exacte vs IVF (débit et rappel@k) quand N grandit
+
+Usage: python benchmarks/bench_embeddings.py [--sizes 10000,50000,200000] [--dim 768] [--queries 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from modules.embeddings import EmbeddingIndex
+
+
+def synthetic(n: int, dim: int, clusters: int = 200):
+    """Vecteurs groupés autour de centres (proche d'embeddings de biens similaires)"""
+    rng = np.random.default_rng(11)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    return centers[rng.integers(0, clusters, n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def build(path: str, vectors: np.ndarray, approx_min: int) -> EmbeddingIndex:
+    async def embed(texts):
+        return vectors[[int(t.split()[1]) for t in texts]]
+
+    index = EmbeddingIndex(path, embed=embed, model="bench", approx_min=approx_min)
+    prospects = [{"title": f"bien {i}", "price": str(100000 + i), "score": i % 100} for i in range(len(vectors))]
+    for start in range(0, len(prospects), 10000):
+        asyncio.run(index.add(prospects[start:start + 10000]))
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,50000,200000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    for n in map(int, args.sizes.split(",")):
+        vectors = synthetic(n + args.queries, args.dim)
+        queries = vectors[n:]
+        with tempfile.TemporaryDirectory() as tmp:
+            exact = build(os.path.join(tmp, "exact"), vectors[:n], approx_min=n + 1)
+            start = time.monotonic()
+            truth = exact.search_vectors(queries, args.k)
+            exact_s = time.monotonic() - start
+
+            approx = build(os.path.join(tmp, "ivf"), vectors[:n], approx_min=1)
+            start = time.monotonic()
+            found = approx.search_vectors(queries, args.k)
+            ivf_s = time.monotonic() - start
+
+        recall = np.mean([len({r for r, _ in a} & {r for r, _ in b}) / args.k for a, b in zip(truth, found)])
+        print(f"N={n:>7}  exact {args.queries / exact_s:>8,.0f} req/s   "
+              f"ivf {args.queries / ivf_s:>8,.0f} req/s (nlist {approx.ivf.nlist})   rappel@{args.k} {recall:.3f}")
+
+
+if __name__ == "__main__":
+    main()
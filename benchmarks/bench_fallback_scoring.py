@@ -0,0 +1,63 @@
+"""Benchmark scoring de secours: boucle historique vs règles compilées vs moteur vectorisé (enreg./s)
+
+Référence historique partagée avec tests/test_bulk_scoring.py (tests/legacy.py).
+
+Usage: python benchmarks/bench_fallback_scoring.py [--records 300000] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.bulk_scoring import bulk_fallback_scores, prospect_columns
+from modules.rules import lvi_rules
+from tests.legacy import legacy_fallback_scoring
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=300000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed + 1)
+    prospects = [{
+        "price": str(rng.randint(150000, 900000)),
+        "location": rng.choice(["Jacou", "Castelnau-le-Lez", "Montpellier Antigone", "Clapiers", "Teyran"]),
+        "signals": rng.sample(["DPE récent", "urgent", "Mandat expiré", "déménagement", "succession"], 2),
+    } for _ in range(args.records)]
+
+    rules = lvi_rules.current()
+    start = time.monotonic()
+    loop = [legacy_fallback_scoring(p) for p in prospects]
+    loop_elapsed = time.monotonic() - start
+
+    start = time.monotonic()
+    compiled = [rules.score(p) for p in prospects]
+    compiled_elapsed = time.monotonic() - start
+
+    start = time.monotonic()
+    bulk = bulk_fallback_scores(prospects, rules)
+    bulk_elapsed = time.monotonic() - start
+    assert bulk == compiled == loop
+
+    columns = prospect_columns(prospects)
+    start = time.monotonic()
+    rules.score_columns(columns["price"], columns["location"], columns["signals"])
+    columns_elapsed = time.monotonic() - start
+
+    print(f"{args.records} prospects")
+    print(f"boucle historique:      {args.records / loop_elapsed:>12,.0f} enreg./s")
+    print(f"règles compilées:       {args.records / compiled_elapsed:>12,.0f} enreg./s "
+          f"(x{loop_elapsed / compiled_elapsed:.1f})")
+    print(f"vectorisé (dicts):      {args.records / bulk_elapsed:>12,.0f} enreg./s "
+          f"(x{loop_elapsed / bulk_elapsed:.1f})")
+    print(f"vectorisé (colonnes):   {args.records / columns_elapsed:>12,.0f} enreg./s "
+          f"(x{loop_elapsed / columns_elapsed:.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Benchmark modèle Prospect: octets/enregistrement et débit d'encodage JSON vs dicts
+
+Usage: python benchmarks/bench_prospect.py [--records 100000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from modules.prospect import Prospect, dumps, orjson
+from modules.zone import ZONE_EMMANUEL
+
+STREETS = ["Rue des Palmiers", "Avenue de Toulouse", "Chemin des Oliviers", "Rue du Lez", "Place de la Mairie"]
+SOURCES = ["DPE ADEME", "Scraping", "LinkedIn", "Facebook"]
+REASONS = ["DPE = intention vente", "Mandat Century21 expiré", "Post déménagement professionnel"]
+
+
+def synthetic(n: int):
+    rng = random.Random(3)
+    communes = list(ZONE_EMMANUEL.values())
+    return [{
+        "title": f"Maison {rng.randint(60, 300)}m² - {i}",
+        "address": f"{rng.randint(1, 300)} {rng.choice(STREETS)}, {rng.choice(communes)}",
+        "price": str(rng.randrange(150000, 2000000, 1000)),
+        "score": rng.randint(40, 100),
+        "source": rng.choice(SOURCES),
+        "reason": rng.choice(REASONS),
+        "date": "Il y a 2 jours",
+        "type": "Maison",
+        "ai_powered": True,
+    } for i in range(n)]
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = build()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return items, size
+
+
+def timed(label: str, n: int, encode):
+    start = time.monotonic()
+    size = len(encode())
+    elapsed = time.monotonic() - start
+    print(f"  {label:<32} {n / elapsed:>12,.0f} enreg./s  ({size / 1e6:.1f} Mo)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.records
+
+    raw = json.dumps(synthetic(n))
+    dicts, dict_bytes = measure(lambda: json.loads(raw))
+    prospects, prospect_bytes = measure(lambda: [Prospect.from_dict(d) for d in json.loads(raw)])
+    print(f"{n} prospects en mémoire")
+    print(f"  dicts:    {dict_bytes / n:6.0f} octets/enreg.")
+    print(f"  Prospect: {prospect_bytes / n:6.0f} octets/enreg. (x{dict_bytes / prospect_bytes:.1f} moins)")
+
+    print(f"encodage JSON ({'orjson' if orjson else 'json'} pour dumps)")
+    timed("dicts via jsonable_encoder", n, lambda: json.dumps(jsonable_encoder({"prospects": dicts})))
+    timed("dicts via json.dumps", n, lambda: json.dumps({"prospects": dicts}, ensure_ascii=False))
+    timed("Prospect via dumps", n, lambda: dumps({"prospects": prospects}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Site d'annonces local (stand-in HTTP) pour tester et mesurer le scraper
+
+Pages /annonces?page=N avec JSON-LD schema.org, liens rel=next, ETag et
+Last-Modified (réponses 304 sur requête conditionnelle).
+"""
+import hashlib
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+COMMUNES = ["Jacou", "Castelnau-le-Lez", "Montpellier", "Lattes", "Pérols", "Clapiers", "Teyran"]
+AGENCIES = ["Century21", "Orpi", "Laforêt", "Foncia", "Guy Hoquet"]
+
+
+class FixtureSite:
+    def __init__(self, listings: int = 200, per_page: int = 20, port: int = 0):
+        self.per_page = per_page
+        self.listings: Dict[str, Dict] = {}
+        self.requests = 0
+        self._versions: Dict[int, float] = {}
+        self._lock = threading.Lock()
+        for i in range(listings):
+            self.add(f"L{i:06d}", f"Maison {80 + i % 150}m² - {COMMUNES[i % len(COMMUNES)]}",
+                     300000 + (i * 7919) % 900000, f"{i % 90 + 1} rue des Tests, {COMMUNES[i % len(COMMUNES)]}",
+                     AGENCIES[i % len(AGENCIES)])
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}/annonces?page=1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # Mutations (simulent la vie du marché)
+    def add(self, listing_id: str, title: str, price: int, address: str, agency: str):
+        with self._lock:
+            self.listings[listing_id] = {"title": title, "price": price, "address": address, "agency": agency}
+            self._versions.clear()
+
+    def remove(self, listing_id: str):
+        with self._lock:
+            self.listings.pop(listing_id, None)
+            self._versions.clear()
+
+    def update(self, listing_id: str, **changes):
+        with self._lock:
+            self.listings[listing_id].update(changes)
+            self._versions.clear()
+
+    def render(self, page: int) -> bytes:
+        with self._lock:
+            ids = sorted(self.listings)
+            chunk = ids[(page - 1) * self.per_page:page * self.per_page]
+            items = [{
+                "@type": "RealEstateListing",
+                "@id": listing_id,
+                "name": self.listings[listing_id]["title"],
+                "url": f"/annonce/{listing_id}",
+                "address": {"@type": "PostalAddress", "streetAddress": self.listings[listing_id]["address"]},
+                "offers": {"@type": "Offer", "price": self.listings[listing_id]["price"],
+                           "seller": {"@type": "RealEstateAgent", "name": self.listings[listing_id]["agency"]}},
+            } for listing_id in chunk]
+            has_next = page * self.per_page < len(ids)
+        next_link = f'<a rel="next" href="/annonces?page={page + 1}">Suivant</a>' if has_next else ""
+        cards = "".join(f"<article><h2>{item['name']}</h2><p>{item['offers']['price']} €</p></article>" for item in items)
+        return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Annonces p{page}</title>'
+                f'<script type="application/ld+json">{json.dumps({"@graph": items}, ensure_ascii=False)}</script>'
+                f'</head><body>{cards}{next_link}</body></html>').encode()
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                site.requests += 1
+                parts = urlsplit(self.path)
+                if parts.path == "/robots.txt":
+                    return self._send(200, b"User-agent: *\nDisallow: /admin\n", {})
+                if parts.path != "/annonces":
+                    return self._send(404, b"", {})
+                page = int(parse_qs(parts.query).get("page", ["1"])[0])
+                body = site.render(page)
+                etag = '"' + hashlib.md5(body).hexdigest() + '"'
+                modified = formatdate(site._versions.setdefault(page, time.time()), usegmt=True)
+                if self.headers.get("If-None-Match") == etag:
+                    return self._send(304, b"", {"ETag": etag, "Last-Modified": modified})
+                self._send(200, body, {"ETag": etag, "Last-Modified": modified,
+                                       "Content-Type": "text/html; charset=utf-8"})
+
+            def _send(self, status, body, headers):
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if body:
+                    self.wfile.write(body)
+
+        return Handler
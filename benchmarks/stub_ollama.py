@@ -0,0 +1,162 @@
+"""Serveur Ollama local simulé pour les benchmarks de bout en bout
+
+/api/tags, /api/generate (streaming ou non, sorties conformes au schéma "format"), /api/embed.
+Latence du premier token, débit de tokens, chargement à froid, erreurs et blocages injectables.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_ID_RE = re.compile(r'id=(\d+)')
+
+MESSAGE = ("Bonjour, j'ai remarqué votre bien et je me permets de vous contacter. Notre méthode de vente "
+           "interactive obtient de meilleurs prix grâce à une transparence totale. Seriez-vous disponible "
+           "pour un échange autour d'un café ? Cordialement, Emmanuel").split(" ")
+
+
+class StubOllama:
+    def __init__(self, latency: float = 0.05, token_rate: float = 200.0, load_time: float = 0.0,
+                 failure_rate: float = 0.0, timeout_rate: float = 0.0, hang: float = 30.0,
+                 embed_dim: int = 256, model: str = "llama3.1:8b", port: int = 0, seed: int = 0):
+        self.latency = latency          # s avant le premier token
+        self.token_rate = token_rate    # tokens/s ensuite
+        self.load_time = load_time      # chargement du modèle au premier appel
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.hang = hang                # durée d'un appel bloqué (provoque les timeouts client)
+        self.embed_dim = embed_dim
+        self.model = model
+        self.stats = {"generate": 0, "embed": 0, "failures": 0, "hangs": 0, "tokens": 0}
+        self._loaded = False
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _fault(self) -> Optional[str]:
+        with self._lock:
+            roll = self._rng.random()
+        if roll < self.failure_rate:
+            self.stats["failures"] += 1
+            return "failure"
+        if roll < self.failure_rate + self.timeout_rate:
+            self.stats["hangs"] += 1
+            return "hang"
+        return None
+
+    def _load(self) -> float:
+        """Durée de chargement payée par cet appel (premier appel seulement)"""
+        with self._lock:
+            if self._loaded:
+                return 0.0
+            self._loaded = True
+        time.sleep(self.load_time)
+        return self.load_time
+
+    def output(self, body: Dict) -> str:
+        """Texte conforme au schéma demandé (ou message libre)"""
+        schema = body.get("format") or {}
+        required = schema.get("required", []) if isinstance(schema, dict) else []
+        seed = int(hashlib.md5(body.get("prompt", "").encode()).hexdigest()[:8], 16)
+        if "scores" in required:
+            ids = dict.fromkeys(int(i) for i in _ID_RE.findall(body["prompt"]))
+            return json.dumps({"scores": [{"id": i, "score": (seed + i * 37) % 61 + 40} for i in ids]})
+        if "score" in required:
+            return json.dumps({"score": seed % 61 + 40})
+        if "probability" in required:
+            return json.dumps({"probability": seed % 50 + 50, "timeline": f"{seed % 9 + 3} mois",
+                               "confidence": ("low", "medium", "high")[seed % 3]})
+        limit = (body.get("options") or {}).get("num_predict")
+        return " ".join(MESSAGE[:limit] if limit else MESSAGE)
+
+    def embedding(self, text: str):
+        rng = random.Random(hashlib.md5(text.encode()).hexdigest())
+        return [rng.gauss(0, 1) for _ in range(self.embed_dim)]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    return self._json(200, {"models": [{"name": stub.model}]})
+                self._json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if self.path == "/api/embed":
+                    stub.stats["embed"] += 1
+                    inputs = body.get("input") or []
+                    inputs = [inputs] if isinstance(inputs, str) else inputs
+                    time.sleep(stub.latency / 4)
+                    return self._json(200, {"model": body.get("model"),
+                                            "embeddings": [stub.embedding(t) for t in inputs]})
+                if self.path != "/api/generate":
+                    return self._json(404, {"error": "not found"})
+
+                stub.stats["generate"] += 1
+                fault = stub._fault()
+                if fault == "failure":
+                    return self._json(500, {"error": "injected failure"})
+                if fault == "hang":
+                    time.sleep(stub.hang)
+                load = stub._load()
+                text = stub.output(body)
+                tokens = text.split(" ")
+                stub.stats["tokens"] += len(tokens)
+                time.sleep(stub.latency)
+                final = {"model": stub.model, "done": True, "load_duration": int(load * 1e9),
+                         "eval_count": len(tokens)}
+                if not body.get("stream", True):
+                    time.sleep(len(tokens) / stub.token_rate)
+                    return self._json(200, {**final, "response": text})
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for i, token in enumerate(tokens):
+                    self._chunk({"model": stub.model, "response": token if i == 0 else " " + token, "done": False})
+                    time.sleep(1 / stub.token_rate)
+                self._chunk({**final, "response": ""})
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _chunk(self, data):
+                line = json.dumps(data).encode() + b"\n"
+                self.wfile.write(f"{len(line):x}\r\n".encode() + line + b"\r\n")
+                self.wfile.flush()
+
+            def _json(self, status, data):
+                payload = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
@@ -1,271 +1,95 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import requests
 import json
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import Dict, List, Optional
 import asyncio
 import os
+import time
 import sys
 sys.path.append('modules')
 
+from modules.assets import StaticAssets
+from modules.embeddings import EmbeddingIndex
+from modules.executor import BoundedExecutor
+from modules.export import MEDIA_TYPES, export_chunks
+from modules.jobs import JobQueue, JobStore
+from modules.metrics import collect_timings, metrics, timing_breakdown
+from modules.scheduler import SnapshotScheduler
+from modules.scan import ScanBroadcast, ScanSource, run_sources, aggregate
+from modules.shared import env_shared_state
+from modules.dpe_ingest import DPEStore, dpe_to_prospect
+from modules.prospect import dumps
+from modules.rules import lvi_rules
+from modules.store import ProspectStore
+from modules.zone import ZONE_EMMANUEL, resolve_commune
+
 # Import nos modules ninja
 try:
     from modules.scraper import ninja_scraper
-    from modules.ollama_ai import ollama_ai
+    from modules.ollama_ai import async_ollama_ai as ollama_ai
 except ImportError as e:
     print(f"Warning: Module import failed: {e}")
     ninja_scraper = None
     ollama_ai = None
 
+# Multi-worker (WEB_CONCURRENCY > 1): état partagé entre processus (SQLite WAL)
+shared_state = ollama_ai.shared if ollama_ai else env_shared_state()
+
 app = FastAPI(title="MARC VEILLE ULTRA - LVI IMMO")
 app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
 
-# Zone géographique Emmanuel
-ZONE_EMMANUEL = {
-    "34172": "Montpellier", "34057": "Castelnau-le-Lez", "34129": "Lattes",
-    "34192": "Pérols", "34120": "Jacou", "34077": "Clapiers", 
-    "34169": "Montferrier-sur-Lez", "34255": "Saint-Gély-du-Fesc",
-    "34308": "Teyran", "34010": "Assas", "34165": "Montaud"
-}
+class FastJSONResponse(JSONResponse):
+    """Réponse JSON encodée directement (Prospect compris), sans passer par jsonable_encoder"""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+# Prospects persistés (requêtes paginées, stats incrémentales)
+prospect_store = ProspectStore(os.environ.get("PROSPECTS_DB", "data/prospects.db"))
+dpe_store = DPEStore(os.environ.get("DPE_DB", "data/dpe.db"))
+
+# Tableau de bord: fichiers statiques chargés et précompressés une fois au démarrage
+dashboard_assets = StaticAssets(os.environ.get("STATIC_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")))
 
 @app.get("/")
-def root():
-    return HTMLResponse("""<!DOCTYPE html>
-<html><head><title>MARC ULTRA - LVI IMMO</title><meta charset="UTF-8"><meta name="viewport" content="width=device-width, initial-scale=1.0">
-<style>
-:root{--primary:#2563EB;--success:#10B981;--warning:#F59E0B;--danger:#EF4444;--neutral:#F8F9FA;--white:#FFFFFF;--dark:#1F2937;--radius:12px;--shadow:0 4px 6px rgba(0,0,0,0.1)}
-*{margin:0;padding:0;box-sizing:border-box}
-body{font-family:-apple-system,BlinkMacSystemFont,'Segoe UI',Roboto,sans-serif;background:linear-gradient(135deg,#F8F9FA 0%,#E5E7EB 100%);color:var(--dark);line-height:1.6;min-height:100vh}
-.header{background:var(--white);padding:1rem 2rem;box-shadow:var(--shadow);margin-bottom:2rem;display:flex;justify-content:space-between;align-items:center}
-.logo{font-size:1.75rem;font-weight:700;color:var(--primary)}
-.status{padding:0.5rem 1rem;border-radius:20px;font-size:0.875rem;font-weight:500}
-.status.ultra{background:linear-gradient(45deg,#EF4444,#F59E0B);color:white;animation:pulse 2s infinite}
-@keyframes pulse{0%,100%{opacity:1}50%{opacity:0.7}}
-.main{max-width:1400px;margin:0 auto;padding:2rem}
-.metrics{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:1.5rem;margin-bottom:2rem}
-.metric{background:var(--white);padding:1.5rem;border-radius:var(--radius);box-shadow:var(--shadow);text-align:center;position:relative;overflow:hidden}
-.metric::before{content:'';position:absolute;top:0;left:0;right:0;height:4px;background:linear-gradient(90deg,var(--primary),var(--success))}
-.metric-value{font-size:2rem;font-weight:700;color:var(--primary);margin-bottom:0.5rem}
-.metric-label{color:var(--dark);opacity:0.7;font-size:0.875rem}
-.controls{display:grid;grid-template-columns:repeat(auto-fit,minmax(200px,1fr));gap:1rem;margin-bottom:2rem}
-.btn{background:var(--primary);color:white;padding:1rem 1.5rem;border:none;border-radius:var(--radius);cursor:pointer;font-weight:500;text-align:center;transition:all 0.3s}
-.btn:hover{transform:translateY(-2px);box-shadow:0 8px 25px rgba(37,99,235,0.3)}
-.btn.danger{background:var(--danger)}
-.btn.success{background:var(--success)}
-.btn.warning{background:var(--warning)}
-.prospects{display:grid;gap:1.5rem}
-.prospect{background:var(--white);border-radius:var(--radius);box-shadow:var(--shadow);overflow:hidden;transition:all 0.3s}
-.prospect:hover{transform:translateY(-4px);box-shadow:0 12px 30px rgba(0,0,0,0.15)}
-.prospect-header{padding:1.5rem;border-left:4px solid var(--primary);position:relative}
-.prospect.ultra-hot{border-left-color:var(--danger);background:linear-gradient(135deg,#FEF2F2,#FFFFFF)}
-.prospect.hot{border-left-color:var(--warning);background:linear-gradient(135deg,#FFFBEB,#FFFFFF)}
-.prospect.warm{border-left-color:var(--success);background:linear-gradient(135deg,#F0FDF4,#FFFFFF)}
-.prospect-title{font-size:1.125rem;font-weight:600;margin-bottom:0.5rem;display:flex;justify-content:space-between;align-items:center}
-.prospect-details{color:var(--dark);opacity:0.8;margin-bottom:1rem}
-.prospect-meta{display:flex;justify-content:space-between;align-items:center;color:#6B7280;font-size:0.875rem}
-.score{padding:0.5rem 1rem;border-radius:25px;font-weight:600;color:white}
-.score.ultra{background:linear-gradient(45deg,#EF4444,#F59E0B);animation:glow 2s infinite}
-.score.hot{background:var(--warning)}
-.score.warm{background:var(--success)}
-@keyframes glow{0%,100%{box-shadow:0 0 10px rgba(239,68,68,0.5)}50%{box-shadow:0 0 20px rgba(239,68,68,0.8)}}
-.ai-badge{position:absolute;top:10px;right:10px;background:linear-gradient(45deg,#8B5CF6,#EC4899);color:white;padding:0.25rem 0.75rem;border-radius:15px;font-size:0.75rem;font-weight:600}
-.loading{display:inline-block;width:20px;height:20px;border:3px solid rgba(255,255,255,.3);border-radius:50%;border-top-color:#fff;animation:spin 1s ease-in-out infinite}
-@keyframes spin{to{transform:rotate(360deg)}}
-</style>
-</head>
-<body>
-<div class="header">
-  <div class="logo">🚀 MARC ULTRA - LVI IMMO</div>
-  <div class="status ultra">● CLAUDE AI POWER</div>
-</div>
-
-<div class="main">
-  <div class="metrics">
-    <div class="metric">
-      <div class="metric-value" id="total-prospects">0</div>
-      <div class="metric-label">Prospects détectés</div>
-    </div>
-    <div class="metric">
-      <div class="metric-value" id="ultra-hot">0</div>
-      <div class="metric-label">Ultra chauds</div>
-    </div>
-    <div class="metric">
-      <div class="metric-value" id="ai-predictions">0</div>
-      <div class="metric-label">Prédictions IA</div>
-    </div>
-    <div class="metric">
-      <div class="metric-value" id="avg-score">0</div>
-      <div class="metric-label">Score moyen</div>
-    </div>
-  </div>
-
-  <div class="controls">
-    <button class="btn danger" onclick="scanUltraProspects()" id="scan-btn">🔥 SCAN ULTRA</button>
-    <button class="btn warning" onclick="scrapeExpiredMandates()">💎 MANDATS EXPIRÉS</button>
-    <button class="btn success" onclick="aiPredictions()">🧠 PRÉDICTIONS IA</button>
-    <button class="btn" onclick="exportUltra()">📊 EXPORT ULTRA</button>
-  </div>
-
-  <div class="prospects" id="prospects-container">
-    <div style="text-align:center;color:#6B7280;padding:3rem">
-      🚀 Prêt pour le scan ultra-performant ?<br>
-      <small>DPE + Scraping + LinkedIn + IA Locale</small>
-    </div>
-  </div>
-</div>
-
-<script>
-let ultraProspects = [];
-
-async function scanUltraProspects() {
-  const btn = document.getElementById('scan-btn');
-  btn.innerHTML = '⏳ SCANNING...';
-  btn.disabled = true;
-  
-  try {
-    const response = await fetch('/api/ultra/scan');
-    const data = await response.json();
-    
-    ultraProspects = data.prospects || [];
-    updateMetrics(data.stats);
-    displayProspects(ultraProspects);
-    
-    btn.innerHTML = '✅ SCAN TERMINÉ';
-    setTimeout(() => {
-      btn.innerHTML = '🔥 SCAN ULTRA';
-      btn.disabled = false;
-    }, 2000);
-    
-  } catch (error) {
-    console.error('Erreur scan:', error);
-    btn.innerHTML = '❌ ERREUR';
-    setTimeout(() => {
-      btn.innerHTML = '🔥 SCAN ULTRA';
-      btn.disabled = false;
-    }, 2000);
-  }
-}
-
-async function scrapeExpiredMandates() {
-  try {
-    const response = await fetch('/api/scraping/expired');
-    const data = await response.json();
-    
-    displayProspects(data.prospects, 'Mandats expirés détectés');
-  } catch (error) {
-    console.error('Erreur scraping:', error);
-  }
-}
-
-async function aiPredictions() {
-  try {
-    const response = await fetch('/api/ai/predictions');
-    const data = await response.json();
-    
-    displayProspects(data.predictions, 'Prédictions IA');
-  } catch (error) {
-    console.error('Erreur IA:', error);
-  }
-}
-
-function updateMetrics(stats) {
-  document.getElementById('total-prospects').textContent = stats.total || 0;
-  document.getElementById('ultra-hot').textContent = stats.ultra_hot || 0;
-  document.getElementById('ai-predictions').textContent = stats.ai_active || 0;
-  document.getElementById('avg-score').textContent = stats.avg_score || 0;
-}
-
-function displayProspects(prospects, title = null) {
-  const container = document.getElementById('prospects-container');
-  
-  if (prospects.length === 0) {
-    container.innerHTML = '<div style="text-align:center;color:#6B7280;padding:2rem">Aucun prospect détecté</div>';
-    return;
-  }
-  
-  const titleHTML = title ? `<h3 style="margin-bottom:1rem;color:var(--primary)">${title}</h3>` : '';
-  
-  container.innerHTML = titleHTML + prospects.map(prospect => {
-    const priority = prospect.score >= 90 ? 'ultra-hot' : prospect.score >= 75 ? 'hot' : 'warm';
-    const priorityLabel = priority === 'ultra-hot' ? '🔥 ULTRA' : priority === 'hot' ? '🟡 CHAUD' : '🟢 TIÈDE';
-    const scoreClass = priority === 'ultra-hot' ? 'ultra' : priority === 'hot' ? 'hot' : 'warm';
-    
-    return `
-      <div class="prospect ${priority}">
-        ${prospect.ai_powered ? '<div class="ai-badge">AI POWERED</div>' : ''}
-        <div class="prospect-header">
-          <div class="prospect-title">
-            ${prospect.title || 'Prospect'}
-            <span>${priorityLabel}</span>
-          </div>
-          <div class="prospect-details">
-            📍 ${prospect.address || 'Localisation'}<br>
-            💰 ${prospect.price || 'Prix'} • 🏠 ${prospect.type || 'Type'}<br>
-            📅 ${prospect.date || 'Récent'} • 🎯 ${prospect.reason || 'Opportunité'}
-            ${prospect.prediction ? '<br>🧠 ' + prospect.prediction : ''}
-          </div>
-          <div class="prospect-meta">
-            <span>Source: ${prospect.source || 'Veille'}</span>
-            <span class="score ${scoreClass}">${prospect.score}/100</span>
-          </div>
-        </div>
-      </div>
-    `;
-  }).join('');
-}
-
-function exportUltra() {
-  if (ultraProspects.length === 0) {
-    alert('Aucune donnée à exporter');
-    return;
-  }
-  
-  const csv = [
-    ['Titre', 'Adresse', 'Prix', 'Score', 'Source', 'Raison'].join(','),
-    ...ultraProspects.map(p => [
-      p.title, p.address, p.price, p.score, p.source, p.reason
-    ].join(','))
-  ].join('\\n');
-  
-  const blob = new Blob([csv], { type: 'text/csv' });
-  const url = URL.createObjectURL(blob);
-  const a = document.createElement('a');
-  a.href = url;
-  a.download = `prospects_ultra_${new Date().toISOString().split('T')[0]}.csv`;
-  a.click();
-}
-</script>
-</body></html>""")
+def root(request: Request):
+    response = dashboard_assets.response("index.html", request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Tableau de bord introuvable")
+    return response
 
-@app.get("/api/ultra/scan")
-async def ultra_scan():
-    """SCAN ULTRA - Toutes sources combinées"""
-    all_prospects = []
-    
-    # 1. DPE ADEME (déjà implémenté)
+@app.get("/static/{name:path}")
+def static_asset(name: str, request: Request):
+    response = dashboard_assets.response(name, request.headers)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Fichier introuvable")
+    return response
+
+# Sources du scan ultra (exécutées en parallèle)
+async def source_dpe():
+    """1. DPE ADEME (déjà implémenté)"""
     dpe_prospects = await fetch_real_dpe_data()
     for prospect in dpe_prospects:
         prospect['source'] = 'DPE ADEME'
         prospect['ai_powered'] = True
-        all_prospects.append(prospect)
-    
-    # 2. Scraping mandats expirés
-    if ninja_scraper:
-        try:
-            expired_prospects = await ninja_scraper.scrape_seloger_expired()
-            for prospect in expired_prospects:
-                prospect['source'] = 'Scraping'
-                prospect['ai_powered'] = True
-                if ollama_ai:
-                    prospect['score'] = ollama_ai.generate_prospect_score(prospect)
-                all_prospects.append(prospect)
-        except Exception as e:
-            print(f"Erreur scraping: {e}")
-    
-    # 3. Simulation LinkedIn + Social (en attendant vrais modules)
-    social_prospects = [
+    return dpe_prospects
+
+async def source_scraping():
+    """2. Scraping mandats expirés"""
+    if not ninja_scraper:
+        return []
+    expired_prospects = await ninja_scraper.scrape_seloger_expired()
+    for prospect in expired_prospects:
+        prospect['source'] = 'Scraping'
+        prospect['ai_powered'] = True
+    return expired_prospects
+
+async def source_social():
+    """3. Simulation LinkedIn + Social (en attendant vrais modules)"""
+    return [
         {
             "title": "Dirigeant cherche agent innovant",
             "address": "Montpellier Centre",
@@ -291,27 +115,154 @@ async def ultra_scan():
             "prediction": "98% vente sous 6 semaines"
         }
     ]
-    
-    all_prospects.extend(social_prospects)
-    
-    # Tri par score décroissant
-    all_prospects.sort(key=lambda x: x.get('score', 0), reverse=True)
-    
-    # Stats
-    stats = {
-        "total": len(all_prospects),
-        "ultra_hot": len([p for p in all_prospects if p.get('score', 0) >= 90]),
-        "ai_active": len([p for p in all_prospects if p.get('ai_powered')]),
-        "avg_score": sum(p.get('score', 0) for p in all_prospects) // len(all_prospects) if all_prospects else 0
-    }
+
+SCAN_DEADLINE = float(os.environ.get("SCAN_DEADLINE", 20))
+SCAN_SOURCES = [
+    ScanSource("dpe", source_dpe, timeout=5),
+    ScanSource("scraping", source_scraping, timeout=15, score=True),
+    ScanSource("social", source_social, timeout=5),
+]
+
+# Index de prospects similaires (embeddings Ollama), alimenté au fil des scans
+lookalikes = EmbeddingIndex(
+    os.environ.get("EMBEDDINGS_DIR", "data/embeddings"),
+    embed=ollama_ai.embed if ollama_ai else None,
+    model=ollama_ai.embed_model if ollama_ai else "",
+)
+_index_tasks = set()
+
+async def index_prospects(prospects):
+    try:
+        await lookalikes.add(prospects)
+    except Exception as e:
+        print(f"Erreur index similarité: {e}")
+
+async def scan_sink(name, prospects):
+    """Upsert en base (hors de la boucle) puis indexation incrémentale des embeddings en tâche de fond"""
+    await asyncio.to_thread(prospect_store.upsert, prospects)
+    if ollama_ai:
+        task = asyncio.create_task(index_prospects(prospects))
+        _index_tasks.add(task)
+        task.add_done_callback(_index_tasks.discard)
+
+def scan_scoring():
+    """Scoring IA (par lots) + score provisoire de secours + upsert en base par source"""
+    options = {"sink": scan_sink}
+    if ollama_ai:
+        options.update(scorer=ollama_ai.iter_prospect_scores, provisional=ollama_ai.fallback_scoring)
+    return options
+
+# Événements du scan en cours, suivis en direct par /api/ultra/scan/stream
+scan_events = ScanBroadcast()
+
+async def compute_ultra_scan():
+    """SCAN ULTRA - Toutes sources combinées (calcul complet)"""
+    scan_events.begin()
+    try:
+        with collect_timings() as timings:
+            all_prospects, sources = await run_sources(SCAN_SOURCES, deadline=SCAN_DEADLINE,
+                                                       on_event=scan_events.publish, **scan_scoring())
+            top_prospects, stats = aggregate(all_prospects)
+    finally:
+        scan_events.end()
     
     return {
-        "prospects": all_prospects[:20],  # Top 20
+        "prospects": top_prospects,  # Top 20
         "stats": stats,
+        "sources": sources,
         "timestamp": datetime.now().isoformat(),
-        "ai_status": "active" if ollama_ai and ollama_ai.is_available() else "fallback"
+        "ai_status": "active" if ollama_ai and await ollama_ai.is_available() else "fallback",
+        "timings": timing_breakdown(timings)
     }
 
+# Snapshot du scan rafraîchi en fond, servi immédiatement (calculé par un seul worker en multi-worker)
+scan_snapshots = SnapshotScheduler(
+    compute_ultra_scan,
+    interval=float(os.environ.get("SCAN_INTERVAL", 300)),
+    max_age=float(os.environ.get("SCAN_MAX_AGE", 120)),
+    shared=shared_state,
+    lease=SCAN_DEADLINE * 3,
+)
+
+@app.get("/api/ultra/scan")
+async def ultra_scan(refresh: bool = False, timings: bool = False):
+    """SCAN ULTRA - dernier snapshot (recalcul si périmé ou refresh=true, timings=true: détail des durées)"""
+    snapshot = await scan_snapshots.get(force=refresh)
+    if not timings:
+        snapshot = {k: v for k, v in snapshot.items() if k != "timings"}
+    return FastJSONResponse({**snapshot, "snapshot": scan_snapshots.info()})
+
+@app.get("/api/ultra/scan/stream")
+async def ultra_scan_stream(timings: bool = False):
+    """SCAN ULTRA en streaming NDJSON: prospects, scores IA et stats au fil de l'eau
+
+    Rejoint le recalcul du snapshot en cours (ou en lance un): un seul crawl et un seul diff
+    d'annonces à la fois, quel que soit le nombre de flux ouverts.
+    """
+    async def events():
+        received = 0
+        async for event in scan_events.subscribe(scan_snapshots.start_refresh()):
+            received += 1
+            yield dumps(event) + b"\n"
+        snapshot = scan_snapshots.snapshot or {}
+        if not received:
+            # Snapshot calculé par un autre worker: rejoué tel quel
+            for i, prospect in enumerate(snapshot.get("prospects", [])):
+                source = prospect.get("source") if isinstance(prospect, dict) else prospect.source
+                yield dumps({"type": "prospect", "id": i, "source": source, "provisional": False,
+                             "prospect": prospect}) + b"\n"
+            if "stats" in snapshot:
+                yield dumps({"type": "stats", "stats": snapshot["stats"]}) + b"\n"
+        done = {"type": "done", "timestamp": snapshot.get("timestamp", datetime.now().isoformat()),
+                "ai_status": snapshot.get("ai_status", "fallback")}
+        if timings:
+            done["timings"] = snapshot.get("timings", {})
+        yield dumps(done) + b"\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/api/prospects")
+def list_prospects(min_score: Optional[int] = None, insee: Optional[str] = None, source: Optional[str] = None,
+                   since: Optional[float] = None, limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None):
+    """Prospects stockés: filtres + pagination par curseur"""
+    if insee and insee not in ZONE_EMMANUEL:
+        raise HTTPException(status_code=400, detail=f"Code INSEE hors zone: {insee}")
+    try:
+        prospects, next_cursor = prospect_store.query(min_score, insee, source, since, limit, cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    return FastJSONResponse({"prospects": prospects, "next_cursor": next_cursor})
+
+@app.get("/api/prospects/export")
+def export_prospects(format: str = Query("csv", pattern="^(csv|ndjson|parquet)$"), min_score: Optional[int] = None,
+                     insee: Optional[str] = None, commune: Optional[str] = None, source: Optional[str] = None,
+                     since: Optional[float] = None):
+    """Export complet en streaming (CSV, NDJSON ou Parquet), page par page en mémoire constante"""
+    if commune and not insee:
+        insee = resolve_commune(commune)[0]
+        if insee is None:
+            raise HTTPException(status_code=400, detail=f"Commune hors zone: {commune}")
+    if insee and insee not in ZONE_EMMANUEL:
+        raise HTTPException(status_code=400, detail=f"Code INSEE hors zone: {insee}")
+    try:
+        chunks = export_chunks(format, prospect_store.pages(min_score, insee, source, since))
+    except ValueError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    filename = f"prospects_{datetime.now().strftime('%Y-%m-%d')}.{format}"
+    # Itérateur synchrone: Starlette lit chaque page (SQLite + encodage) dans le pool de threads
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format],
+                             headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@app.get("/api/prospects/top")
+def top_prospects(k: int = Query(20, ge=1, le=500)):
+    """Top K par score"""
+    return FastJSONResponse({"prospects": prospect_store.top(k)})
+
+@app.get("/api/prospects/stats")
+def prospects_stats():
+    """Stats globales (agrégats maintenus à l'écriture)"""
+    return {"stats": prospect_store.stats()}
+
 @app.get("/api/scraping/expired")
 async def get_expired_mandates():
     """Mandats expirés détectés"""
@@ -319,17 +270,37 @@ async def get_expired_mandates():
         return {"prospects": [], "message": "Scraper non disponible"}
     
     try:
-        prospects = await ninja_scraper.scrape_seloger_expired()
+        prospects = await ninja_scraper.recent_expired()
         return {"prospects": prospects}
     except Exception as e:
         return {"prospects": [], "error": str(e)}
 
+# Prédictions en parallèle, calées sur les slots d'Ollama (OLLAMA_NUM_PARALLEL)
+prediction_executor = BoundedExecutor(int(os.environ.get("OLLAMA_NUM_PARALLEL", 4)))
+
+async def prediction_lines(prospects):
+    """NDJSON: une ligne par prospect dans l'ordre d'entrée, puis un bilan"""
+    start = time.monotonic()
+    count = 0
+    async for i, prospect, prediction, error, ms in prediction_executor.map(ollama_ai.predict_selling_probability, prospects):
+        line = {"index": i, "prospect": prospect, "latency_ms": ms}
+        if error:
+            line["error"] = error
+        else:
+            line["prediction"] = prediction
+        count += 1
+        yield dumps(line) + b"\n"
+    yield dumps({"type": "done", "count": count, "ms": round((time.monotonic() - start) * 1000, 1)}) + b"\n"
+
 @app.get("/api/ai/predictions")
-async def get_ai_predictions():
-    """Prédictions IA Ollama"""
-    if not ollama_ai or not ollama_ai.is_available():
+async def get_ai_predictions(stored: bool = False, min_score: Optional[int] = None):
+    """Prédictions IA Ollama (stored=true: tous les prospects en base, en streaming NDJSON)"""
+    if not ollama_ai or not await ollama_ai.is_available():
         return {"predictions": [], "message": "IA non disponible"}
-    
+
+    if stored:
+        return StreamingResponse(prediction_lines(prospect_store.iter(min_score)), media_type="application/x-ndjson")
+
     # Prospects pour prédictions
     test_prospects = [
         {"name": "Marie B.", "location": "Jacou", "signals": ["DPE récent", "Travaux terminés"]},
@@ -337,21 +308,118 @@ async def get_ai_predictions():
     ]
     
     predictions = []
-    for prospect in test_prospects:
-        prediction = ollama_ai.predict_selling_probability(prospect)
+    async for _, prospect, prediction, error, ms in prediction_executor.map(ollama_ai.predict_selling_probability, test_prospects):
+        prediction = prediction or ollama_ai.fallback_prediction(prospect)
         prospect.update({
             "prediction": f"{prediction['probability']}% dans {prediction['timeline']}",
             "confidence": prediction["confidence"],
             "score": prediction["probability"],
-            "ai_powered": True
+            "ai_powered": not prediction.get("fallback"),
+            "latency_ms": ms
         })
         predictions.append(prospect)
     
     return {"predictions": predictions}
 
+@app.post("/api/ai/predictions")
+async def post_ai_predictions(prospects: List[Dict]):
+    """Prédictions pour une liste de prospects quelconque (streaming NDJSON, ordre conservé)"""
+    if not ollama_ai or not await ollama_ai.is_available():
+        raise HTTPException(status_code=503, detail="IA non disponible")
+    return StreamingResponse(prediction_lines(prospects), media_type="application/x-ndjson")
+
+# Messages personnalisés en tâche de fond (jobs persistés, reprise au redémarrage)
+message_jobs = JobQueue(
+    "message",
+    lambda prospect: ollama_ai.generate_personalized_message(prospect),
+    JobStore(os.environ.get("JOBS_DB", "data/jobs.db")),
+    workers=int(os.environ.get("MESSAGE_WORKERS", 2)),
+)
+
+@app.post("/api/messages/jobs")
+async def create_message_job(prospects: List[Dict]):
+    """Lance la génération des messages d'un lot de prospects, renvoie l'id du job"""
+    if not ollama_ai:
+        raise HTTPException(status_code=503, detail="IA non disponible")
+    if not prospects:
+        raise HTTPException(status_code=400, detail="Aucun prospect")
+    job_id = message_jobs.submit(prospects)
+    return message_jobs.store.get(job_id)
+
+@app.get("/api/messages/jobs")
+async def list_message_jobs(limit: int = Query(20, ge=1, le=200)):
+    """Derniers jobs de messages"""
+    return {"jobs": message_jobs.store.recent(limit), **message_jobs.info()}
+
+@app.get("/api/messages/jobs/{job_id}")
+async def get_message_job(job_id: str):
+    """Statut et avancement d'un job"""
+    job = message_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu")
+    return job
+
+@app.get("/api/messages/jobs/{job_id}/results")
+async def get_message_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    """Messages déjà générés (les items en attente apparaissent sans message)"""
+    job = message_jobs.store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job inconnu")
+    return FastJSONResponse({"job": job, "items": message_jobs.store.items(job_id, offset, limit)})
+
+@app.post("/api/messages/stream")
+async def stream_message(prospect: Dict):
+    """Message personnalisé en streaming texte (premiers mots affichés sans attendre la fin)"""
+    if not ollama_ai:
+        raise HTTPException(status_code=503, detail="IA non disponible")
+    return StreamingResponse(ollama_ai.stream_personalized_message(prospect), media_type="text/plain; charset=utf-8")
+
+@app.post("/api/lookalikes")
+async def find_lookalikes(prospect: Dict, k: int = Query(10, ge=1, le=200)):
+    """Prospects stockés les plus proches d'un prospect de référence (ex: affaire conclue)"""
+    neighbors = await lookalikes.similar(prospect, k) if ollama_ai else None
+    if neighbors is None:
+        raise HTTPException(status_code=503, detail="Embeddings non disponibles")
+    stored = prospect_store.get_many([n["id"] for n in neighbors])
+    return FastJSONResponse({"prospects": [
+        {**(stored[n["id"]].to_dict() if n["id"] in stored else {"id": n["id"], "score": n["score"]}),
+         "similarity": n["similarity"]}
+        for n in neighbors
+    ]})
+
+@app.post("/api/lookalikes/estimate")
+async def estimate_scores(prospects: List[Dict], k: int = Query(10, ge=1, le=100), sort: bool = True):
+    """Score estimé par les k voisins (sans génération LLM), classement par score estimé"""
+    estimates = await lookalikes.estimate(prospects, k) if ollama_ai else None
+    if estimates is None:
+        raise HTTPException(status_code=503, detail="Embeddings non disponibles")
+    results = [{"index": i, "prospect": prospect, "estimate": estimate}
+               for i, (prospect, estimate) in enumerate(zip(prospects, estimates))]
+    if sort:
+        results.sort(key=lambda r: r["estimate"]["score"] if r["estimate"] else -1, reverse=True)
+    return FastJSONResponse({"results": results, "index": lookalikes.info()})
+
+@app.get("/api/lookalikes/info")
+async def lookalikes_info():
+    """État de l'index de similarité"""
+    return lookalikes.info()
+
+@app.post("/api/lookalikes/reindex")
+async def reindex_lookalikes():
+    """Indexe les prospects en base absents de l'index (ou dont la description a changé)"""
+    if not ollama_ai or not await ollama_ai.is_available():
+        raise HTTPException(status_code=503, detail="IA non disponible")
+    added = await lookalikes.add(prospect_store.iter())
+    return {"added": added, **lookalikes.info()}
+
 # Fonction DPE (réutilisée)
 async def fetch_real_dpe_data():
-    """DPE ADEME simplifié pour intégration"""
+    """DPE ADEME récents de la zone (table alimentée par modules.dpe_ingest)"""
+    recent = dpe_store.recent(limit=20)
+    if recent:
+        return [dpe_to_prospect(dpe) for dpe in recent]
+
+    # Pas encore d'ingestion: exemples de démonstration
     return [
         {
             "title": "Villa DPE récent - Jacou",
@@ -373,20 +441,102 @@ async def fetch_real_dpe_data():
         }
     ]
 
+@app.get("/api/rules")
+async def get_rules():
+    """Règles de scoring actives (rechargées à chaud quand le fichier change)"""
+    rules = lvi_rules.current()
+    return {**lvi_rules.info(), "rules": rules.raw, "criteria": rules.criteria_text().strip()}
+
+@app.post("/api/rules/reload")
+async def reload_rules():
+    """Recompile le fichier de règles sans attendre la détection de modification"""
+    if not lvi_rules.reload(force=True):
+        raise HTTPException(status_code=422, detail=f"Règles invalides: {lvi_rules.info()['error']}")
+    return lvi_rules.info()
+
+@app.on_event("startup")
+async def startup():
+    # Compilation des règles au démarrage: un fichier invalide empêche le lancement
+    lvi_rules.load()
+    if ollama_ai:
+        ollama_ai.health.start()
+        message_jobs.start()
+        # Préchargement du modèle puis maintien en mémoire tant que les scans sont planifiés
+        ollama_ai.warmer.start()
+    scan_snapshots.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    await scan_snapshots.stop()
+    if ninja_scraper:
+        await ninja_scraper.aclose()
+    if ollama_ai:
+        await message_jobs.stop()
+        await ollama_ai.warmer.stop()
+        await ollama_ai.health.stop()
+        await ollama_ai.aclose()
+
+def app_metrics():
+    """Métriques lues à l'export (état déjà tenu par le cache IA, le disjoncteur, le crawler...)"""
+    if ollama_ai:
+        if ollama_ai.cache:
+            cache = ollama_ai.cache.stats()
+            yield "lvi_ai_cache_hits_total", "counter", "Réponses IA servies par le cache", {}, cache["hits"]
+            yield "lvi_ai_cache_misses_total", "counter", "Réponses IA absentes du cache", {}, cache["misses"]
+            yield "lvi_ai_cache_entries", "gauge", "Entrées du cache IA", {}, cache["entries"]
+        yield "lvi_ollama_available", "gauge", "Ollama joignable (dernière sonde)", {}, int(bool(ollama_ai.health.available))
+        yield "lvi_ollama_breaker_open", "gauge", "Disjoncteur Ollama ouvert", {}, int(ollama_ai.breaker.state != "closed")
+        yield "lvi_ollama_breaker_trips_total", "counter", "Ouvertures du disjoncteur", {}, ollama_ai.breaker.trips
+        slots = ollama_ai.limiter.info()
+        yield "lvi_ollama_slots", "gauge", "Slots de génération (tous workers)", {}, slots["slots"]
+        yield "lvi_ollama_slots_in_use", "gauge", "Slots de génération occupés (tous workers)", {}, slots["in_use"]
+        yield "lvi_ollama_slot_wait_ms_total", "counter", "Attente cumulée d'un slot de génération", {}, slots["wait_ms"]
+        for load, latency in ollama_ai.first_token.snapshot().items():
+            if latency["p50_ms"] is not None:
+                yield "lvi_ollama_first_token_p50_ms", "gauge", "Latence médiane du premier token", {"load": load}, latency["p50_ms"]
+    if ninja_scraper:
+        for key, value in ninja_scraper.crawler.stats.items():
+            yield f"lvi_scraper_{key}_total", "counter", f"Crawler: {key}", {}, value
+    for key, value in prediction_executor.stats.items():
+        kind = "gauge" if key == "running" else "counter"
+        yield f"lvi_predictions_{key}{'' if kind == 'gauge' else '_total'}", kind, f"Prédictions: {key}", {}, value
+    yield "lvi_message_jobs_queued", "gauge", "Messages en attente de génération", {}, message_jobs.info()["queued"]
+    info = scan_snapshots.info()
+    yield "lvi_scan_snapshot_version", "gauge", "Version du snapshot de scan", {}, info["version"]
+    yield "lvi_scan_duration_ms", "gauge", "Durée du dernier calcul de scan", {}, info["duration_ms"]
+
+metrics.collector(app_metrics)
+
+@app.get("/metrics")
+def get_metrics():
+    """Métriques au format texte Prometheus (spans, compteurs IA, cache, crawler...)"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
-def health():
-    ai_status = "active" if ollama_ai and ollama_ai.is_available() else "fallback"
+async def health():
+    ai_status = "active" if ollama_ai and await ollama_ai.is_available() else "fallback"
     return {
         "status": "ok", 
         "message": "MARC ULTRA opérationnel ! 🚀",
         "ai_status": ai_status,
+        # Statistiques du cache IA et slots lus en SQLite: hors de la boucle d'événements
+        "ollama": await asyncio.to_thread(ollama_ai.status) if ollama_ai else None,
         "modules": {
             "scraper": ninja_scraper is not None,
             "ollama": ollama_ai is not None
-        }
+        },
+        "shared": await asyncio.to_thread(shared_state.info) if shared_state else None
     }
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.environ.get("PORT", 10000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+    if workers > 1:
+        # Workers lancés par uvicorn (ce script n'est pas réimporté dans chaque processus);
+        # sonde, préchauffage, scan et slots Ollama sont partagés entre eux
+        os.execvp(sys.executable, [sys.executable, "-m", "uvicorn", "main:app", "--host", "0.0.0.0",
+                                   "--port", str(port), "--workers", str(workers),
+                                   "--app-dir", os.path.dirname(os.path.abspath(__file__))])
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
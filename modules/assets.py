@@ -0,0 +1,124 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Mapping, Optional
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Fichiers versionnés (nom contenant le hash): contenu immuable, cache navigateur d'un an
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Page et noms non versionnés: revalidation à chaque chargement (304 si l'ETag n'a pas changé)
+REVALIDATE = "no-cache"
+
+_COMPRESSIBLE = ("text/", "application/javascript", "application/json", "image/svg+xml")
+
+# Encodages proposés, par ordre de préférence, et suffixe de l'ETag de la représentation
+_ENCODINGS = (("br", "br"), ("gzip", "gz"))
+
+
+class _Asset:
+    __slots__ = ("media_type", "cache_control", "bodies", "etags")
+
+    def __init__(self, data: bytes, media_type: str, cache_control: str):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        digest = hashlib.sha256(data).hexdigest()[:20]
+        self.bodies: Dict[str, bytes] = {"identity": data}
+        self.etags: Dict[str, str] = {"identity": f'"{digest}"'}
+        if not media_type.startswith(_COMPRESSIBLE):
+            return
+        compressed = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            compressed["br"] = brotli.compress(data, quality=11)
+        for encoding, suffix in _ENCODINGS:
+            body = compressed.get(encoding)
+            if body is not None and len(body) < len(data):
+                self.bodies[encoding] = body
+                self.etags[encoding] = f'"{digest}-{suffix}"'
+
+
+def _accepted(accept_encoding: str) -> set:
+    """Encodages acceptés par le client (q=0 exclu)"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class StaticAssets:
+    """Fichiers du tableau de bord chargés et compressés (gzip, brotli si disponible) une seule fois
+
+    Les fichiers autres que les pages HTML sont exposés sous un nom versionné par leur hash
+    (dashboard.css -> dashboard.<hash>.css), réécrit dans les pages: ils sont servis avec un cache
+    long, la page elle-même est revalidée par ETag fort (304 sans renvoyer le corps).
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static/"):
+        self.directory = directory
+        self.prefix = prefix
+        self.assets: Dict[str, _Asset] = {}
+        self.load()
+
+    def load(self):
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                with open(path, "rb") as f:
+                    files[os.path.relpath(path, self.directory).replace(os.sep, "/")] = f.read()
+
+        assets, versioned = {}, {}
+        for name, data in files.items():
+            if name.endswith(".html"):
+                continue
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            stem, ext = os.path.splitext(name)
+            fingerprinted = f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+            versioned[self.prefix + name] = self.prefix + fingerprinted
+            assets[fingerprinted] = _Asset(data, media_type, IMMUTABLE)
+            assets[name] = _Asset(data, media_type, REVALIDATE)
+
+        for name, data in files.items():
+            if not name.endswith(".html"):
+                continue
+            html = data.decode()
+            for url, fingerprinted in versioned.items():
+                html = html.replace(f'"{url}"', f'"{fingerprinted}"')
+            assets[name] = _Asset(html.encode(), "text/html", REVALIDATE)
+        self.assets = assets
+
+    def response(self, name: str, headers: Mapping[str, str]) -> Optional[Response]:
+        """Représentation négociée (Accept-Encoding) de l'asset, 304 si If-None-Match correspond"""
+        asset = self.assets.get(name)
+        if asset is None:
+            return None
+        accepted = _accepted(headers.get("accept-encoding", ""))
+        encoding = next((e for e, _ in _ENCODINGS if e in asset.bodies and e in accepted), "identity")
+        response_headers = {"ETag": asset.etags[encoding], "Cache-Control": asset.cache_control,
+                            "Vary": "Accept-Encoding"}
+        if_none_match = headers.get("if-none-match")
+        if if_none_match and _matches(if_none_match, asset.etags[encoding]):
+            return Response(status_code=304, headers=response_headers)
+        if encoding != "identity":
+            response_headers["Content-Encoding"] = encoding
+        return Response(asset.bodies[encoding], media_type=asset.media_type, headers=response_headers)
+
@@ -0,0 +1,106 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+_INT64_MAX = np.iinfo(np.int64).max
+_INT64_MIN = np.iinfo(np.int64).min
+
+# Taille à partir de laquelle le passage en colonnes bat rules.score() ligne à ligne (mémos chauds)
+BULK_MIN_SIZE = 2000
+
+
+def parse_fallback_price(value) -> int:
+    """Prix tel que lu par fallback_scoring (0 si illisible), borné à int64"""
+    try:
+        price = int(str(value).replace('€', '').replace(' ', ''))
+    except (TypeError, ValueError):
+        return 0
+    return max(_INT64_MIN, min(_INT64_MAX, price))
+
+
+class KeywordMatcher:
+    """Recherche de plusieurs mots-clés sur toute une colonne de textes, sans boucle par ligne
+
+    La colonne est vue comme une matrice de points de code (UTF-32, une ligne par texte,
+    complétée par des zéros); chaque mot-clé est cherché par comparaisons vectorisées
+    sur cette matrice aplatie.
+    """
+
+    def __init__(self, keywords: Sequence[str]):
+        self.keywords = list(keywords)
+        self._codes = [np.array([ord(c) for c in keyword], dtype=np.uint32) for keyword in self.keywords]
+
+    def match(self, texts) -> np.ndarray:
+        """Matrice booléenne (len(texts), len(keywords)): mot-clé présent dans le texte"""
+        texts = np.asarray(texts, dtype=str)
+        hits = np.zeros((len(texts), len(self.keywords)), dtype=bool)
+        width = texts.dtype.itemsize // 4
+        if not len(texts) or not width:
+            hits[:, [k for k, codes in enumerate(self._codes) if not len(codes)]] = True
+            return hits
+        flat = np.ascontiguousarray(texts).view(np.uint32).reshape(-1)
+        for k, codes in enumerate(self._codes):
+            size = len(codes)
+            if not size:
+                hits[:, k] = True
+                continue
+            if size > width:
+                continue
+            candidates = np.flatnonzero(flat[:len(flat) - size + 1] == codes[0])
+            for j in range(1, size):
+                candidates = candidates[flat[candidates + j] == codes[j]]
+            # Une occurrence ne doit pas déborder sur la ligne suivante
+            candidates = candidates[candidates % width <= width - size]
+            hits[candidates // width, k] = True
+        return hits
+
+
+def _factorize(values) -> Tuple[np.ndarray, List[str]]:
+    """(codes, textes): str(v).lower() de chaque valeur distincte, et son indice pour chaque ligne
+
+    Localisations et listes de signaux se répètent beaucoup: chaque valeur distincte n'est
+    convertie qu'une fois. Seules les chaînes et listes de chaînes sont regroupées (1 == True
+    mais str(1) != str(True)).
+    """
+    index: Dict = {}
+    texts: List[str] = []
+    codes = []
+    for value in values:
+        kind = type(value)
+        key = value if kind is str else tuple(value) if kind is list else None
+        try:
+            code = index.get(key) if key is not None else None
+        except TypeError:  # liste contenant des valeurs non hachables
+            key = code = None
+        if code is None:
+            code = len(texts)
+            texts.append(str(value).lower())
+            # Une clé n'est retenue que si elle ne contient que des chaînes (elle ne peut alors
+            # être égale qu'à une valeur de même texte)
+            if key is not None and (kind is str or all(type(item) is str for item in value)):
+                index[key] = code
+        codes.append(code)
+    return np.array(codes, dtype=np.intp), texts
+
+
+def prospect_columns(prospects: List[Dict]) -> Dict:
+    """Prospects -> colonnes: prix int64, localisation et signaux factorisés
+
+    location / signals: (codes, textes distincts en minuscules), textes[codes] = colonne complète.
+    """
+    prices = [p.get('price', '0') for p in prospects]
+    return {
+        # Cas courant (chaîne de chiffres tenant dans un int64) sans passer par parse_fallback_price
+        'price': np.array([int(v) if type(v) is str and v.isdecimal() and len(v) < 19 else parse_fallback_price(v)
+                           for v in prices], dtype=np.int64),
+        'location': _factorize([p.get('location', '') for p in prospects]),
+        'signals': _factorize([p.get('signals', []) for p in prospects]),
+    }
+
+
+def bulk_fallback_scores(prospects: List[Dict], rules) -> List[int]:
+    """Équivalent de [rules.score(p) for p in prospects], en une passe vectorisée"""
+    if not prospects:
+        return []
+    columns = prospect_columns(prospects)
+    return rules.score_columns(columns['price'], columns['location'], columns['signals']).tolist()
@@ -0,0 +1,171 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+from modules.db import connect
+
+# Clés par requête SELECT ... IN de get_many
+GET_MANY_CHUNK = 500
+
+# Champs utilisés par chaque prompt (seuls eux entrent dans la clé)
+CACHE_FIELDS = {
+    "score": ("name", "title", "location", "address", "price", "source", "signals", "reason"),
+    "message": ("name", "title", "company", "signals"),
+    "prediction": ("location", "property_type", "signals", "source", "score"),
+}
+
+
+def normalize_value(field: str, value):
+    """Normalise une valeur pour que deux saisies équivalentes aient la même clé"""
+    if value is None:
+        return ""
+    if field == "price":
+        return re.sub(r'\D', '', str(value))
+    if isinstance(value, (list, tuple, set)):
+        return sorted(normalize_value(field, v) for v in value)
+    return " ".join(str(value).lower().split())
+
+
+def prospect_key(kind: str, prospect: Dict, model: str, prompt_version: str) -> str:
+    """Hash stable des champs normalisés + version du prompt + modèle"""
+    fields = {f: normalize_value(f, prospect.get(f)) for f in CACHE_FIELDS[kind]}
+    raw = json.dumps([kind, model, prompt_version, fields], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class ScoreCache:
+    """Cache disque SQLite (WAL) des scores, prédictions et messages IA"""
+
+    def __init__(self, path: str = "data/lvi_cache.db", ttl: float = 7 * 24 * 3600,
+                 max_entries: int = 50000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS ai_cache (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_ai_cache_accessed ON ai_cache(accessed)")
+        return self._conn
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute("SELECT value, created FROM ai_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self.conn.execute("DELETE FROM ai_cache WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE ai_cache SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, kind: str, model: str, value):
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO ai_cache (key, kind, model, value, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, kind, model, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._puts += 1
+            if self._puts % 100 == 0:
+                self._evict()
+
+    def get_many(self, keys: Iterable[str]) -> Dict:
+        """Valeurs en cache d'un lot de clés (absentes ou expirées omises), en quelques requêtes"""
+        keys = list(dict.fromkeys(keys))
+        now = time.time()
+        found, expired = {}, []
+        with self._lock:
+            for start in range(0, len(keys), GET_MANY_CHUNK):
+                chunk = keys[start:start + GET_MANY_CHUNK]
+                rows = self.conn.execute(
+                    f"SELECT key, value, created FROM ai_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                for key, value, created in rows:
+                    if now - created > self.ttl:
+                        expired.append((key,))
+                    else:
+                        found[key] = json.loads(value)
+            if expired:
+                self.conn.executemany("DELETE FROM ai_cache WHERE key = ?", expired)
+            if found:
+                self.conn.executemany("UPDATE ai_cache SET accessed = ? WHERE key = ?", [(now, k) for k in found])
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: List[Tuple[str, str, str, object]]):
+        """Enregistre un lot de (clé, type, modèle, valeur) en une transaction"""
+        if not items:
+            return
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO ai_cache (key, kind, model, value, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                [(key, kind, model, json.dumps(value, ensure_ascii=False), now, now) for key, kind, model, value in items],
+            )
+            self.conn.execute("COMMIT")
+            before, self._puts = self._puts, self._puts + len(items)
+            if self._puts // 100 != before // 100:
+                self._evict()
+
+    def _evict(self):
+        """Expire par TTL puis garde les max_entries plus récemment lues (LRU)"""
+        cur = self.conn.execute("DELETE FROM ai_cache WHERE created < ?", (time.time() - self.ttl,))
+        self.evictions += cur.rowcount
+        cur = self.conn.execute(
+            "DELETE FROM ai_cache WHERE key IN "
+            "(SELECT key FROM ai_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.evictions += cur.rowcount
+
+    def invalidate(self, model: Optional[str] = None, keep_models: Iterable[str] = ()):
+        """Supprime les entrées d'un modèle, ou de tous sauf keep_models"""
+        with self._lock:
+            if model is not None:
+                self.conn.execute("DELETE FROM ai_cache WHERE model = ?", (model,))
+            else:
+                keep = list(keep_models)
+                marks = ",".join("?" * len(keep)) or "''"
+                self.conn.execute(f"DELETE FROM ai_cache WHERE model NOT IN ({marks})", keep)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            size = self.conn.execute("SELECT COUNT(*) FROM ai_cache").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "entries": size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlsplit
+from urllib.robotparser import RobotFileParser
+
+import httpx
+from modules.db import connect
+from modules.metrics import span
+
+
+class ResponseCache:
+    """Cache HTTP local (ETag / Last-Modified) + résultat du parsing par URL"""
+
+    def __init__(self, path: str = "data/http_cache.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS http_cache (
+                    url TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    body BLOB NOT NULL,
+                    parsed TEXT,
+                    fetched_at REAL NOT NULL
+                )""")
+        return self._conn
+
+    def get(self, url: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, body, parsed FROM http_cache WHERE url = ?", (url,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "body": row[2],
+                "parsed": json.loads(row[3]) if row[3] else None}
+
+    def put(self, url: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO http_cache (url, etag, last_modified, body, parsed, fetched_at) "
+                "VALUES (?, ?, ?, ?, NULL, ?)",
+                (url, etag, last_modified, body, time.time()),
+            )
+
+    def put_parsed(self, url: str, parsed):
+        with self._lock:
+            self.conn.execute("UPDATE http_cache SET parsed = ? WHERE url = ?",
+                              (json.dumps(parsed, ensure_ascii=False), url))
+
+
+class CrawlResult:
+    """Page récupérée; changed=False si le serveur a répondu 304"""
+
+    def __init__(self, url: str, status: int, body: bytes, changed: bool, parsed=None):
+        self.url = url
+        self.status = status
+        self.body = body
+        self.changed = changed
+        self.parsed = parsed  # parsing en cache si la page n'a pas changé
+
+    @property
+    def text(self) -> str:
+        return self.body.decode("utf-8", errors="replace")
+
+
+class CrawlReport:
+    """Bilan d'un appel à crawl(): complet si la frontière a été vidée sans page bloquée ni en erreur"""
+
+    def __init__(self):
+        self.items: List = []
+        self.pages = 0
+        self.blocked = 0
+        self.errors = 0
+        self.truncated = 0  # URLs restées dans la frontière (max_pages atteint)
+
+    @property
+    def complete(self) -> bool:
+        return not (self.blocked or self.errors or self.truncated)
+
+
+class AsyncCrawler:
+    """Crawler async poli: concurrence bornée, débit par hôte, keep-alive, requêtes conditionnelles"""
+
+    def __init__(self, concurrency: int = 8, per_host_delay: float = 1.0, timeout: float = 10.0,
+                 cache: Optional[ResponseCache] = None, user_agent: str = "MARC-LVI-Bot/1.0",
+                 respect_robots: bool = True):
+        self.concurrency = concurrency
+        self.per_host_delay = per_host_delay
+        self.timeout = timeout
+        self.cache = cache
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.stats = {"requests": 0, "fetched": 0, "not_modified": 0, "errors": 0,
+                      "blocked": 0, "bytes_downloaded": 0, "bytes_saved": 0}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._host_locks: Dict[str, asyncio.Lock] = {}
+        self._host_next: Dict[str, float] = {}
+        self._robots: Dict[str, Optional[RobotFileParser]] = {}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                headers={"User-Agent": self.user_agent},
+                limits=httpx.Limits(max_connections=self.concurrency, max_keepalive_connections=self.concurrency),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _wait_turn(self, host: str):
+        """Espace les requêtes vers un même hôte d'au moins per_host_delay"""
+        lock = self._host_locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            delay = self._host_next.get(host, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._host_next[host] = time.monotonic() + self.per_host_delay
+
+    async def _allowed(self, url: str) -> bool:
+        if not self.respect_robots:
+            return True
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self._robots:
+            parser = None
+            try:
+                response = await self.client.get(f"{origin}/robots.txt")
+                if response.status_code == 200:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+            except httpx.HTTPError:
+                pass
+            self._robots[origin] = parser
+        parser = self._robots[origin]
+        return parser is None or parser.can_fetch(self.user_agent, url)
+
+    async def fetch(self, url: str, report: Optional[CrawlReport] = None) -> Optional[CrawlResult]:
+        """GET conditionnel; None si interdit par robots.txt ou en erreur (compté aussi dans report)"""
+        client = self.client
+        if not await self._allowed(url):
+            self.stats["blocked"] += 1
+            if report is not None:
+                report.blocked += 1
+            return None
+        cached = self.cache.get(url) if self.cache else None
+        headers = {}
+        if cached:
+            if cached["etag"]:
+                headers["If-None-Match"] = cached["etag"]
+            if cached["last_modified"]:
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        async with self._semaphore:
+            await self._wait_turn(urlsplit(url).netloc)
+            self.stats["requests"] += 1
+            try:
+                with span("scraper.fetch"):
+                    response = await client.get(url, headers=headers)
+            except httpx.HTTPError as e:
+                print(f"Erreur crawl {url}: {e}")
+                self.stats["errors"] += 1
+                if report is not None:
+                    report.errors += 1
+                return None
+
+        if response.status_code == 304 and cached:
+            self.stats["not_modified"] += 1
+            self.stats["bytes_saved"] += len(cached["body"])
+            return CrawlResult(url, 304, cached["body"], changed=False, parsed=cached["parsed"])
+        if response.status_code != 200:
+            self.stats["errors"] += 1
+            if report is not None:
+                report.errors += 1
+            return None
+
+        body = response.content
+        self.stats["fetched"] += 1
+        self.stats["bytes_downloaded"] += len(body)
+        if self.cache:
+            self.cache.put(url, response.headers.get("etag"), response.headers.get("last-modified"), body)
+        return CrawlResult(url, 200, body, changed=True)
+
+    async def crawl(self, start_urls: List[str], parse, max_pages: int = 50) -> CrawlReport:
+        """Parcourt les pages (et leurs suivantes) en parallèle, parse uniquement les pages modifiées
+
+        parse(result) -> (éléments, URLs suivantes); le résultat est gardé en cache avec la page.
+        Le bilan est propre à l'appel (crawls simultanés sur le même crawler indépendants).
+        """
+        report = CrawlReport()
+        seen = set()
+        pending = list(dict.fromkeys(start_urls))
+        while pending:
+            if len(seen) >= max_pages:
+                report.truncated = len(pending)
+                break
+            batch = pending[:max_pages - len(seen)]
+            frontier = pending[len(batch):]
+            seen.update(batch)
+            results = await asyncio.gather(*(self.fetch(u, report) for u in batch))
+            for result in results:
+                if result is None:
+                    continue
+                report.pages += 1
+                if result.parsed is None:
+                    with span("scraper.parse"):
+                        page_items, next_urls = parse(result)
+                    result.parsed = [page_items, [urljoin(result.url, u) for u in next_urls]]
+                    if self.cache:
+                        self.cache.put_parsed(result.url, result.parsed)
+                report.items.extend(result.parsed[0])
+                frontier.extend(result.parsed[1])
+            pending = [u for u in dict.fromkeys(frontier) if u not in seen]
+        return report
@@ -0,0 +1,140 @@
+import math
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+from modules.prospect import Prospect
+from modules.zone import normalize_text
+
+# Tolérances de matching; les bandes de blocage sont logarithmiques de même largeur,
+# deux biens compatibles tombent donc toujours dans des bandes voisines
+PRICE_TOLERANCE = 0.02
+SURFACE_TOLERANCE = 0.05
+ADDRESS_SIMILARITY = 0.5
+
+_STOPWORDS = {"rue", "avenue", "av", "bd", "boulevard", "chemin", "impasse", "place", "de", "des", "du",
+              "la", "le", "les", "l", "d", "proche", "centre"}
+
+
+def address_tokens(prospect: Prospect) -> Tuple[Set[str], Set[str]]:
+    """(mots significatifs, numéros de rue) de l'adresse normalisée"""
+    words = normalize_text(prospect.address).split()
+    tokens = {t for t in words if t not in _STOPWORDS and not (t.isdigit() and len(t) < 5)}
+    numbers = {t for t in words if t.isdigit() and len(t) < 5}
+    return tokens, numbers
+
+
+class _Entity:
+    __slots__ = ("prospect", "insee", "price", "surface", "tokens", "numbers")
+
+    def __init__(self, prospect: Prospect):
+        self.prospect = prospect
+        self.insee = prospect.insee
+        self.price = prospect.price
+        self.surface = prospect.surface
+        self.tokens, self.numbers = address_tokens(prospect)
+
+
+class EntityResolver:
+    """Résolution d'entités incrémentale: blocage commune + prix + surface, puis matching fin
+
+    Chaque prospect n'est comparé qu'aux entités des blocs voisins, d'où un coût
+    quasi linéaire en nombre de prospects.
+    """
+
+    def __init__(self):
+        # (insee, bande prix) -> bande surface (None si inconnue) -> entités
+        self.blocks: Dict[Tuple[str, int], Dict[Optional[int], List[_Entity]]] = defaultdict(lambda: defaultdict(list))
+        self.entities = 0
+        self.merged = 0
+
+    def _describe(self, prospect: Prospect) -> Optional[_Entity]:
+        if prospect.insee is None or not prospect.price:
+            return None
+        return _Entity(prospect)
+
+    def _price_band(self, price: int) -> int:
+        return int(math.log(price) / math.log1p(PRICE_TOLERANCE))
+
+    def _surface_band(self, surface: Optional[float]) -> Optional[int]:
+        if not surface:
+            return None
+        return int(math.log(surface) / math.log1p(SURFACE_TOLERANCE))
+
+    def _candidates(self, entity: _Entity) -> List[_Entity]:
+        price_band = self._price_band(entity.price)
+        surface_band = self._surface_band(entity.surface)
+        candidates = []
+        for band in (price_band - 1, price_band, price_band + 1):
+            block = self.blocks.get((entity.insee, band))
+            if not block:
+                continue
+            if surface_band is None:
+                # Surface inconnue: compatible avec toutes les surfaces du bloc
+                for entities in block.values():
+                    candidates.extend(entities)
+            else:
+                for sub in (surface_band - 1, surface_band, surface_band + 1, None):
+                    candidates.extend(block.get(sub, ()))
+        return candidates
+
+    def _match(self, a: _Entity, b: _Entity) -> bool:
+        if abs(a.price - b.price) > PRICE_TOLERANCE * max(a.price, b.price):
+            return False
+        if a.surface and b.surface:
+            if abs(a.surface - b.surface) > SURFACE_TOLERANCE * max(a.surface, b.surface):
+                return False
+        # Deux numéros de rue différents: biens distincts
+        if a.numbers and b.numbers and not a.numbers & b.numbers:
+            return False
+        union = a.tokens | b.tokens
+        return bool(union) and len(a.tokens & b.tokens) / len(union) >= ADDRESS_SIMILARITY
+
+    def add(self, prospect: Prospect) -> Tuple[Prospect, bool]:
+        """(prospect canonique, nouveau?) — un doublon est fusionné dans le canonique"""
+        entity = self._describe(prospect)
+        if entity is not None:
+            for candidate in self._candidates(entity):
+                if self._match(entity, candidate):
+                    merge_into(candidate.prospect, prospect)
+                    if candidate.surface is None:
+                        candidate.surface = entity.surface
+                    self.merged += 1
+                    return candidate.prospect, False
+            block = self.blocks[(entity.insee, self._price_band(entity.price))]
+            block[self._surface_band(entity.surface)].append(entity)
+        if prospect.sources is None:
+            prospect.sources = [prospect.source or 'Veille']
+        self.entities += 1
+        return prospect, True
+
+
+def merge_into(canonical: Prospect, duplicate: Prospect):
+    """Fusionne un doublon: sources et signaux cumulés, champs manquants complétés"""
+    if canonical.sources is None:
+        canonical.sources = [canonical.source or 'Veille']
+    if duplicate.source and duplicate.source not in canonical.sources:
+        canonical.sources.append(duplicate.source)
+    signals = list(canonical.signals or [])
+    for signal in list(duplicate.signals or []) + [duplicate.reason]:
+        if signal and signal not in signals and signal != canonical.reason:
+            signals.append(signal)
+    if signals:
+        canonical.signals = signals
+    for name in _FILLABLE:
+        if getattr(canonical, name) in (None, '', 0) and getattr(duplicate, name) not in (None, '', 0):
+            setattr(canonical, name, getattr(duplicate, name))
+    if duplicate.extra:
+        extra = canonical.extra or {}
+        for key, value in duplicate.extra.items():
+            if key not in extra and value not in (None, ''):
+                extra[key] = value
+        canonical.extra = extra
+
+
+# Champs complétés depuis un doublon quand ils manquent au canonique
+_FILLABLE = ("title", "address", "insee", "commune", "price", "surface", "score", "reason", "type", "date", "url")
+
+
+def resolve(prospects: List[Prospect]) -> List[Prospect]:
+    """Dédoublonne une liste complète (ordre d'arrivée conservé)"""
+    resolver = EntityResolver()
+    return [p for p in prospects if resolver.add(p)[1]]
@@ -0,0 +1,250 @@
+"""Ingestion en flux des dumps DPE ADEME, filtrée sur ZONE_EMMANUEL
+
+Usage: python -m modules.dpe_ingest dpe-logements.csv.gz [autres dumps...] [--db data/dpe.db]
+"""
+import argparse
+import csv
+import gzip
+import hashlib
+import io
+import json
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+from modules.db import connect
+from modules.zone import ZONE_EMMANUEL
+
+# Colonnes ADEME (export CSV "dpe-v2-logements-existants" puis noms de l'API data-fair)
+COLUMN_ALIASES = {
+    "numero": ("N°DPE", "numero_dpe"),
+    "date": ("Date_réception_DPE", "date_reception_dpe"),
+    "insee": ("Code_INSEE_(BAN)", "code_insee_ban"),
+    "address": ("Adresse_(BAN)", "adresse_ban", "Adresse_brute", "adresse_brut"),
+    "etiquette": ("Etiquette_DPE", "etiquette_dpe"),
+    "surface": ("Surface_habitable_logement", "surface_habitable_logement"),
+    "type": ("Type_bâtiment", "type_batiment"),
+}
+
+BATCH_SIZE = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dpe (
+    numero TEXT PRIMARY KEY,
+    date_reception TEXT NOT NULL,
+    insee TEXT NOT NULL,
+    address TEXT,
+    etiquette TEXT,
+    surface REAL,
+    type_batiment TEXT,
+    row_hash TEXT NOT NULL,
+    ingested_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_dpe_insee_date ON dpe(insee, date_reception DESC);
+CREATE INDEX IF NOT EXISTS idx_dpe_date ON dpe(date_reception DESC);
+CREATE TABLE IF NOT EXISTS dpe_watermark (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    date_reception TEXT NOT NULL
+);
+"""
+
+
+def open_dump(path: str) -> io.TextIOBase:
+    """Flux texte bufferisé (gzip décompressé à la volée)"""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="", buffering=1 << 20)
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, int]:
+    index = {name.strip().lstrip("\ufeff"): i for i, name in enumerate(header)}
+    columns = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in index:
+                columns[field] = index[alias]
+                break
+    missing = {"numero", "date", "insee"} - set(columns)
+    if missing:
+        raise ValueError(f"Colonnes DPE manquantes: {', '.join(sorted(missing))}")
+    return columns
+
+
+def iter_csv_rows(stream: io.TextIOBase, zone: Iterable[str]) -> Iterator[Dict]:
+    """Lignes CSV de la zone; le filtre INSEE passe avant toute conversion"""
+    first = stream.readline()
+    delimiter = ";" if first.count(";") > first.count(",") else ","
+    columns = _resolve_columns(next(csv.reader([first], delimiter=delimiter)))
+    zone = set(zone)
+    insee_col = columns["insee"]
+    width = max(columns.values()) + 1
+    for row in csv.reader(stream, delimiter=delimiter):
+        if len(row) < width or row[insee_col] not in zone:
+            continue
+        yield {field: row[i] for field, i in columns.items()}
+
+
+def iter_jsonl_rows(stream: io.TextIOBase, zone: Iterable[str]) -> Iterator[Dict]:
+    zone = set(zone)
+    columns = None
+    for line in stream:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if columns is None:
+            columns = {field: next((a for a in aliases if a in record), None)
+                       for field, aliases in COLUMN_ALIASES.items()}
+        if record.get(columns["insee"]) not in zone:
+            continue
+        yield {field: record.get(key) for field, key in columns.items() if key}
+
+
+def _surface(value) -> Optional[float]:
+    try:
+        return float(str(value).replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+class DPEStore:
+    """Table locale indexée des DPE de la zone"""
+
+    def __init__(self, path: str = "data/dpe.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    @property
+    def watermark(self) -> str:
+        row = self.conn.execute("SELECT date_reception FROM dpe_watermark WHERE id = 1").fetchone()
+        return row[0] if row else ""
+
+    def ingest(self, rows: Iterable[Dict], full: bool = False) -> Dict:
+        """Upsert par lots des DPE nouveaux ou modifiés depuis le dernier watermark"""
+        stored = self.watermark
+        watermark = "" if full else stored
+        stats = {"rows": 0, "written": 0, "skipped_old": 0}
+        newest = stored
+        batch = []
+        now = time.time()
+        for row in rows:
+            stats["rows"] += 1
+            reception = (row.get("date") or "")[:10]
+            # Égalité gardée: un DPE du même jour peut arriver dans le dump suivant
+            if reception < watermark:
+                stats["skipped_old"] += 1
+                continue
+            newest = max(newest, reception)
+            values = (
+                row["numero"], reception, row["insee"], row.get("address"), row.get("etiquette"),
+                _surface(row.get("surface")), row.get("type"),
+            )
+            row_hash = hashlib.sha1(repr(values).encode()).hexdigest()
+            batch.append(values + (row_hash, now))
+            if len(batch) >= BATCH_SIZE:
+                stats["written"] += self._write(batch)
+                batch = []
+        if batch:
+            stats["written"] += self._write(batch)
+        if newest > stored:
+            with self._lock:
+                self.conn.execute("INSERT OR REPLACE INTO dpe_watermark (id, date_reception) VALUES (1, ?)", (newest,))
+        stats["watermark"] = newest
+        return stats
+
+    def _write(self, batch: List[tuple]) -> int:
+        with self._lock:
+            before = self.conn.total_changes
+            self.conn.execute("BEGIN")
+            self.conn.executemany("""
+                INSERT INTO dpe (numero, date_reception, insee, address, etiquette, surface, type_batiment, row_hash, ingested_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(numero) DO UPDATE SET
+                    date_reception = excluded.date_reception,
+                    insee = excluded.insee,
+                    address = excluded.address,
+                    etiquette = excluded.etiquette,
+                    surface = excluded.surface,
+                    type_batiment = excluded.type_batiment,
+                    row_hash = excluded.row_hash,
+                    ingested_at = excluded.ingested_at
+                WHERE dpe.row_hash != excluded.row_hash
+            """, batch)
+            self.conn.execute("COMMIT")
+            return self.conn.total_changes - before
+
+    def ingest_file(self, path: str, zone: Iterable[str] = ZONE_EMMANUEL, full: bool = False) -> Dict:
+        with open_dump(path) as stream:
+            base = path[:-3] if path.endswith(".gz") else path
+            rows = iter_jsonl_rows(stream, zone) if base.endswith((".jsonl", ".ndjson")) else iter_csv_rows(stream, zone)
+            return self.ingest(rows, full)
+
+    def recent(self, limit: int = 20, insee: Optional[str] = None) -> List[Dict]:
+        """DPE les plus récents (index insee/date)"""
+        sql = "SELECT numero, date_reception, insee, address, etiquette, surface, type_batiment FROM dpe"
+        params: list = []
+        if insee:
+            sql += " WHERE insee = ?"
+            params.append(insee)
+        sql += " ORDER BY date_reception DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        keys = ("numero", "date_reception", "insee", "address", "etiquette", "surface", "type_batiment")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM dpe").fetchone()[0]
+
+
+def dpe_to_prospect(dpe: Dict, today: Optional[date] = None) -> Dict:
+    """DPE stocké -> prospect du scan (score selon la fraîcheur du DPE)"""
+    today = today or date.today()
+    try:
+        days = (today - datetime.strptime(dpe["date_reception"], "%Y-%m-%d").date()).days
+    except ValueError:
+        days = 365
+    score = 92 if days <= 7 else 85 if days <= 30 else 75 if days <= 90 else 60
+    commune = ZONE_EMMANUEL.get(dpe["insee"], dpe["insee"])
+    kind = "Maison" if (dpe.get("type_batiment") or "").lower().startswith("maison") else "Appartement"
+    surface = f" {dpe['surface']:.0f}m²" if dpe.get("surface") else ""
+    return {
+        "title": f"{kind} DPE {dpe.get('etiquette') or '?'} - {commune}",
+        "address": dpe.get("address") or commune,
+        "score": score,
+        "date": "Aujourd'hui" if days <= 0 else f"Il y a {days} jour{'s' if days > 1 else ''}",
+        "type": f"{kind}{surface}",
+        "reason": "DPE = intention vente",
+        "dpe": dpe["numero"],
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Ingestion dumps DPE ADEME (zone Emmanuel)")
+    parser.add_argument("files", nargs="+", help="Dumps CSV/JSONL, éventuellement .gz")
+    parser.add_argument("--db", default="data/dpe.db")
+    parser.add_argument("--full", action="store_true", help="Ignore le watermark (réingestion complète)")
+    args = parser.parse_args(argv)
+
+    store = DPEStore(args.db)
+    for path in args.files:
+        start = time.monotonic()
+        stats = store.ingest_file(path, full=args.full)
+        elapsed = time.monotonic() - start
+        print(f"{path}: {stats['rows']} lignes zone, {stats['written']} écrites, "
+              f"{stats['skipped_old']} antérieures au watermark, {elapsed:.1f}s "
+              f"(watermark {stats['watermark'] or '-'})")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,367 @@
+import asyncio
+import hashlib
+import os
+import sqlite3
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from modules.db import connect
+from modules.prospect import Prospect
+from modules.store import prospect_id
+
+# embed(textes) -> vecteurs, None si le service d'embeddings est indisponible
+Embedder = Callable[[List[str]], Awaitable[Optional[List[List[float]]]]]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    score INTEGER NOT NULL,
+    active INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_vectors_id ON vectors(id) WHERE active = 1;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+# Recherche exacte en dessous, index approximatif (IVF) au-delà
+APPROX_MIN = 20000
+# Listes IVF explorées par requête
+NPROBE = 8
+# Requêtes traitées par produit matriciel (borne la mémoire des similarités)
+QUERY_CHUNK = 256
+
+
+def describe(prospect: Prospect) -> str:
+    """Texte embarqué: nature du bien, localisation, prix, source, raison et signaux"""
+    parts = [prospect.title, prospect.type, prospect.commune or prospect.address,
+             f"{prospect.price} €" if prospect.price else None, prospect.source, prospect.reason]
+    parts += prospect.signals or []
+    return " | ".join(str(part) for part in parts if part)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _top_k(sims: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions, similarités) des k meilleures colonnes de chaque ligne, triées"""
+    k = min(k, sims.shape[1])
+    part = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+    part_sims = np.take_along_axis(sims, part, axis=1)
+    order = np.argsort(-part_sims, axis=1)
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_sims, order, axis=1)
+
+
+class IVFIndex:
+    """Index approximatif: k-means grossier, recherche limitée aux nprobe listes les plus proches
+
+    Les lignes ajoutées ensuite sont rangées dans la liste de leur centroïde le plus proche;
+    les centroïdes ne sont réentraînés qu'à la reconstruction.
+    """
+
+    def __init__(self, matrix: np.ndarray, rows: np.ndarray, iterations: int = 8, seed: int = 0):
+        rng = np.random.default_rng(seed)
+        self.nlist = max(1, int(np.sqrt(len(rows))))
+        self.trained_on = len(rows)
+        sample = np.asarray(matrix[np.sort(rng.choice(rows, min(len(rows), self.nlist * 64), replace=False))])
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = np.bincount(assign, minlength=self.nlist) > 0
+            centroids[filled] = _normalize(sums[filled])
+        self.centroids = centroids
+        self.lists: List[np.ndarray] = [np.zeros(0, dtype=np.int64) for _ in range(self.nlist)]
+        self.extend(matrix, rows)
+
+    def extend(self, matrix: np.ndarray, rows: np.ndarray):
+        for start in range(0, len(rows), 8192):
+            chunk = rows[start:start + 8192]
+            assign = np.argmax(np.asarray(matrix[chunk]) @ self.centroids.T, axis=1)
+            for c in np.unique(assign):
+                self.lists[c] = np.concatenate([self.lists[c], chunk[assign == c]])
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        return np.sort(np.concatenate([self.lists[c] for c in probes]))
+
+
+class EmbeddingIndex:
+    """Index de prospects similaires: matrice float32 contiguë (memmap) + table d'identifiants SQLite
+
+    - vectors.f32: une ligne normalisée par embedding, fichier en ajout seul
+    - index.db: ligne -> identifiant prospect, empreinte du texte, score, ligne active
+    Un prospect dont la description change reçoit une nouvelle ligne, l'ancienne est désactivée;
+    un simple changement de score ne recalcule pas l'embedding.
+    """
+
+    def __init__(self, path: str = "data/embeddings", embed: Optional[Embedder] = None, model: str = "",
+                 approx_min: int = APPROX_MIN, nprobe: int = NPROBE):
+        self.path = path
+        self.embed = embed
+        self.model = model
+        self.approx_min = approx_min
+        self.nprobe = nprobe
+        self.dim: Optional[int] = None
+        self.matrix: Optional[np.ndarray] = None
+        self.ids: List[str] = []
+        self.scores = np.zeros(0, dtype=np.int32)
+        self.active = np.zeros(0, dtype=bool)
+        self.rows: Dict[str, Tuple[int, str]] = {}  # id -> (ligne active, empreinte)
+        self.ivf: Optional[IVFIndex] = None
+        self._conn: Optional[sqlite3.Connection] = None
+        # Index modifié (ajouts, entraînement de l'IVF) ou lu par une recherche: un seul à la fois
+        self._lock = asyncio.Lock()
+        self._embedding: Dict[str, str] = {}  # id -> empreinte en cours d'embedding
+
+    @property
+    def vectors_path(self) -> str:
+        return os.path.join(self.path, "vectors.f32")
+
+    def open(self) -> sqlite3.Connection:
+        """Charge la table d'identifiants et mappe la matrice (une seule fois)"""
+        if self._conn is None:
+            self._conn = connect(os.path.join(self.path, "index.db"))
+            self._conn.executescript(SCHEMA)
+            self._load()
+        return self._conn
+
+    def _load(self):
+        meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+        if meta.get("model", self.model) != self.model:
+            # Autre modèle d'embedding: vecteurs incomparables
+            self._reset()
+            return
+        self.dim = int(meta["dim"]) if "dim" in meta else None
+        rows = self._conn.execute("SELECT row, id, digest, score, active FROM vectors ORDER BY row").fetchall()
+        stored = os.path.getsize(self.vectors_path) // (4 * self.dim) if self.dim and os.path.exists(self.vectors_path) else 0
+        count = min(len(rows), stored)
+        if count < len(rows):
+            # Arrêt entre l'écriture des vecteurs et celle des identifiants: lignes orphelines retirées
+            self._conn.execute("DELETE FROM vectors WHERE row >= ?", (count,))
+            rows = rows[:count]
+        if self.dim and stored > count:
+            os.truncate(self.vectors_path, count * 4 * self.dim)
+        self.ids = [row[1] for row in rows]
+        self.scores = np.array([row[3] for row in rows], dtype=np.int32)
+        self.active = np.array([bool(row[4]) for row in rows], dtype=bool)
+        self.rows = {row[1]: (row[0], row[2]) for row in rows if row[4]}
+        self._map()
+
+    def _reset(self):
+        self._conn.execute("DELETE FROM vectors")
+        self._conn.execute("DELETE FROM meta")
+        self._conn.execute("INSERT INTO meta (key, value) VALUES ('model', ?)", (self.model,))
+        if os.path.exists(self.vectors_path):
+            os.remove(self.vectors_path)
+        self.dim = None
+        self.ids = []
+        self.scores = np.zeros(0, dtype=np.int32)
+        self.active = np.zeros(0, dtype=bool)
+        self.rows = {}
+        self.matrix = None
+        self.ivf = None
+
+    def _map(self):
+        count = len(self.ids)
+        self.matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, self.dim)) if count else None
+
+    def __len__(self) -> int:
+        self.open()
+        return len(self.rows)
+
+    def _pending(self, prospects: Iterable) -> Dict[str, Tuple[str, int, str]]:
+        """Prospects à embarquer (nouveaux ou description modifiée); met à jour les scores des autres"""
+        self.open()
+        pending: Dict[str, Tuple[str, int, str]] = {}
+        for prospect in map(Prospect.from_dict, prospects):
+            pid = prospect_id(prospect)
+            text = describe(prospect)
+            digest = hashlib.sha1(text.encode()).hexdigest()[:16]
+            current = self.rows.get(pid)
+            if current and current[1] == digest:
+                if self.scores[current[0]] != prospect.score:
+                    self.scores[current[0]] = prospect.score
+                    self._conn.execute("UPDATE vectors SET score = ? WHERE row = ?", (prospect.score, current[0]))
+                continue
+            if self._embedding.get(pid) == digest:
+                continue  # déjà en cours d'embedding par un autre add()
+            pending[pid] = (digest, prospect.score, text)
+        return pending
+
+    async def add(self, prospects: Iterable) -> int:
+        """Ajout incrémental: n'embarque que les prospects nouveaux ou dont la description a changé"""
+        async with self._lock:
+            pending = await asyncio.to_thread(self._pending, prospects)
+            for pid, (digest, _, _) in pending.items():
+                self._embedding[pid] = digest
+        try:
+            return await self._insert(pending)
+        finally:
+            for pid, (digest, _, _) in pending.items():
+                if self._embedding.get(pid) == digest:
+                    del self._embedding[pid]
+
+    async def _insert(self, pending: Dict[str, Tuple[str, int, str]]) -> int:
+        if not pending or self.embed is None:
+            return 0
+        todo = [(pid, digest, score) for pid, (digest, score, _) in pending.items()]
+        vectors = await self.embed([text for _, _, text in pending.values()])
+        if vectors is None or len(vectors) == 0:
+            return 0
+
+        async with self._lock:
+            matrix = _normalize(np.asarray(vectors, dtype=np.float32))
+            if self.dim is not None and matrix.shape[1] != self.dim:
+                self._reset()
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('model', ?)", (self.model,))
+            start = len(self.ids)
+            # Vecteurs d'abord: au rechargement, seules les lignes présentes dans les deux fichiers comptent
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            stale = [(self.rows[pid][0],) for pid, _, _ in todo if pid in self.rows]
+            self._conn.execute("BEGIN")
+            self._conn.executemany("UPDATE vectors SET active = 0 WHERE row = ?", stale)
+            self._conn.executemany("INSERT INTO vectors (row, id, digest, score) VALUES (?, ?, ?, ?)",
+                                   [(start + i, pid, digest, score) for i, (pid, digest, score) in enumerate(todo)])
+            self._conn.execute("COMMIT")
+            self.active = np.concatenate([self.active, np.ones(len(todo), dtype=bool)])
+            self.active[[row for row, in stale]] = False
+            self.scores = np.concatenate([self.scores, np.array([score for _, _, score in todo], dtype=np.int32)])
+            for i, (pid, digest, _) in enumerate(todo):
+                self.rows[pid] = (start + i, digest)
+            self.ids.extend(pid for pid, _, _ in todo)
+            self._map()
+            if self._needs_ivf():
+                self.ivf = await asyncio.to_thread(IVFIndex, self.matrix, np.flatnonzero(self.active))
+            elif self.ivf is not None:
+                self.ivf.extend(self.matrix, np.arange(start, len(self.ids)))
+        return len(todo)
+
+    def _needs_ivf(self) -> bool:
+        # Centroïdes réentraînés quand l'index a doublé depuis le dernier entraînement
+        return len(self.rows) >= self.approx_min and (self.ivf is None or len(self.rows) >= 2 * self.ivf.trained_on)
+
+    async def prepare(self):
+        """Charge l'index et entraîne l'IVF hors de la boucle d'événements
+
+        Au rechargement d'un index au-delà de approx_min, l'IVF n'existe pas encore: sans cet
+        appel, la première recherche l'entraînerait sur la boucle.
+        """
+        if self._conn is None or (self.ivf is None and self._needs_ivf()):
+            async with self._lock:
+                if self._conn is None:
+                    await asyncio.to_thread(self.open)
+                if self.ivf is None and self._needs_ivf():
+                    self.ivf = await asyncio.to_thread(IVFIndex, self.matrix, np.flatnonzero(self.active))
+
+    def search_vectors(self, queries: np.ndarray, k: int = 10,
+                       exclude: Optional[List[Optional[str]]] = None) -> List[List[Tuple[int, float]]]:
+        """k plus proches voisins (ligne, similarité cosinus) de chaque requête (IVF entraîné ici si besoin)"""
+        self.open()
+        if self.matrix is None or not self.rows:
+            return [[] for _ in range(len(queries))]
+        if self.ivf is None and self._needs_ivf():
+            self.ivf = IVFIndex(self.matrix, np.flatnonzero(self.active))
+        queries = _normalize(np.asarray(queries, dtype=np.float32))
+        excluded = [self.rows.get(pid, (None,))[0] for pid in (exclude or [None] * len(queries))]
+        if self.ivf is None:
+            return self._exact(queries, k, excluded)
+        results = []
+        for query, skip in zip(queries, excluded):
+            rows = self.ivf.candidates(query, self.nprobe)
+            rows = rows[self.active[rows] & (rows != skip)]
+            if not len(rows):
+                results.append([])
+                continue
+            positions, best = _top_k((np.asarray(self.matrix[rows]) @ query)[None, :], k)
+            results.append([(int(rows[p]), float(s)) for p, s in zip(positions[0], best[0])])
+        return results
+
+    def _exact(self, queries: np.ndarray, k: int, excluded: List[Optional[int]]) -> List[List[Tuple[int, float]]]:
+        results = []
+        matrix = np.asarray(self.matrix)
+        inactive = ~self.active
+        for start in range(0, len(queries), QUERY_CHUNK):
+            sims = queries[start:start + QUERY_CHUNK] @ matrix.T
+            sims[:, inactive] = -np.inf
+            for i, skip in enumerate(excluded[start:start + QUERY_CHUNK]):
+                if skip is not None:
+                    sims[i, skip] = -np.inf
+            positions, best = _top_k(sims, k)
+            for row_positions, row_sims in zip(positions, best):
+                results.append([(int(p), float(s)) for p, s in zip(row_positions, row_sims) if s > -np.inf])
+        return results
+
+    @staticmethod
+    def _describe(prospects: List) -> Tuple[List[str], List[str]]:
+        prospects = [Prospect.from_dict(p) for p in prospects]
+        return [describe(p) for p in prospects], [prospect_id(p) for p in prospects]
+
+    async def _query(self, prospects: List) -> Tuple[Optional[np.ndarray], List[str]]:
+        if not self.embed:
+            return None, []
+        texts, ids = await asyncio.to_thread(self._describe, prospects)
+        vectors = await self.embed(texts)
+        if vectors is None or len(vectors) == 0:
+            return None, []
+        return np.asarray(vectors, dtype=np.float32), ids
+
+    async def similar(self, prospect, k: int = 10) -> Optional[List[Dict]]:
+        """Prospects les plus proches d'un prospect de référence (ex: affaire conclue); None sans embeddings"""
+        queries, ids = await self._query([prospect])
+        if queries is None:
+            return None
+        await self.prepare()
+        async with self._lock:
+            return await asyncio.to_thread(self._similar, queries, k, ids)
+
+    def _similar(self, queries: np.ndarray, k: int, ids: List[str]) -> List[Dict]:
+        return [{"id": self.ids[row], "similarity": round(sim, 4), "score": int(self.scores[row])}
+                for row, sim in self.search_vectors(queries, k, exclude=ids)[0]]
+
+    async def estimate(self, prospects: List, k: int = 10) -> Optional[List[Optional[Dict]]]:
+        """Score estimé sans génération: moyenne des scores des k voisins pondérée par la similarité"""
+        queries, ids = await self._query(prospects)
+        if queries is None:
+            return None
+        await self.prepare()
+        # Produits matriciels sur toutes les requêtes: hors de la boucle d'événements
+        async with self._lock:
+            return await asyncio.to_thread(self._estimate, queries, k, ids)
+
+    def _estimate(self, queries: np.ndarray, k: int, ids: List[str]) -> List[Optional[Dict]]:
+        estimates = []
+        for neighbors in self.search_vectors(queries, k, exclude=ids):
+            weights = np.array([max(sim, 0.0) ** 2 for _, sim in neighbors], dtype=np.float64)
+            if not neighbors or weights.sum() == 0:
+                estimates.append(None)
+                continue
+            scores = self.scores[[row for row, _ in neighbors]]
+            estimates.append({
+                "score": int(round(float(weights @ scores) / weights.sum())),
+                "similarity": round(float(np.mean([sim for _, sim in neighbors])), 4),
+                "neighbors": len(neighbors),
+            })
+        return estimates
+
+    def info(self) -> Dict:
+        self.open()
+        return {
+            "model": self.model,
+            "dim": self.dim,
+            "prospects": len(self.rows),
+            "rows": len(self.ids),
+            "mode": "ivf" if self.ivf is not None else "exact",
+            "nlist": self.ivf.nlist if self.ivf is not None else None,
+        }
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+
+class BoundedExecutor:
+    """Exécute fn(item) sur un flux d'items avec une concurrence bornée, résultats dans l'ordre d'entrée
+
+    - concurrency: appels simultanés (à caler sur les slots parallèles d'Ollama)
+    - window: items en vol + résultats en attente de réordonnancement; au-delà la lecture
+      des items s'arrête (backpressure), ce qui permet des listes arbitrairement longues
+    - fermer/annuler l'itération annule les appels en cours (client déconnecté)
+    """
+
+    def __init__(self, concurrency: int = 4, window: Optional[int] = None):
+        self.concurrency = max(1, concurrency)
+        self.window = window or self.concurrency * 4
+        self.stats = {"submitted": 0, "completed": 0, "errors": 0, "cancelled": 0, "running": 0}
+
+    async def map(self, fn: Callable[..., Awaitable],
+                  items: Iterable) -> AsyncIterator[Tuple[int, object, object, Optional[str], float]]:
+        """Émet (index, item, résultat, erreur, latence ms) dans l'ordre des items"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency)
+        window = asyncio.Semaphore(self.window)
+        results: Dict[int, Tuple] = {}
+        ready = asyncio.Event()
+        total: Optional[int] = None
+        submitted = 0
+
+        async def produce():
+            nonlocal total, submitted
+            try:
+                for item in items:
+                    await window.acquire()
+                    await queue.put((submitted, item))
+                    self.stats["submitted"] += 1
+                    submitted += 1
+                total = submitted
+                for _ in range(self.concurrency):
+                    await queue.put(None)
+            finally:
+                ready.set()
+
+        async def work():
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                i, item = job
+                start = time.monotonic()
+                self.stats["running"] += 1
+                try:
+                    result, error = await fn(item), None
+                except Exception as e:
+                    result, error = None, str(e)
+                    self.stats["errors"] += 1
+                finally:
+                    self.stats["running"] -= 1
+                results[i] = (item, result, error, round((time.monotonic() - start) * 1000, 1))
+                ready.set()
+
+        producer = asyncio.create_task(produce())
+        workers = [asyncio.create_task(work()) for _ in range(self.concurrency)]
+        next_index = 0
+        try:
+            while total is None or next_index < total:
+                if next_index in results:
+                    index, (item, result, error, ms) = next_index, results.pop(next_index)
+                    window.release()
+                    self.stats["completed"] += 1
+                    # Compté rendu avant le yield: une fermeture à ce point ne l'annule pas
+                    next_index += 1
+                    yield index, item, result, error, ms
+                    continue
+                if producer.done() and producer.exception():
+                    raise producer.exception()
+                ready.clear()
+                await ready.wait()
+        finally:
+            # Arrêt anticipé (client parti, erreur): les items non rendus sont annulés
+            self.stats["cancelled"] += submitted - next_index
+            pending = [t for t in [producer, *workers] if not t.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,136 @@
+import csv
+import io
+from typing import Iterable, Iterator, List
+from modules.prospect import Prospect, dumps
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Colonnes exportées, dans l'ordre
+EXPORT_FIELDS = ("id", "title", "address", "commune", "insee", "price", "surface", "score", "source",
+                 "reason", "type", "date", "url", "signals", "ai_powered", "first_seen", "last_seen")
+
+# Lignes par row group Parquet (plusieurs pages regroupées: lecture colonne efficace)
+ROW_GROUP_SIZE = 10000
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _values(prospect: Prospect) -> List:
+    values = [getattr(prospect, field) for field in EXPORT_FIELDS]
+    values[EXPORT_FIELDS.index("source")] = str(prospect.source) if prospect.source is not None else None
+    return values
+
+
+_SIGNALS = EXPORT_FIELDS.index("signals")
+
+
+def csv_chunks(pages: Iterable[List[Prospect]]) -> Iterator[bytes]:
+    """CSV RFC 4180 (champs contenant virgule, guillemet ou retour à la ligne entre guillemets)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\r\n")
+    writer.writerow(EXPORT_FIELDS)
+    for page in pages:
+        for prospect in page:
+            row = _values(prospect)
+            row[_SIGNALS] = "; ".join(map(str, row[_SIGNALS] or ()))
+            writer.writerow(row)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def ndjson_chunks(pages: Iterable[List[Prospect]]) -> Iterator[bytes]:
+    for page in pages:
+        yield b"".join(dumps(prospect) + b"\n" for prospect in page)
+
+
+class _Chunks:
+    """Fichier en écriture seule dont le contenu est repris au fil de l'eau (pas de seek)"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def parquet_schema():
+    return pa.schema([
+        ("id", pa.string()), ("title", pa.string()), ("address", pa.string()), ("commune", pa.string()),
+        ("insee", pa.string()), ("price", pa.int64()), ("surface", pa.float64()), ("score", pa.int32()),
+        ("source", pa.string()), ("reason", pa.string()), ("type", pa.string()), ("date", pa.string()),
+        ("url", pa.string()), ("signals", pa.list_(pa.string())), ("ai_powered", pa.bool_()),
+        ("first_seen", pa.timestamp("s")), ("last_seen", pa.timestamp("s")),
+    ])
+
+
+def parquet_chunks(pages: Iterable[List[Prospect]]) -> Iterator[bytes]:
+    """Parquet (colonnes typées, compression zstd): chaque row group est envoyé dès qu'il est écrit"""
+    schema = parquet_schema()
+    sink = _Chunks()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    rows: List[List] = []
+
+    def write_group():
+        columns = [list(column) for column in zip(*rows)]
+        columns[_SIGNALS] = [[str(s) for s in signals] if signals else None for signals in columns[_SIGNALS]]
+        for name in ("first_seen", "last_seen"):
+            i = EXPORT_FIELDS.index(name)
+            columns[i] = [int(ts) if ts is not None else None for ts in columns[i]]
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+        rows.clear()
+
+    try:
+        for page in pages:
+            rows.extend(_values(prospect) for prospect in page)
+            if len(rows) >= ROW_GROUP_SIZE:
+                write_group()
+                yield sink.take()
+        if rows:
+            write_group()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def export_chunks(format: str, pages: Iterable[List[Prospect]]) -> Iterator[bytes]:
+    """Octets de l'export page par page: mémoire bornée (une page, un row group en Parquet) quelle que soit la sélection"""
+    if format == "csv":
+        return csv_chunks(pages)
+    if format == "ndjson":
+        return ndjson_chunks(pages)
+    if format == "parquet":
+        if pq is None:
+            raise ValueError("Export Parquet indisponible: installer pyarrow")
+        return parquet_chunks(pages)
+    raise ValueError(f"Format inconnu: {format}")
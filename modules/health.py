@@ -0,0 +1,217 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from modules.scheduler import SingleFlight
+from modules.shared import SharedState
+
+
+class CircuitBreaker:
+    """Disjoncteur: coupe les appels après N échecs, réessaie en semi-ouvert"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        """Ouvert et délai de réessai non écoulé (ne consomme pas d'essai)"""
+        return self.state == self.OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def allow_request(self) -> bool:
+        """Autorise un appel; en semi-ouvert un seul essai à la fois"""
+        if self.state == self.OPEN:
+            if self.is_open:
+                return False
+            self.state = self.HALF_OPEN
+            self._trial = False
+        if self.state == self.HALF_OPEN:
+            if self._trial:
+                return False
+            self._trial = True
+        return True
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial = False
+
+    def release_trial(self):
+        """Essai semi-ouvert abandonné sans verdict (annulation, erreur hors HTTP): un autre peut le reprendre"""
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial = False
+
+    def snapshot(self) -> Dict:
+        retry_in = 0.0
+        if self.state == self.OPEN:
+            retry_in = max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "retry_in": round(retry_in, 1),
+        }
+
+
+class HealthProbe:
+    """Sonde de disponibilité en tâche de fond, état en cache lu instantanément
+
+    Avec un état partagé (plusieurs workers), un seul worker sonde par période de ttl
+    et publie le résultat, que les autres reprennent.
+    """
+
+    def __init__(self, probe: Callable[[], Awaitable[bool]], ttl: float = 15.0,
+                 shared: Optional[SharedState] = None, key: str = "ollama.health"):
+        self.probe = probe
+        self.ttl = ttl
+        self.shared = shared
+        self.key = key
+        self.available: Optional[bool] = None
+        self.checked_at = 0.0
+        self.latency_ms = 0.0
+        self._flight = SingleFlight(self._run_probe)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def stale(self) -> bool:
+        return self.available is None or time.monotonic() - self.checked_at > self.ttl
+
+    async def refresh(self) -> bool:
+        """Lance une sonde (une seule à la fois, les appels concurrents l'attendent)"""
+        return await self._flight.run()
+
+    async def _run_probe(self) -> bool:
+        if (self.shared is not None and not await asyncio.to_thread(self.shared.acquire, self.key, self.ttl)
+                and await self._adopt()):
+            return self.available
+        start = time.monotonic()
+        try:
+            ok = await self.probe()
+        except Exception:
+            ok = False
+        self.latency_ms = (time.monotonic() - start) * 1000
+        self.available = ok
+        self.checked_at = time.monotonic()
+        if self.shared is not None:
+            await asyncio.to_thread(self.shared.put_json, self.key, {"available": ok, "latency_ms": self.latency_ms})
+        return ok
+
+    async def _adopt(self) -> bool:
+        """Reprend le résultat publié par le worker qui sonde, s'il est récent"""
+        published = await asyncio.to_thread(self.shared.get_json, self.key)
+        if published is None or time.time() - published[2] > 2 * self.ttl:
+            return False
+        state, _, updated = published
+        self.available = state["available"]
+        self.latency_ms = state["latency_ms"]
+        self.checked_at = time.monotonic() - (time.time() - updated)
+        return True
+
+    async def get(self) -> bool:
+        """État en cache; sonde en ligne seulement sans tâche de fond"""
+        if self.available is None or (self.stale and self._task is None):
+            return await self.refresh()
+        return self.available
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.ttl)
+
+    def snapshot(self) -> Dict:
+        return {
+            "available": bool(self.available),
+            "age": round(time.monotonic() - self.checked_at, 1) if self.available is not None else None,
+            "latency_ms": round(self.latency_ms, 1),
+            "background": self._task is not None,
+            "shared": self.shared is not None,
+        }
+
+
+class KeepWarm:
+    """Appel périodique qui garde une ressource chaude (ex: modèle chargé en mémoire)
+
+    Avec un état partagé, un seul worker préchauffe par intervalle.
+    """
+
+    def __init__(self, warm: Callable[[], Awaitable[bool]], interval: float = 600.0,
+                 shared: Optional[SharedState] = None, key: str = "ollama.warm"):
+        self.warm = warm
+        self.interval = interval
+        self.shared = shared
+        self.key = key
+        self.runs = 0
+        self.failures = 0
+        self.last_ok: Optional[bool] = None
+        self.last_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def run(self) -> bool:
+        try:
+            ok = await self.warm()
+        except Exception:
+            ok = False
+        self.runs += 1
+        self.failures += not ok
+        self.last_ok = ok
+        self.last_at = time.monotonic()
+        return ok
+
+    def snapshot(self) -> Dict:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_ok": self.last_ok,
+            "age": round(time.monotonic() - self.last_at, 1) if self.runs else None,
+        }
+
+    def start(self):
+        """Premier appel immédiat (préchargement), puis toutes les interval secondes"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            if self.shared is None or await asyncio.to_thread(self.shared.acquire, self.key, self.interval):
+                await self.run()
+            await asyncio.sleep(self.interval)
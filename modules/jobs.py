@@ -0,0 +1,197 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, List, Optional
+from modules.db import connect
+from modules.prospect import dumps
+from modules.shared import process_alive
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    done INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    prospect TEXT NOT NULL,
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    latency_ms REAL,
+    owner INTEGER,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(status);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at DESC);
+"""
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class JobStore:
+    """Jobs et résultats persistés (SQLite WAL): reprise des items en attente au redémarrage"""
+
+    def __init__(self, path: str = "data/jobs.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.executescript(SCHEMA)
+            # Bases créées avant le multi-worker: pid du worker qui traite l'item
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(job_items)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE job_items ADD COLUMN owner INTEGER")
+        return self._conn
+
+    def create(self, kind: str, prospects: List) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "INSERT INTO jobs (id, kind, status, total, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, kind, PENDING if prospects else DONE, len(prospects), now, now),
+            )
+            self.conn.executemany(
+                "INSERT INTO job_items (job_id, idx, prospect, status) VALUES (?, ?, ?, ?)",
+                [(job_id, i, dumps(p).decode(), PENDING) for i, p in enumerate(prospects)],
+            )
+            self.conn.execute("COMMIT")
+        return job_id
+
+    def pending(self) -> List[tuple]:
+        """(job_id, idx, prospect, owner) à (re)traiter, y compris ceux interrompus en cours
+
+        Un item en cours n'est repris que si le processus qui le traitait n'existe plus
+        (les autres workers continuent les leurs).
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT job_id, idx, prospect, status, owner FROM job_items WHERE status IN (?, ?) ORDER BY job_id, idx",
+                (PENDING, RUNNING),
+            ).fetchall()
+        return [(job_id, idx, json.loads(prospect), owner) for job_id, idx, prospect, status, owner in rows
+                if status == PENDING or owner is None or owner == os.getpid() or not process_alive(owner)]
+
+    def start_item(self, job_id: str, idx: int, owner: Optional[int] = None) -> bool:
+        """Réserve l'item pour ce processus; False si un autre worker l'a déjà pris"""
+        with self._lock:
+            cur = self.conn.execute(
+                "UPDATE job_items SET status = ?, owner = ? WHERE job_id = ? AND idx = ? "
+                "AND status IN (?, ?) AND owner IS ?",
+                (RUNNING, os.getpid(), job_id, idx, PENDING, RUNNING, owner),
+            )
+            if cur.rowcount != 1:
+                return False
+            self.conn.execute("UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                              (RUNNING, time.time(), job_id, PENDING))
+        return True
+
+    def finish_item(self, job_id: str, idx: int, result: Optional[str], error: Optional[str], latency_ms: float):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.execute(
+                "UPDATE job_items SET status = ?, result = ?, error = ?, latency_ms = ? WHERE job_id = ? AND idx = ?",
+                (FAILED if error else DONE, result, error, latency_ms, job_id, idx),
+            )
+            self.conn.execute(f"""
+                UPDATE jobs SET
+                    done = done + 1, failed = failed + ?, updated_at = ?,
+                    status = CASE WHEN done + 1 >= total THEN '{DONE}' ELSE status END
+                WHERE id = ?""", (int(bool(error)), time.time(), job_id))
+            self.conn.execute("COMMIT")
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, kind, status, total, done, failed, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "status", "total", "done", "failed", "created_at", "updated_at"), row))
+        job["progress"] = round(job["done"] / job["total"], 3) if job["total"] else 1.0
+        return job
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [self.get(job_id) for job_id in ids]
+
+    def items(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict]:
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT idx, prospect, status, result, error, latency_ms FROM job_items "
+                "WHERE job_id = ? AND idx >= ? ORDER BY idx LIMIT ?", (job_id, offset, limit)
+            ).fetchall()
+        return [{"index": idx, "prospect": json.loads(prospect), "status": status, "message": result,
+                 "error": error, "latency_ms": latency_ms}
+                for idx, prospect, status, result, error, latency_ms in rows]
+
+
+class JobQueue:
+    """File de jobs en tâche de fond: pool de workers, résultats persistés au fil de l'eau"""
+
+    def __init__(self, kind: str, handler: Callable[[Dict], Awaitable[str]], store: JobStore, workers: int = 2):
+        self.kind = kind
+        self.handler = handler
+        self.store = store
+        self.workers = max(1, workers)
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def submit(self, prospects: List) -> str:
+        job_id = self.store.create(self.kind, prospects)
+        if self._queue is not None:
+            for i, prospect in enumerate(prospects):
+                self._queue.put_nowait((job_id, i, prospect, None))
+        return job_id
+
+    async def _work(self):
+        while True:
+            job_id, idx, prospect, owner = await self._queue.get()
+            if not self.store.start_item(job_id, idx, owner):
+                continue
+            start = time.monotonic()
+            try:
+                result, error = await self.handler(prospect), None
+            except Exception as e:
+                result, error = None, str(e)
+            self.store.finish_item(job_id, idx, result, error, round((time.monotonic() - start) * 1000, 1))
+
+    def start(self):
+        """Lance les workers et reprend les items restés en attente"""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue()
+        for item in self.store.pending():
+            self._queue.put_nowait(item)
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+
+    def info(self) -> Dict:
+        return {"workers": len(self._tasks), "queued": self._queue.qsize() if self._queue else 0}
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+from modules.db import connect
+
+# Types d'événements émis par diff()
+DISAPPEARED = "disappeared"
+AGENCY_CHANGED = "agency_changed"
+PRICE_DROPPED = "price_dropped"
+RELISTED = "relisted"
+
+
+def _price(value) -> int:
+    digits = re.sub(r'\D', '', str(value or ''))
+    return int(digits) if digits else 0
+
+
+def fingerprint(listing: Dict) -> str:
+    raw = "|".join(str(listing.get(k) or "") for k in ("title", "price", "address", "agency"))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+class ListingSnapshot:
+    """Empreintes par annonce (id -> hash, agence, prix, vu la dernière fois) et diff entre crawls
+
+    Accès SQLite synchrones: depuis la boucle d'événements, appeler diff / recent_events via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = "data/listings.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS listings (
+                    id TEXT PRIMARY KEY,
+                    hash TEXT NOT NULL,
+                    agency TEXT,
+                    price INTEGER NOT NULL,
+                    title TEXT,
+                    address TEXT,
+                    url TEXT,
+                    active INTEGER NOT NULL,
+                    last_seen REAL NOT NULL
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing_events (
+                    ts REAL NOT NULL,
+                    event TEXT NOT NULL,
+                    listing_id TEXT NOT NULL,
+                    data TEXT NOT NULL
+                )""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_listing_events_ts ON listing_events(ts DESC)")
+        return self._conn
+
+    def diff(self, listings: List[Dict], complete: bool = True) -> List[Dict]:
+        """Compare le crawl au snapshot précédent et n'émet que les changements
+
+        complete=False (crawl partiel, erreurs): les disparitions ne sont pas déduites.
+        """
+        now = time.time()
+        events = []
+        with self._lock:
+            # Seules les annonces du crawl sont lues (jointure sur une table temporaire d'ids)
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS crawl_ids (id TEXT PRIMARY KEY)")
+            self.conn.execute("DELETE FROM crawl_ids")
+            self.conn.executemany("INSERT OR IGNORE INTO crawl_ids (id) VALUES (?)",
+                                  [(listing["id"],) for listing in listings])
+            previous = {row[0]: row for row in self.conn.execute(
+                "SELECT l.id, l.hash, l.agency, l.price, l.title, l.address, l.url, l.active "
+                "FROM listings l JOIN crawl_ids c ON c.id = l.id")}
+            first_crawl = self.conn.execute("SELECT 1 FROM listings LIMIT 1").fetchone() is None
+            upserts, unchanged = [], []
+            for listing in listings:
+                listing_id = listing["id"]
+                digest = fingerprint(listing)
+                price = _price(listing.get("price"))
+                old = previous.get(listing_id)
+                if old is not None and old[1] == digest and old[7]:
+                    unchanged.append((now, listing_id))
+                    continue
+                if old is not None and not first_crawl:
+                    if not old[7]:
+                        events.append({"event": RELISTED, "listing": listing, "previous_agency": old[2]})
+                    elif old[2] and listing.get("agency") and old[2] != listing.get("agency"):
+                        events.append({"event": AGENCY_CHANGED, "listing": listing, "previous_agency": old[2]})
+                    elif price and old[3] and price < old[3]:
+                        events.append({"event": PRICE_DROPPED, "listing": listing, "previous_price": old[3]})
+                upserts.append((listing_id, digest, listing.get("agency"), price, listing.get("title"),
+                                listing.get("address"), listing.get("url"), now))
+
+            gone = []
+            if complete:
+                # Annonces actives absentes du crawl: anti-jointure côté SQLite
+                for listing_id, agency, price, title, address, url in self.conn.execute(
+                        "SELECT id, agency, price, title, address, url FROM listings "
+                        "WHERE active = 1 AND id NOT IN (SELECT id FROM crawl_ids)"):
+                    gone.append((listing_id,))
+                    events.append({"event": DISAPPEARED, "listing": {
+                        "id": listing_id, "agency": agency, "price": str(price),
+                        "title": title, "address": address, "url": url}})
+
+            self.conn.execute("BEGIN")
+            self.conn.executemany("""
+                INSERT INTO listings (id, hash, agency, price, title, address, url, active, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    hash = excluded.hash, agency = excluded.agency, price = excluded.price,
+                    title = excluded.title, address = excluded.address, url = excluded.url,
+                    active = 1, last_seen = excluded.last_seen
+            """, upserts)
+            self.conn.executemany("UPDATE listings SET active = 0 WHERE id = ?", gone)
+            if complete:
+                # Toutes les annonces encore actives ont été vues: une seule requête
+                self.conn.execute("UPDATE listings SET last_seen = ? WHERE active = 1", (now,))
+            else:
+                self.conn.executemany("UPDATE listings SET last_seen = ? WHERE id = ?", unchanged)
+            self.conn.executemany(
+                "INSERT INTO listing_events (ts, event, listing_id, data) VALUES (?, ?, ?, ?)",
+                [(now, e["event"], e["listing"]["id"], json.dumps(e, ensure_ascii=False)) for e in events],
+            )
+            self.conn.execute("COMMIT")
+        return events
+
+    def recent_events(self, limit: int = 50) -> List[Dict]:
+        """Derniers événements détectés (historique des diffs)"""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT data FROM listing_events ORDER BY ts DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+
+def event_to_prospect(event: Dict) -> Dict:
+    """Événement de diff -> prospect pour le scan"""
+    listing = event["listing"]
+    kind = event["event"]
+    if kind == DISAPPEARED:
+        reason = f"Mandat {listing.get('agency') or ''} expiré (annonce retirée)".replace("  ", " ")
+        signals = ["Mandat expiré"]
+    elif kind == AGENCY_CHANGED:
+        reason = f"Mandat {event['previous_agency']} expiré, repris par {listing.get('agency')}"
+        signals = ["Mandat expiré", "Changement d'agence"]
+    elif kind == PRICE_DROPPED:
+        reason = f"Baisse de prix ({event['previous_price']} → {_price(listing.get('price'))})"
+        signals = ["Baisse de prix", "urgent"]
+    else:
+        reason = "Remise en vente après retrait"
+        signals = ["Remise en vente", "Mandat expiré"]
+    return {
+        "title": listing.get("title") or "Annonce",
+        "price": listing.get("price") or "",
+        "address": listing.get("address") or "",
+        "reason": reason,
+        "signals": signals,
+        "event": kind,
+        "url": listing.get("url"),
+    }
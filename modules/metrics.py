@@ -0,0 +1,172 @@
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Bornes des histogrammes de durée (secondes)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Ligne exportée par un collecteur: (nom, type, aide, labels, valeur)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+class Counter:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Registry:
+    """Compteurs et histogrammes en mémoire, export au format texte Prometheus
+
+    Les métriques déjà tenues ailleurs (cache, disjoncteur, crawler...) sont lues à l'export
+    par des collecteurs plutôt que dupliquées sur le chemin critique.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple, object] = {}
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def _get(self, kind, name: str, help: str, labels: Dict[str, str]):
+        key = (name, tuple(labels.items()))
+        metric = self._metrics.get(key)
+        if metric is None:
+            metric = self._metrics[key] = kind()
+            self._meta.setdefault(name, ("counter" if kind is Counter else "histogram", help))
+        return metric
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._get(Histogram, name, help, labels)
+
+    def collector(self, collect: Callable[[], Iterable[Sample]]):
+        self._collectors.append(collect)
+
+    def render(self) -> str:
+        lines, seen = [], set()
+
+        def header(name, kind, help):
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda item: item[0]):
+            kind, help = self._meta[name]
+            header(name, kind, help)
+            labels = dict(labels)
+            if isinstance(metric, Counter):
+                lines.append(f"{name}{_labels(labels)} {metric.value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float("inf"),), metric.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': le})} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {metric.sum:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {metric.count}")
+
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                print(f"Erreur collecteur métriques: {e}")
+                continue
+            for name, kind, help, labels, value in samples:
+                header(name, kind, help)
+                lines.append(f"{name}{_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Registry()
+
+# Détail des durées de la requête/du calcul en cours (activé par collect_timings)
+_timings: ContextVar[Optional[Dict[str, List[float]]]] = ContextVar("lvi_timings", default=None)
+
+
+class span:
+    """Chronomètre un bloc: histogramme lvi_span_seconds{span=...} + détail du calcul en cours
+
+    with span("ollama.request", kind="score"): ...
+    """
+
+    __slots__ = ("name", "histogram", "start")
+    # (nom, labels) -> (histogramme, nom du détail): résolu une fois par combinaison
+    _resolved: Dict[Tuple, Tuple[Histogram, str]] = {}
+
+    def __init__(self, name: str, **labels):
+        key = (name, *labels.items())
+        resolved = span._resolved.get(key)
+        if resolved is None:
+            resolved = span._resolved[key] = (
+                metrics.histogram("lvi_span_seconds", "Durée des étapes instrumentées", span=name, **labels),
+                f"{name}[{','.join(map(str, labels.values()))}]" if labels else name,
+            )
+        self.histogram, self.name = resolved
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.histogram.observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            entry = timings.get(self.name)
+            if entry is None:
+                timings[self.name] = [1, elapsed, elapsed]
+            else:
+                entry[0] += 1
+                entry[1] += elapsed
+                entry[2] = max(entry[2], elapsed)
+        return False
+
+
+@contextmanager
+def collect_timings() -> Iterator[Dict[str, List[float]]]:
+    """Active le détail des spans pour ce contexte (tâches créées dedans comprises)"""
+    timings: Dict[str, List[float]] = {}
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def timing_breakdown(timings: Dict[str, List[float]]) -> Dict[str, Dict]:
+    """{span: {count, total_ms, max_ms}}, du plus coûteux au moins coûteux"""
+    return {name: {"count": count, "total_ms": round(total * 1000, 2), "max_ms": round(peak * 1000, 2)}
+            for name, (count, total, peak) in sorted(timings.items(), key=lambda item: -item[1][1])}
@@ -1,210 +1,780 @@
-import requests
+import asyncio
+import hashlib
 import json
-from typing import List, Dict, Optional
+import os
+import re
+import threading
+import time
+import httpx
+from collections import deque
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 from datetime import datetime
+from modules.bulk_scoring import BULK_MIN_SIZE, bulk_fallback_scores
+from modules.cache import ScoreCache, prospect_key
+from modules.health import CircuitBreaker, HealthProbe, KeepWarm
+from modules.metrics import metrics, span
+from modules.prospect import parse_price
+from modules.rules import RuleSet, lvi_rules
+from modules.shared import ProcessLimiter, SharedState, env_shared_state
 
-class OllamaAILVI:
-    def __init__(self):
-        self.base_url = "http://localhost:11434"
-        self.model = "llama3.1:8b"
-        
-    def is_available(self) -> bool:
-        """Vérifie si Ollama est disponible"""
+# Timeouts par défaut (secondes) pour chaque type d'appel
+DEFAULT_TIMEOUTS = {
+    "probe": 3,
+    "score": 10,
+    "message": 15,
+    "prediction": 12,
+    "warmup": 120,  # chargement du modèle à froid
+    "embed": 30,
+}
+
+DEFAULT_BASE_URL = "http://localhost:11434"
+DEFAULT_MODEL = "llama3.1:8b"
+DEFAULT_EMBED_MODEL = "nomic-embed-text"
+# Textes par appel /api/embed
+EMBED_BATCH_SIZE = 64
+
+# Durée de maintien du modèle en mémoire entre deux appels (paramètre keep_alive d'Ollama)
+DEFAULT_KEEP_ALIVE = "30m"
+# Préchauffage périodique, à garder sous keep_alive pour que le modèle ne soit jamais déchargé
+DEFAULT_KEEP_WARM_INTERVAL = 600.0
+# load_duration (s) au-delà duquel un appel a payé le chargement du modèle (premier token à froid)
+COLD_LOAD_SECONDS = 0.5
+
+# Contexte modèle (tokens) et taille max d'un lot de scoring
+DEFAULT_NUM_CTX = 4096
+MAX_BATCH_SIZE = 25
+
+# Sorties structurées (paramètre "format" d'Ollama): la génération s'arrête à la fin de l'objet
+SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {"score": {"type": "integer", "minimum": 0, "maximum": 100}},
+    "required": ["score"],
+}
+BATCH_SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {"scores": {"type": "array", "items": {
+        "type": "object",
+        "properties": {"id": {"type": "integer"}, "score": {"type": "integer", "minimum": 0, "maximum": 100}},
+        "required": ["id", "score"],
+    }}},
+    "required": ["scores"],
+}
+PREDICTION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "probability": {"type": "integer", "minimum": 0, "maximum": 100},
+        "timeline": {"type": "string"},
+        "confidence": {"type": "string", "enum": ["low", "medium", "high"]},
+    },
+    "required": ["probability", "timeline", "confidence"],
+}
+
+# Plafonds de tokens générés (num_predict), large marge au-dessus du JSON attendu
+NUM_PREDICT = {"score": 16, "prediction": 64, "batch_item": 14}
+# Nouvel essai ciblé quand la sortie ne respecte pas le schéma
+MAX_RETRIES = 1
+
+
+def env_config() -> Dict:
+    """Paramètres du client depuis l'environnement
+
+    OLLAMA_BASE_URL, OLLAMA_MODEL, OLLAMA_EMBED_MODEL, OLLAMA_KEEP_ALIVE ("30m", ou -1: modèle épinglé), OLLAMA_KEEP_WARM_INTERVAL,
+    OLLAMA_TIMEOUT_<PROBE|SCORE|MESSAGE|PREDICTION|WARMUP|EMBED>, OLLAMA_NUM_PARALLEL (appels simultanés, tous workers)
+    """
+    timeouts = {}
+    for kind in DEFAULT_TIMEOUTS:
+        value = os.environ.get(f"OLLAMA_TIMEOUT_{kind.upper()}")
+        if value:
+            timeouts[kind] = float(value)
+    parallel = int(os.environ.get("OLLAMA_NUM_PARALLEL", 4))
+    keep_alive = os.environ.get("OLLAMA_KEEP_ALIVE", DEFAULT_KEEP_ALIVE)
+    if keep_alive.lstrip("-").isdigit():
+        keep_alive = int(keep_alive)  # secondes: Ollama n'accepte pas "-1" sans unité
+    return {
+        "base_url": os.environ.get("OLLAMA_BASE_URL", DEFAULT_BASE_URL),
+        "model": os.environ.get("OLLAMA_MODEL", DEFAULT_MODEL),
+        "embed_model": os.environ.get("OLLAMA_EMBED_MODEL", DEFAULT_EMBED_MODEL),
+        "timeouts": timeouts,
+        "keep_alive": keep_alive,
+        "keep_warm_interval": float(os.environ.get("OLLAMA_KEEP_WARM_INTERVAL", DEFAULT_KEEP_WARM_INTERVAL)),
+        "parallel": parallel,
+        # Au moins une connexion par slot parallèle d'Ollama
+        "max_connections": max(10, parallel),
+    }
+
+
+class FirstTokenLatency:
+    """Latence du premier token, séparée à froid (modèle chargé pendant l'appel) et à chaud"""
+
+    def __init__(self, window: int = 50):
+        self.samples = {"cold": deque(maxlen=window), "warm": deque(maxlen=window)}
+        self.counts = {"cold": 0, "warm": 0}
+
+    def record(self, ms: float, load_seconds: float):
+        kind = "cold" if load_seconds > COLD_LOAD_SECONDS else "warm"
+        self.samples[kind].append(ms)
+        self.counts[kind] += 1
+
+    def snapshot(self) -> Dict:
+        result = {}
+        for kind, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[kind] = {
+                "count": self.counts[kind],
+                "last_ms": round(samples[-1], 1) if samples else None,
+                "p50_ms": round(ordered[len(ordered) // 2], 1) if ordered else None,
+                "max_ms": round(ordered[-1], 1) if ordered else None,
+            }
+        return result
+
+
+def count_calls(kind: str, amount: int = 1):
+    metrics.counter("lvi_ollama_calls_total", "Demandes IA (par prospect ou message)", kind=kind).inc(amount)
+
+
+def count_fallbacks(kind: str, amount: int = 1):
+    metrics.counter("lvi_ollama_fallback_total", "Réponses servies par le secours sans IA", kind=kind).inc(amount)
+
+
+def count_parse_failures(kind: str):
+    metrics.counter("lvi_ollama_parse_failures_total", "Sorties LLM hors schéma", kind=kind).inc()
+
+
+def price_text(price) -> str:
+    """Prix affiché dans les prompts; un prix absent (0 pour un Prospect) n'est pas présenté comme 0€"""
+    value = parse_price(price)
+    return f"{value}€" if value else "prix inconnu"
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière: ~4 caractères par token"""
+    return len(text) // 4 + 1
+
+
+def schema_errors(value, schema: Dict, path: str = "$") -> List[str]:
+    """Validation du sous-ensemble de JSON Schema utilisé ici (type, required, enum, bornes, items)"""
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            return [f"{path}: objet attendu"]
+        errors = [f"{path}.{k}: champ manquant" for k in schema.get("required", []) if k not in value]
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors += schema_errors(value[key], sub, f"{path}.{key}")
+        return errors
+    if kind == "array":
+        if not isinstance(value, list):
+            return [f"{path}: tableau attendu"]
+        return [e for i, item in enumerate(value) for e in schema_errors(item, schema.get("items", {}), f"{path}[{i}]")]
+    if kind == "integer" and (isinstance(value, bool) or not isinstance(value, int)):
+        return [f"{path}: entier attendu"]
+    if kind == "string" and not isinstance(value, str):
+        return [f"{path}: texte attendu"]
+    if "enum" in schema and value not in schema["enum"]:
+        return [f"{path}: valeur hors {schema['enum']}"]
+    if "minimum" in schema and value < schema["minimum"] or "maximum" in schema and value > schema["maximum"]:
+        return [f"{path}: hors bornes [{schema.get('minimum')}, {schema.get('maximum')}]"]
+    return []
+
+
+def decode_json(text: Optional[str], schema: Dict) -> Tuple[Optional[object], List[str]]:
+    """(valeur, erreurs): JSON décodé puis validé contre le schéma"""
+    try:
+        value = json.loads(text or "")
+    except ValueError:
+        return None, ["JSON invalide"]
+    return value, schema_errors(value, schema)
+
+
+class AsyncOllamaAILVI:
+    """Client Ollama non bloquant avec connexions persistantes (keep-alive)"""
+
+    def __init__(self, base_url: str = DEFAULT_BASE_URL, model: str = DEFAULT_MODEL,
+                 timeouts: Optional[Dict[str, float]] = None, max_connections: int = 10,
+                 probe_ttl: float = 15.0, failure_threshold: int = 3, reset_timeout: float = 30.0,
+                 num_ctx: int = DEFAULT_NUM_CTX, cache: Optional[ScoreCache] = None,
+                 rules: Optional[RuleSet] = None, keep_alive=DEFAULT_KEEP_ALIVE,
+                 keep_warm_interval: float = DEFAULT_KEEP_WARM_INTERVAL, embed_model: str = DEFAULT_EMBED_MODEL,
+                 parallel: int = 4, shared: Optional[SharedState] = None):
+        self.base_url = base_url
+        self.model = model
+        self.embed_model = embed_model
+        self.num_ctx = num_ctx
+        self.timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=60,
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        # Multi-worker: sonde, préchauffage et slots de génération partagés entre processus
+        self.shared = shared
+        self.health = HealthProbe(self._probe, ttl=probe_ttl, shared=shared)
+        self.limiter = ProcessLimiter(shared, "ollama.slots", parallel, lease=2 * max(self.timeouts.values()))
+        self.cache = cache
+        self.rules = rules or lvi_rules
+        self.keep_alive = keep_alive
+        self.warmer = KeepWarm(self.warm_up, keep_warm_interval, shared=shared)
+        self.first_token = FirstTokenLatency()
+        self._cache_model: Optional[str] = None
+        self.structured = {"calls": 0, "retries": 0, "invalid": 0}
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Client HTTP partagé, créé à la demande dans la boucle courante"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=self.limits)
+        return self._client
+
+    async def aclose(self):
+        """Ferme le pool de connexions"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def is_available(self) -> bool:
+        """Vérifie si Ollama est disponible (état en cache + disjoncteur)"""
+        return await self.health.get() and not self.breaker.is_open
+
+    async def _probe(self) -> bool:
+        """Sonde GET /api/tags, alimente le disjoncteur"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=3)
-            return response.status_code == 200
-        except:
-            return False
-    
-    def generate_prospect_score(self, prospect_data: Dict) -> int:
+            with span("ollama.probe"):
+                response = await self.client.get("/api/tags", timeout=self.timeouts["probe"])
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        if not ok:
+            self.breaker.record_failure()
+        elif self.breaker.state == CircuitBreaker.HALF_OPEN or self.breaker.allow_request():
+            # Une sonde réussie referme un disjoncteur semi-ouvert, même si son essai est en cours
+            self.breaker.record_success()
+        return ok
+
+    def status(self) -> Dict:
+        """État santé exposé dans /health"""
+        return {
+            **self.health.snapshot(),
+            "model": self.model,
+            "breaker": self.breaker.snapshot(),
+            "cache": self.cache.stats() if self.cache else None,
+            "structured": dict(self.structured),
+            "keep_alive": self.keep_alive,
+            "warmup": self.warmer.snapshot(),
+            "first_token": self.first_token.snapshot(),
+            "slots": self.limiter.info(),
+        }
+
+    async def warm_up(self) -> bool:
+        """Charge le modèle (ou prolonge son maintien via keep_alive) et mesure le premier token"""
+        payload = self._payload("OK", True, {"num_predict": 1}, None, None)
+        start = time.monotonic()
+        first_ms = None
+        try:
+            async with self.limiter.slot(), self.client.stream("POST", "/api/generate", json=payload,
+                                                               timeout=self.timeouts["warmup"]) as response:
+                if response.status_code != 200:
+                    print(f"Erreur préchauffage Ollama ({self.model}): HTTP {response.status_code}")
+                    return False
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if first_ms is None:
+                        first_ms = (time.monotonic() - start) * 1000
+                    if chunk.get("done"):
+                        self.first_token.record(first_ms, chunk.get("load_duration", 0) / 1e9)
+                        return True
+        except (httpx.HTTPError, ValueError) as e:
+            print(f"Erreur préchauffage Ollama ({self.model}): {e}")
+        return False
+
+    def prompt_version(self, kind: str) -> str:
+        """Empreinte des templates: change dès qu'un prompt est modifié"""
+        if kind == "score":
+            template = self.score_prompt({}) + self.batch_score_prompt([], [])
+        elif kind == "message":
+            template = self.message_system() + self.message_prompt({})
+        else:
+            template = self.prediction_prompt({})
+        return hashlib.sha1(template.encode()).hexdigest()[:12]
+
+    # Accès au cache disque (SQLite) hors de la boucle d'événements
+    async def _cache_key(self, kind: str, prospect: Dict) -> Optional[str]:
+        if self.cache is None:
+            return None
+        if self.model != self._cache_model:
+            # Changement de modèle: on purge les réponses des autres modèles
+            self._cache_model = self.model
+            await asyncio.to_thread(self.cache.invalidate, keep_models=[self.model])
+        return prospect_key(kind, prospect, self.model, self.prompt_version(kind))
+
+    async def _cache_get(self, key: Optional[str]):
+        return await asyncio.to_thread(self.cache.get, key) if key else None
+
+    async def _cache_put(self, key: Optional[str], kind: str, value):
+        if key:
+            await asyncio.to_thread(self.cache.put, key, kind, self.model, value)
+
+    def _payload(self, prompt: str, stream: bool, options: Optional[Dict], format: Optional[Dict],
+                 system: Optional[str]) -> Dict:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+        }
+        if options:
+            payload["options"] = options
+        if format:
+            payload["format"] = format
+        if system:
+            # Bloc constant en tête: Ollama réutilise le cache KV de ce préfixe d'un appel à l'autre
+            payload["system"] = system
+        return payload
+
+    async def _generate(self, prompt: str, timeout: float, options: Optional[Dict] = None,
+                        format: Optional[Dict] = None, system: Optional[str] = None,
+                        kind: str = "generate") -> Optional[str]:
+        """Appel /api/generate, retourne le texte ou None"""
+        if not self.breaker.allow_request():
+            return None
+        payload = self._payload(prompt, False, options, format, system)
+        settled = False
+        try:
+            try:
+                async with self.limiter.slot():
+                    with span("ollama.request", kind=kind):
+                        response = await self.client.post("/api/generate", json=payload, timeout=timeout)
+            except httpx.HTTPError as e:
+                settled = True
+                self.breaker.record_failure()
+                metrics.counter("lvi_ollama_requests_total", "Appels /api/generate", kind=kind,
+                                status=type(e).__name__).inc()
+                raise
+            metrics.counter("lvi_ollama_requests_total", "Appels /api/generate", kind=kind,
+                            status=str(response.status_code)).inc()
+            settled = True
+            if response.status_code == 200:
+                self.breaker.record_success()
+                return response.json().get("response")
+            self.breaker.record_failure()
+            return None
+        finally:
+            # Appel annulé ou interrompu avant la réponse: l'essai semi-ouvert ne doit pas rester pris
+            if not settled:
+                self.breaker.release_trial()
+
+    def _fallback(self, kind: str, fallback, prospect: Dict):
+        count_fallbacks(kind)
+        with span("ollama.fallback", kind=kind):
+            return fallback(prospect)
+
+    async def _generate_json(self, prompt: str, schema: Dict, timeout: float, num_predict: int,
+                             options: Optional[Dict] = None, kind: str = "generate"):
+        """Génération contrainte par schéma; sortie invalide -> nouvel essai avec l'erreur, sinon None"""
+        self.structured["calls"] += 1
+        attempt_prompt = prompt
+        for attempt in range(MAX_RETRIES + 1):
+            call_options = {**(options or {}), "num_predict": num_predict}
+            if attempt:
+                self.structured["retries"] += 1
+                call_options["temperature"] = 0
+            text = await self._generate(attempt_prompt, timeout, call_options, format=schema, kind=kind)
+            if text is None:
+                return None
+            with span("ollama.parse", kind=kind):
+                value, errors = decode_json(text, schema)
+            if not errors:
+                return value
+            count_parse_failures(kind)
+            attempt_prompt = self.retry_prompt(prompt, errors)
+        self.structured["invalid"] += 1
+        print(f"Erreur Ollama: sortie hors schéma ({'; '.join(errors[:3])})")
+        return None
+
+    async def embed(self, texts: List[str]) -> Optional[List[List[float]]]:
+        """Embeddings des textes (/api/embed, par lots), None si indisponible"""
+        if not texts:
+            return []
+        if not await self.is_available():
+            return None
+        vectors = []
+        for start in range(0, len(texts), EMBED_BATCH_SIZE):
+            if not self.breaker.allow_request():
+                return None
+            payload = {"model": self.embed_model, "input": texts[start:start + EMBED_BATCH_SIZE],
+                       "keep_alive": self.keep_alive}
+            settled = False
+            try:
+                try:
+                    async with self.limiter.slot():
+                        response = await self.client.post("/api/embed", json=payload,
+                                                          timeout=self.timeouts["embed"])
+                except httpx.HTTPError as e:
+                    settled = True
+                    self.breaker.record_failure()
+                    print(f"Erreur Ollama embeddings: {e}")
+                    return None
+                settled = True
+                if response.status_code != 200:
+                    self.breaker.record_failure()
+                    print(f"Erreur Ollama embeddings ({self.embed_model}): HTTP {response.status_code}")
+                    return None
+                self.breaker.record_success()
+            finally:
+                if not settled:
+                    self.breaker.release_trial()
+            vectors.extend(response.json().get("embeddings", []))
+        return vectors if len(vectors) == len(texts) else None
+
+    async def generate_prospect_score(self, prospect_data: Dict) -> int:
         """Score intelligent prospect avec IA"""
-        if not self.is_available():
-            return self.fallback_scoring(prospect_data)
-            
-        prompt = f"""
+        count_calls("score")
+        key = await self._cache_key("score", prospect_data)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+        if not await self.is_available():
+            return self._fallback("score", self.fallback_scoring, prospect_data)
+
+        try:
+            result = await self._generate_json(
+                self.score_prompt(prospect_data), SCORE_SCHEMA, self.timeouts["score"], NUM_PREDICT["score"],
+                kind="score")
+            if result is not None:
+                score = result["score"]
+                await self._cache_put(key, "score", score)
+                return score
+        except Exception as e:
+            print(f"Erreur Ollama scoring: {e}")
+
+        return self._fallback("score", self.fallback_scoring, prospect_data)
+
+    async def generate_prospect_scores(self, prospects: List[Dict]) -> List[int]:
+        """Score un lot de prospects en un seul appel LLM par lot"""
+        scores: List[Optional[int]] = [None] * len(prospects)
+        async for i, score in self.iter_prospect_scores(prospects):
+            scores[i] = score
+        return scores
+
+    async def iter_prospect_scores(self, prospects: List[Dict]) -> AsyncIterator[Tuple[int, int]]:
+        """Émet (index, score) au fil de l'eau: cache, puis chaque lot LLM terminé"""
+        count_calls("score", len(prospects))
+        keys = [await self._cache_key("score", p) for p in prospects]
+        # Lectures et écritures du cache disque groupées, hors de la boucle d'événements
+        cached = await asyncio.to_thread(self.cache.get_many, keys) if self.cache else {}
+        todo = []
+        for i, key in enumerate(keys):
+            if key in cached:
+                yield i, cached[key]
+            else:
+                todo.append(i)
+
+        scored = set()
+        if todo and await self.is_available():
+            pending = [prospects[i] for i in todo]
+            tasks = [asyncio.create_task(self._score_batch(pending, ids)) for ids in self.split_batches(pending)]
+            try:
+                for next_batch in asyncio.as_completed(tasks):
+                    batch = await next_batch
+                    if self.cache:
+                        await asyncio.to_thread(self.cache.put_many, [
+                            (keys[todo[j]], "score", self.model, score) for j, score in batch.items()
+                        ])
+                    for j, score in batch.items():
+                        scored.add(todo[j])
+                        yield todo[j], score
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        # Seuls les prospects absents ou mal formés passent en secours
+        missing = [i for i in todo if i not in scored]
+        if missing:
+            count_fallbacks("score", len(missing))
+            rules = self.rules.current()
+            with span("ollama.fallback", kind="score"):
+                items = [prospects[i] for i in missing]
+                if len(items) >= BULK_MIN_SIZE:
+                    fallback = bulk_fallback_scores(items, rules)
+                else:
+                    fallback = [rules.score(item) for item in items]
+            for i, score in zip(missing, fallback):
+                yield i, score
+
+    async def _score_batch(self, prospects: List[Dict], ids: List[int]) -> Dict[int, int]:
+        """Scores d'un lot; seuls les ids manquants ou invalides sont redemandés"""
+        scores: Dict[int, int] = {}
+        todo = list(ids)
+        try:
+            for attempt in range(MAX_RETRIES + 1):
+                options = {"num_ctx": self.num_ctx, "num_predict": NUM_PREDICT["batch_item"] * len(todo) + 8}
+                if attempt:
+                    self.structured["retries"] += 1
+                    options["temperature"] = 0
+                else:
+                    self.structured["calls"] += 1
+                text = await self._generate(
+                    self.batch_score_prompt(prospects, todo),
+                    self.timeouts["score"] * max(1, len(todo) // 5),
+                    options=options,
+                    format=BATCH_SCORE_SCHEMA,
+                    kind="batch",
+                )
+                if text is None:
+                    break
+                with span("ollama.parse", kind="batch"):
+                    scores.update(self.parse_batch_scores(text, todo))
+                todo = [i for i in todo if i not in scores]
+                if not todo:
+                    break
+                count_parse_failures("batch")
+            else:
+                self.structured["invalid"] += 1
+        except Exception as e:
+            print(f"Erreur Ollama scoring lot: {e}")
+        return scores
+
+    def split_batches(self, prospects: List[Dict]) -> List[List[int]]:
+        """Découpe en lots selon le budget de tokens du contexte modèle"""
+        # Réserve: en-tête du prompt + ~15 tokens de sortie par prospect
+        budget = self.num_ctx - estimate_tokens(self.batch_score_prompt([], []))
+        batches, current, used = [], [], 0
+        for i, prospect in enumerate(prospects):
+            cost = estimate_tokens(self.prospect_line(i, prospect)) + 15
+            if current and (used + cost > budget or len(current) >= MAX_BATCH_SIZE):
+                batches.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    async def generate_personalized_message(self, prospect: Dict) -> str:
+        """Génère message personnalisé avec IA"""
+        count_calls("message")
+        key = await self._cache_key("message", prospect)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+        if not await self.is_available():
+            return self._fallback("message", self.fallback_message, prospect)
+
+        try:
+            message = await self._generate(self.message_prompt(prospect), self.timeouts["message"],
+                                           system=self.message_system(), kind="message")
+            if message is not None:
+                await self._cache_put(key, "message", message)
+                return message
+        except Exception as e:
+            print(f"Erreur Ollama message: {e}")
+
+        return self._fallback("message", self.fallback_message, prospect)
+
+    async def stream_personalized_message(self, prospect: Dict) -> AsyncIterator[str]:
+        """Message personnalisé émis morceau par morceau (API streaming d'Ollama)"""
+        count_calls("message")
+        key = await self._cache_key("message", prospect)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            yield cached
+            return
+        if not await self.is_available() or not self.breaker.allow_request():
+            yield self._fallback("message", self.fallback_message, prospect)
+            return
+
+        parts, complete = [], False
+        payload = self._payload(self.message_prompt(prospect), True, None, None, self.message_system())
+        start = time.monotonic()
+        first_ms = None
+        settled = False
+        try:
+            # Timeout par lecture: borne l'attente de chaque morceau, pas la génération entière
+            async with self.limiter.slot(), self.client.stream("POST", "/api/generate", json=payload,
+                                                               timeout=self.timeouts["message"]) as response:
+                if response.status_code != 200:
+                    settled = True
+                    self.breaker.record_failure()
+                else:
+                    async for line in response.aiter_lines():
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if first_ms is None:
+                            first_ms = (time.monotonic() - start) * 1000
+                        if chunk.get("response"):
+                            parts.append(chunk["response"])
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            complete = True
+                            self.first_token.record(first_ms, chunk.get("load_duration", 0) / 1e9)
+                            break
+                    settled = True
+                    self.breaker.record_success()
+        except (httpx.HTTPError, ValueError) as e:
+            settled = True
+            self.breaker.record_failure()
+            print(f"Erreur Ollama message (stream): {e}")
+        finally:
+            # Flux abandonné (client déconnecté, annulation): l'essai semi-ouvert est rendu
+            if not settled:
+                self.breaker.release_trial()
+
+        if complete and parts:
+            # Seul un message complet est mis en cache (pas de texte tronqué)
+            await self._cache_put(key, "message", "".join(parts))
+        elif not parts:
+            yield self._fallback("message", self.fallback_message, prospect)
+
+    async def predict_selling_probability(self, prospect: Dict) -> Dict:
+        """Prédiction IA probabilité de vente"""
+        count_calls("prediction")
+        key = await self._cache_key("prediction", prospect)
+        cached = await self._cache_get(key)
+        if cached is not None:
+            return cached
+        if not await self.is_available():
+            return self._fallback("prediction", self.fallback_prediction, prospect)
+
+        try:
+            prediction = await self._generate_json(
+                self.prediction_prompt(prospect), PREDICTION_SCHEMA, self.timeouts["prediction"],
+                NUM_PREDICT["prediction"], kind="prediction")
+            if prediction is not None:
+                prediction = {k: prediction[k] for k in PREDICTION_SCHEMA["required"]}
+                await self._cache_put(key, "prediction", prediction)
+                return prediction
+        except Exception as e:
+            print(f"Erreur prédiction: {e}")
+
+        return self._fallback("prediction", self.fallback_prediction, prospect)
+
+    def score_prompt(self, prospect_data: Dict) -> str:
+        return f"""
         Analyse ce prospect immobilier pour LVI IMMO (vente interactive Montpellier).
-        
+
         Données prospect:
         - Nom: {prospect_data.get('name', 'N/A')}
         - Localisation: {prospect_data.get('location', 'N/A')}
-        - Prix estimé: {prospect_data.get('price', 'N/A')}€
+        - Prix estimé: {price_text(prospect_data.get('price'))}
         - Source: {prospect_data.get('source', 'N/A')}
         - Signaux: {prospect_data.get('signals', [])}
-        
-        Critères LVI IMMO:
-        - Vente interactive = biens >400k€ 
-        - Zone Montpellier EST premium
-        - CSP+ qui comprennent innovation
-        - Signaux urgence/frustration = opportunité
-        
-        Réponds UNIQUEMENT par un score 0-100.
+        {self.rules.current().criteria_text()}
+        Réponds en JSON: {{"score": 0-100}}
         """
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=10
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                score_text = result.get("response", "50")
-                # Extraction du score
-                import re
-                numbers = re.findall(r'\d+', score_text)
-                if numbers:
-                    return min(100, max(0, int(numbers[0])))
-                    
-        except Exception as e:
-            print(f"Erreur Ollama scoring: {e}")
-            
-        return self.fallback_scoring(prospect_data)
-    
-    def generate_personalized_message(self, prospect: Dict) -> str:
-        """Génère message personnalisé avec IA"""
-        if not self.is_available():
-            return self.fallback_message(prospect)
-            
-        prompt = f"""
-        Rédige un message de contact pour ce prospect immobilier.
-        
-        Prospect:
-        - Nom: {prospect.get('name', 'Prospect')}
-        - Profil: {prospect.get('title', 'Propriétaire')}
-        - Entreprise: {prospect.get('company', 'N/A')}
-        - Situation: {prospect.get('signals', [])}
-        
+
+    def prospect_line(self, prospect_id: int, prospect: Dict) -> str:
+        return (
+            f"- id={prospect_id} | {prospect.get('name') or prospect.get('title', 'N/A')} | "
+            f"{prospect.get('location') or prospect.get('address', 'N/A')} | "
+            f"{price_text(prospect.get('price'))} | {prospect.get('source', 'N/A')} | "
+            f"{prospect.get('signals') or prospect.get('reason', [])}"
+        )
+
+    def batch_score_prompt(self, prospects: List[Dict], ids: List[int]) -> str:
+        lines = "\n".join(self.prospect_line(i, prospects[i]) for i in ids)
+        return f"""
+        Analyse ces prospects immobiliers pour LVI IMMO (vente interactive Montpellier).
+
+        Prospects (id | nom | localisation | prix | source | signaux):
+{lines}
+        {self.rules.current().criteria_text()}
+        Réponds en JSON, un objet par prospect:
+        {{"scores": [{{"id": 0, "score": 0-100}}, ...]}}
+        """
+
+    def message_system(self) -> str:
+        """Contexte LVI constant, envoyé en prompt système (préfixe partagé par tous les messages)"""
+        return """
+        Tu rédiges des messages de contact pour des prospects immobiliers.
+
         Contexte LVI IMMO:
         - Emmanuel Clément, co-fondateur
         - Méthode vente interactive révolutionnaire
         - +15-25% vs estimations traditionnelles
         - Transparence totale, vente sous 4 semaines
         - Basé Montpellier, expertise locale
-        
+
         Style:
         - Professionnel mais chaleureux
         - Personnalisé selon son profil
         - Intriguant sur la méthode
         - Call-to-action café informel
         - Maximum 100 mots
-        
+        """
+
+    def message_prompt(self, prospect: Dict) -> str:
+        return f"""
+        Rédige un message de contact pour ce prospect immobilier.
+
+        Prospect:
+        - Nom: {prospect.get('name', 'Prospect')}
+        - Profil: {prospect.get('title', 'Propriétaire')}
+        - Entreprise: {prospect.get('company', 'N/A')}
+        - Situation: {prospect.get('signals', [])}
+
         Message:
         """
-        
-        try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", self.fallback_message(prospect))
-                
-        except Exception as e:
-            print(f"Erreur Ollama message: {e}")
-            
-        return self.fallback_message(prospect)
-    
-    def predict_selling_probability(self, prospect: Dict) -> Dict:
-        """Prédiction IA probabilité de vente"""
-        if not self.is_available():
-            return {"probability": 65, "timeline": "6-12 mois", "confidence": "medium"}
-            
-        prompt = f"""
+
+    def prediction_prompt(self, prospect: Dict) -> str:
+        return f"""
         Analyse prédictive: probabilité que ce prospect vende dans les 12 prochains mois.
-        
+
         Données:
         - Localisation: {prospect.get('location', '')}
         - Type bien: {prospect.get('property_type', '')}
         - Signaux détectés: {prospect.get('signals', [])}
         - Source découverte: {prospect.get('source', '')}
         - Score actuel: {prospect.get('score', 0)}
-        
+
         Facteurs prédictifs:
-        - DPE récent = 80% vente sous 6 mois
-        - Mandat expiré = 70% nouvelle tentative sous 3 mois  
-        - Déménagement professionnel = 90% vente urgente
-        - Signaux réseaux sociaux = 60% réflexion active
-        - CSP+ frustré = 85% changement d'agent
-        
+{self.rules.current().factors_text()}
         Réponds en JSON:
         {{"probability": 0-100, "timeline": "X mois", "confidence": "low/medium/high"}}
         """
-        
+
+    def retry_prompt(self, prompt: str, errors: List[str]) -> str:
+        return f"""{prompt}
+        Ta réponse précédente ne respectait pas le format: {'; '.join(errors[:3])}.
+        Réponds uniquement avec l'objet JSON demandé.
+        """
+
+    def parse_batch_scores(self, text: Optional[str], ids: List[int]) -> Dict[int, int]:
+        """Scores valides du JSON {"scores": [...]} (ou tableau seul), indexés par id"""
         try:
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=12
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                response_text = result.get("response", "")
-                
-                # Parse JSON response
-                try:
-                    import json
-                    prediction = json.loads(response_text)
-                    return prediction
-                except:
-                    # Fallback parsing
-                    prob = 65
-                    if "80" in response_text or "90" in response_text:
-                        prob = 85
-                    elif "70" in response_text:
-                        prob = 70
-                    return {"probability": prob, "timeline": "6-9 mois", "confidence": "medium"}
-                    
-        except Exception as e:
-            print(f"Erreur prédiction: {e}")
-            
-        return {"probability": 65, "timeline": "6-12 mois", "confidence": "medium"}
-    
+            data = json.loads(text or "")
+        except ValueError:
+            match = re.search(r'\[.*\]', text or "", re.DOTALL)
+            if not match:
+                return {}
+            try:
+                data = json.loads(match.group(0))
+            except ValueError:
+                return {}
+        items = data.get("scores") if isinstance(data, dict) else data
+        item_schema = BATCH_SCORE_SCHEMA["properties"]["scores"]["items"]
+        wanted = set(ids)
+        scores = {}
+        for item in items if isinstance(items, list) else []:
+            if not schema_errors(item, item_schema) and item["id"] in wanted:
+                scores[item["id"]] = item["score"]
+        return scores
+
+    def fallback_prediction(self, prospect: Dict) -> Dict:
+        """Prédiction de secours: facteur prédictif des règles LVI le plus fort parmi les signaux"""
+        return {**self.rules.current().predict(prospect), "fallback": True}
+
     def fallback_scoring(self, prospect: Dict) -> int:
-        """Scoring de secours sans IA"""
-        score = 50
-        
-        # Prix
-        try:
-            price = int(str(prospect.get('price', '0')).replace('€', '').replace(' ', ''))
-            if price > 600000: score += 25
-            elif price > 500000: score += 20  
-            elif price > 400000: score += 15
-        except: pass
-        
-        # Localisation
-        location = str(prospect.get('location', '')).lower()
-        if any(zone in location for zone in ['jacou', 'castelnau', 'antigone']):
-            score += 15
-            
-        # Signaux
-        signals = str(prospect.get('signals', [])).lower()
-        if 'urgent' in signals: score += 20
-        if 'expiré' in signals: score += 25
-        if 'déménagement' in signals: score += 15
-        
-        return min(100, score)
-    
+        """Scoring de secours sans IA (règles compilées de config/lvi_rules.json)"""
+        return self.rules.current().score(prospect)
+
     def fallback_message(self, prospect: Dict) -> str:
         """Message de secours sans IA"""
         name = prospect.get('name', 'Monsieur/Madame').split()[0]
-        
+
         return f"""Bonjour {name},
 
 Emmanuel Clément, co-fondateur LVI IMMO à Montpellier.
@@ -216,5 +786,71 @@ Seriez-vous intéressé(e) par un échange autour d'un café ?
 Cordialement,
 Emmanuel - 04 67 XX XX XX"""
 
-# Instance globale
-ollama_ai = OllamaAILVI()
+
+class OllamaAILVI:
+    """API synchrone: fine surcouche du client async sur une boucle dédiée"""
+
+    def __init__(self, *args, **kwargs):
+        self._ai = AsyncOllamaAILVI(*args, **kwargs)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # base_url, model, timeouts, fallback_scoring, prompts...
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._ai, name)
+
+    def __setattr__(self, name, value):
+        if name.startswith('_'):
+            object.__setattr__(self, name, value)
+        else:
+            setattr(self._ai, name, value)
+
+    def _run(self, coro):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def is_available(self) -> bool:
+        return self._run(self._ai.is_available())
+
+    def generate_prospect_score(self, prospect_data: Dict) -> int:
+        return self._run(self._ai.generate_prospect_score(prospect_data))
+
+    def generate_prospect_scores(self, prospects: List[Dict]) -> List[int]:
+        return self._run(self._ai.generate_prospect_scores(prospects))
+
+    def generate_personalized_message(self, prospect: Dict) -> str:
+        return self._run(self._ai.generate_personalized_message(prospect))
+
+    def predict_selling_probability(self, prospect: Dict) -> Dict:
+        return self._run(self._ai.predict_selling_probability(prospect))
+
+    def status(self) -> Dict:
+        return self._ai.status()
+
+
+# Instances globales (cache disque partagé; état partagé entre workers si WEB_CONCURRENCY > 1)
+shared_state = env_shared_state()
+score_cache = ScoreCache()
+async_ollama_ai = AsyncOllamaAILVI(cache=score_cache, shared=shared_state, **env_config())
+_sync_ollama_ai: Optional[OllamaAILVI] = None
+_sync_lock = threading.Lock()
+
+
+def __getattr__(name):
+    """ollama_ai (API synchrone) créé au premier import qui le demande
+
+    Son client tourne sur sa propre boucle (sonde, disjoncteur et slots ne peuvent pas être ceux
+    d'async_ollama_ai): l'application, qui n'utilise que le client async, n'en crée pas.
+    """
+    global _sync_ollama_ai
+    if name != "ollama_ai":
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _sync_lock:
+        if _sync_ollama_ai is None:
+            _sync_ollama_ai = OllamaAILVI(cache=score_cache, shared=shared_state, **env_config())
+    return _sync_ollama_ai
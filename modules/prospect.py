@@ -0,0 +1,183 @@
+import json
+import re
+import sys
+from enum import Enum
+from operator import attrgetter
+from typing import Dict, Optional
+from modules.zone import ZONE_EMMANUEL, resolve_commune
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_SURFACE_RE = re.compile(r'(\d{2,4}(?:[.,]\d+)?)\s*m(?:²|2)\b')
+
+
+def parse_price(price) -> int:
+    digits = re.sub(r'\D', '', str(price or ''))
+    return int(digits) if digits else 0
+
+
+def extract_surface(prospect: Dict) -> Optional[float]:
+    if prospect.get('surface'):
+        try:
+            return float(prospect['surface'])
+        except (TypeError, ValueError):
+            pass
+    for field in ('type', 'title'):
+        match = _SURFACE_RE.search(str(prospect.get(field) or ''))
+        if match:
+            return float(match.group(1).replace(',', '.'))
+    return None
+
+
+class Source(str, Enum):
+    """Sources connues (une seule instance par valeur)"""
+    DPE = "DPE ADEME"
+    SCRAPING = "Scraping"
+    LINKEDIN = "LinkedIn"
+    FACEBOOK = "Facebook"
+    VEILLE = "Veille"
+
+    def __str__(self):
+        return self.value
+
+    @classmethod
+    def coerce(cls, value) -> Optional[str]:
+        """Membre de l'enum, sinon chaîne internée (source inconnue)"""
+        if value is None or value == '':
+            return None
+        try:
+            return cls(value)
+        except ValueError:
+            return sys.intern(str(value))
+
+
+def _intern(value):
+    """Textes à faible cardinalité (raison, type, date relative) partagés entre prospects"""
+    return sys.intern(value) if type(value) is str else value
+
+
+# Anciennes clés des dicts -> attribut
+_ALIASES = {"location": "address"}
+
+
+class Prospect:
+    """Prospect typé et compact: prix/surface/score numériques, commune et source partagées
+
+    Les champs non prévus (name, prediction, company...) restent dans extra.
+    get() garde l'accès façon dict pour les consommateurs existants (prompts, cache, règles).
+    """
+
+    __slots__ = ("id", "title", "address", "insee", "commune", "price", "surface", "score", "source",
+                 "reason", "signals", "type", "date", "url", "ai_powered", "sources",
+                 "first_seen", "last_seen", "extra")
+
+    def __init__(self, title: Optional[str] = None, address: Optional[str] = None, price: int = 0,
+                 score: int = 0, source: Optional[str] = None, **fields):
+        self.id = None
+        self.title = title
+        self.address = address
+        self.insee = None
+        self.commune = None
+        self.price = price
+        self.surface = None
+        self.score = score
+        self.source = Source.coerce(source)
+        self.reason = None
+        self.signals = None
+        self.type = None
+        self.date = None
+        self.url = None
+        self.ai_powered = False
+        self.sources = None
+        self.first_seen = None
+        self.last_seen = None
+        self.extra = None
+        for name, value in fields.items():
+            setattr(self, name, value)
+        if self.insee is None:
+            self.insee, self.commune = resolve_commune(address or '')
+            if self.insee is None:
+                self.insee, self.commune = resolve_commune(title or '')
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Prospect":
+        """Normalise un dict de source (location/address, name/title, prix texte...)"""
+        if isinstance(data, Prospect):
+            return data
+        signals = data.get('signals')
+        if isinstance(signals, tuple):
+            signals = list(signals)
+        elif signals is not None and not isinstance(signals, list):
+            signals = [signals]
+        fields = {
+            "reason": _intern(data.get('reason')),
+            "signals": signals,
+            "type": _intern(data.get('type')),
+            "date": _intern(data.get('date')),
+            "url": data.get('url'),
+            "ai_powered": bool(data.get('ai_powered')),
+            "surface": extract_surface(data),
+        }
+        for name in ("id", "first_seen", "last_seen", "sources"):
+            if data.get(name) is not None:
+                fields[name] = data[name]
+        if data.get('insee'):
+            fields["insee"] = sys.intern(data['insee'])
+            fields["commune"] = ZONE_EMMANUEL.get(data['insee'], data.get('commune'))
+        extra = {k: v for k, v in data.items() if k not in _KNOWN_KEYS}
+        if extra:
+            fields["extra"] = extra
+        return cls(
+            title=data.get('title') or data.get('name'),
+            address=data.get('address') or data.get('location'),
+            price=parse_price(data.get('price')),
+            score=int(data.get('score') or 0),
+            source=data.get('source'),
+            **fields,
+        )
+
+    def get(self, key: str, default=None):
+        name = _ALIASES.get(key, key)
+        if name in _FIELD_SET:
+            value = getattr(self, name)
+            return default if value is None else value
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def to_dict(self) -> Dict:
+        data = {name: value for name, value in zip(_FIELDS, _field_values(self)) if value is not None}
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return f"Prospect({self.title!r}, {self.address!r}, price={self.price}, score={self.score})"
+
+
+_FIELDS = tuple(name for name in Prospect.__slots__ if name != "extra")
+_FIELD_SET = frozenset(_FIELDS)
+_field_values = attrgetter(*_FIELDS)
+_KNOWN_KEYS = _FIELD_SET | {"location"}
+
+
+def _default(obj):
+    if isinstance(obj, Prospect):
+        return obj.to_dict()
+    raise TypeError(f"Type non sérialisable: {type(obj).__name__}")
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), check_circular=False, default=_default)
+
+
+def dumps(obj) -> bytes:
+    """JSON compact (orjson si disponible), Prospect sérialisés directement"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default)
+        except orjson.JSONEncodeError:
+            pass  # ex: entier hors 64 bits
+    return _encoder.encode(obj).encode()
@@ -0,0 +1,249 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional
+
+import numpy as np
+from modules.bulk_scoring import KeywordMatcher, parse_fallback_price
+from modules.zone import ZONE_EMMANUEL, normalize_text
+
+DEFAULT_PREDICTION = {"probability": 65, "timeline": "6-12 mois", "confidence": "medium"}
+
+# Entrées max des mémos localisation / signaux (vidés quand pleins)
+MEMO_SIZE = 4096
+
+
+def _texts(column):
+    return column[1] if isinstance(column, tuple) else column
+
+
+def _per_row(values: np.ndarray, column) -> np.ndarray:
+    return values[column[0]] if isinstance(column, tuple) else values
+
+
+class CompiledRules:
+    """Règles LVI compilées: tables de bandes de prix, matchers de zones et de signaux, textes de prompt"""
+
+    def __init__(self, raw: Dict, version: str):
+        self.raw = raw
+        self.version = version
+        self.base_score = int(raw["base_score"])
+        self.max_score = int(raw.get("max_score", 100))
+
+        bands = sorted((int(b["above"]), int(b["bonus"])) for b in raw.get("price_bands", []))
+        if bands and bands[0][0] < 0:
+            raise ValueError("price_bands: seuil négatif")
+        # Seuils croissants: le bonus est celui du plus grand seuil strictement dépassé
+        self.price_thresholds = [above for above, _ in bands]
+        self.price_bonuses = [bonus for _, bonus in bands]
+        self._np_thresholds = np.array(self.price_thresholds, dtype=np.int64)
+        self._np_bonuses = np.array([0] + self.price_bonuses, dtype=np.int64)
+
+        zones = raw.get("premium_zones", {})
+        self.zone_label = zones.get("label", "Zones premium")
+        self.zone_bonus = int(zones.get("bonus", 0))
+        self.zone_names, self.zone_keywords = [], []
+        for zone in zones.get("zones", []):
+            if zone["insee"] not in ZONE_EMMANUEL:
+                raise ValueError(f"premium_zones: code INSEE hors ZONE_EMMANUEL: {zone['insee']}")
+            name = zone.get("label") or ZONE_EMMANUEL[zone["insee"]]
+            self.zone_names.append(name)
+            self.zone_keywords.extend(k.lower() for k in zone.get("match") or [ZONE_EMMANUEL[zone["insee"]]])
+        self.zone_keywords = list(dict.fromkeys(self.zone_keywords))
+        self._zone_re = re.compile("|".join(map(re.escape, self.zone_keywords))) if self.zone_keywords else None
+
+        self.signals = [(keyword.lower(), int(weight)) for keyword, weight in raw.get("signals", {}).items()]
+        self.zone_matcher = KeywordMatcher(self.zone_keywords)
+        self.signal_matcher = KeywordMatcher([keyword for keyword, _ in self.signals])
+        self._signal_weights = np.array([weight for _, weight in self.signals], dtype=np.int64)
+
+        self._zone_memo: Dict[str, int] = {}
+        self._signal_memo: Dict[tuple, int] = {}
+
+        self.criteria = list(raw.get("criteria", []))
+        self.probability_factors = list(raw.get("probability_factors", []))
+        self.default_prediction = {**DEFAULT_PREDICTION, **raw.get("default_prediction", {})}
+        # Facteurs du plus probable au moins probable, signal normalisé pour la recherche
+        self._factors = sorted(
+            ((normalize_text(f["signal"]), int(f["probability"]), f.get("timeline")) for f in self.probability_factors),
+            key=lambda f: -f[1],
+        )
+        self._criteria_text = self._render_criteria()
+        self._factors_text = "".join(
+            f"        - {f['signal']} = {int(f['probability'])}% {f['outcome']}\n" for f in self.probability_factors
+        )
+
+    def score(self, prospect: Dict) -> int:
+        """Scoring de secours d'un prospect
+
+        Localisations et listes de signaux se répètent beaucoup: leurs bonus sont mémorisés,
+        ce qui évite str()/lower() et la recherche des mots-clés à chaque appel.
+        """
+        score = self.base_score
+        price = prospect.get('price', '0')
+        price = int(price) if type(price) is str and price.isdecimal() else parse_fallback_price(price)
+        i = bisect.bisect_left(self.price_thresholds, price)
+        if i:
+            score += self.price_bonuses[i - 1]
+
+        location = prospect.get('location', '')
+        if type(location) is str:
+            bonus = self._zone_memo.get(location)
+            if bonus is None:
+                bonus = self._memoize(self._zone_memo, location, self._location_bonus(location))
+        else:
+            bonus = self._location_bonus(location)
+        score += bonus
+
+        signals = prospect.get('signals', [])
+        if type(signals) is list:
+            try:
+                key = tuple(signals)
+                bonus = self._signal_memo.get(key)
+            except TypeError:
+                key = bonus = None
+            if bonus is None:
+                bonus = self._signals_bonus(signals)
+                if key is not None and all(type(s) is str for s in key):
+                    self._memoize(self._signal_memo, key, bonus)
+        else:
+            bonus = self._signals_bonus(signals)
+        score += bonus
+        return min(self.max_score, score)
+
+    def _location_bonus(self, location) -> int:
+        if self._zone_re is not None and self._zone_re.search(str(location).lower()):
+            return self.zone_bonus
+        return 0
+
+    def _signals_bonus(self, signals) -> int:
+        text = str(signals).lower()
+        return sum(weight for keyword, weight in self.signals if keyword in text)
+
+    @staticmethod
+    def _memoize(memo: Dict, key, value: int) -> int:
+        if len(memo) >= MEMO_SIZE:
+            memo.clear()
+        memo[key] = value
+        return value
+
+    def predict(self, prospect: Dict) -> Dict:
+        """Prédiction sans IA: facteur prédictif le plus fort présent dans les signaux ou la raison"""
+        text = normalize_text(f"{prospect.get('signals', '')} {prospect.get('reason', '')}")
+        for signal, probability, timeline in self._factors:
+            if signal in text:
+                return {"probability": probability,
+                        "timeline": timeline or self.default_prediction["timeline"], "confidence": "low"}
+        return dict(self.default_prediction)
+
+    def score_columns(self, price: np.ndarray, location, signals) -> np.ndarray:
+        """Scoring de secours vectorisé sur des colonnes (textes déjà en minuscules)
+
+        location / signals: colonne de textes, ou (codes, textes distincts) comme produit par
+        prospect_columns; les mots-clés ne sont alors cherchés qu'une fois par texte distinct.
+        """
+        price = np.asarray(price, dtype=np.int64)
+        score = np.full(len(price), self.base_score, dtype=np.int64)
+        score += self._np_bonuses[np.searchsorted(self._np_thresholds, price, side='left')]
+        zone_bonus = self.zone_matcher.match(_texts(location)).any(axis=1) * self.zone_bonus
+        signal_bonus = self.signal_matcher.match(_texts(signals)).astype(np.int64) @ self._signal_weights
+        score += _per_row(zone_bonus, location)
+        score += _per_row(signal_bonus, signals)
+        return np.minimum(score, self.max_score)
+
+    def _render_criteria(self) -> str:
+        lines = ["Critères LVI IMMO:"]
+        if self.price_thresholds:
+            lines.append(f"- Vente interactive = biens >{self.price_thresholds[0] // 1000}k€")
+        if self.zone_names:
+            lines.append(f"- {self.zone_label}: {', '.join(self.zone_names)}")
+        if self.signals:
+            weighted = sorted(self.signals, key=lambda s: -s[1])
+            lines.append("- Signaux prioritaires: " + ", ".join(f"{k} (+{w})" for k, w in weighted))
+        lines.extend(f"- {criterion}" for criterion in self.criteria)
+        return "\n" + "".join(f"        {line}\n" for line in lines)
+
+    def criteria_text(self) -> str:
+        """Bloc 'Critères LVI IMMO' des prompts de scoring"""
+        return self._criteria_text
+
+    def factors_text(self) -> str:
+        """Bloc 'Facteurs prédictifs' du prompt de prédiction"""
+        return self._factors_text
+
+
+class RuleSet:
+    """Fichier de règles compilé, rechargé à chaud quand il change sur disque
+
+    Un fichier invalide est signalé et ignoré: les règles précédentes restent actives.
+    """
+
+    def __init__(self, path: str = "config/lvi_rules.json", check_interval: float = 1.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._rules: Optional[CompiledRules] = None
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+        self._loaded_at: Optional[float] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def load(self) -> CompiledRules:
+        """Lit et compile le fichier (erreur si invalide)"""
+        with open(self.path, "rb") as f:
+            content = f.read()
+        mtime = os.path.getmtime(self.path)
+        rules = CompiledRules(json.loads(content), hashlib.sha1(content).hexdigest()[:12])
+        with self._lock:
+            self._rules, self._mtime, self._loaded_at, self._error = rules, mtime, time.time(), None
+        return rules
+
+    def reload(self, force: bool = False) -> bool:
+        """Recompile si le fichier a changé; False si le nouveau fichier est invalide"""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError as e:
+            return self._failed(e, None)
+        if mtime == self._mtime and not force:
+            return self._error is None
+        previous = self._rules.version if self._rules else None
+        try:
+            rules = self.load()
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            return self._failed(e, mtime)
+        if previous is not None and rules.version != previous:
+            print(f"Règles LVI rechargées: {self.path} ({rules.version})")
+        return True
+
+    def _failed(self, error: Exception, mtime: Optional[float]) -> bool:
+        if self._rules is None:
+            raise error
+        # Règles précédentes conservées; pas de nouvel essai avant la prochaine modification
+        self._mtime = mtime
+        if str(error) != self._error:
+            print(f"Erreur règles LVI {self.path}: {error}")
+        self._error = str(error)
+        return False
+
+    def current(self) -> CompiledRules:
+        """Règles actives; vérifie le fichier au plus une fois par check_interval"""
+        now = time.monotonic()
+        if self._rules is None or now - self._checked >= self.check_interval:
+            self._checked = now
+            self.reload()
+        return self._rules
+
+    def info(self) -> Dict:
+        return {
+            "path": self.path,
+            "version": self._rules.version if self._rules else None,
+            "loaded_at": self._loaded_at,
+            "error": self._error,
+        }
+
+
+lvi_rules = RuleSet(os.environ.get("LVI_RULES", "config/lvi_rules.json"))
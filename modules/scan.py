@@ -0,0 +1,216 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from modules.dedup import EntityResolver
+from modules.metrics import metrics, span
+from modules.prospect import Prospect
+
+# scorer(prospects) -> itère (index, score) au fil des appels LLM
+Scorer = Callable[[List[Prospect]], AsyncIterator[Tuple[int, int]]]
+# sink(source, prospects) -> attendu à la fin de chaque source (ex: upsert en base, hors de la boucle)
+Sink = Callable[[str, List[Prospect]], Awaitable[None]]
+
+
+class ScanSource:
+    """Source de prospects pluggable: coroutine (dicts ou Prospect) + timeout propre"""
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[List[Dict]]], timeout: float = 10.0,
+                 score: bool = False):
+        self.name = name
+        self.fetch = fetch
+        self.timeout = timeout
+        self.score = score  # prospects à scorer par l'IA
+
+
+class ScanStats:
+    """Stats du scan maintenues incrémentalement"""
+
+    def __init__(self):
+        self.total = 0
+        self.ultra_hot = 0
+        self.ai_active = 0
+        self.score_sum = 0
+
+    def add(self, prospect: Prospect):
+        score = prospect.score
+        self.total += 1
+        self.score_sum += score
+        self.ultra_hot += score >= 90
+        self.ai_active += prospect.ai_powered
+
+    def rescore(self, old: int, new: int):
+        self.score_sum += new - old
+        self.ultra_hot += (new >= 90) - (old >= 90)
+
+    def as_dict(self) -> Dict:
+        return {
+            "total": self.total,
+            "ultra_hot": self.ultra_hot,
+            "ai_active": self.ai_active,
+            "avg_score": self.score_sum // self.total if self.total else 0
+        }
+
+
+async def _produce(source: ScanSource, queue: asyncio.Queue, scorer: Optional[Scorer],
+                   provisional: Optional[Callable[[Prospect], int]], resolver: Optional[EntityResolver]):
+    # Les doublons sont fusionnés avant scoring: ils n'atteignent jamais le LLM
+    prospects = []
+    for prospect in map(Prospect.from_dict, await source.fetch()):
+        canonical, is_new = resolver.add(prospect) if resolver else (prospect, True)
+        if not is_new:
+            await queue.put(("merge", source.name, canonical))
+            continue
+        if source.score and provisional:
+            prospect.score = provisional(prospect)
+        prospects.append(prospect)
+        await queue.put(("prospect", source.name, prospect))
+    if source.score and scorer and prospects:
+        async for i, score in scorer(prospects):
+            await queue.put(("score", source.name, (prospects[i], score)))
+
+
+async def _run_source(source: ScanSource, queue: asyncio.Queue, scorer, provisional, resolver):
+    start = time.monotonic()
+    status = {"status": "ok"}
+    try:
+        with span("scan.source", source=source.name):
+            await asyncio.wait_for(_produce(source, queue, scorer, provisional, resolver), source.timeout)
+    except asyncio.TimeoutError:
+        status = {"status": "timeout"}
+    except Exception as e:
+        print(f"Erreur source {source.name}: {e}")
+        status = {"status": "error", "error": str(e)}
+    status["ms"] = round((time.monotonic() - start) * 1000, 1)
+    metrics.counter("lvi_scan_sources_total", "Sources de scan terminées", source=source.name,
+                    status=status["status"]).inc()
+    await queue.put(("source", source.name, status))
+
+
+async def stream_sources(sources: List[ScanSource], deadline: float = 20.0, scorer: Optional[Scorer] = None,
+                         provisional: Optional[Callable[[Prospect], int]] = None,
+                         sink: Optional[Sink] = None, dedup: bool = True) -> AsyncIterator[Dict]:
+    """Lance les sources en parallèle et émet les événements au fil de l'eau
+
+    prospect: nouveau prospect (score provisoire si score IA attendu)
+    update:   prospect enrichi par la fusion d'un doublon d'une autre source
+    score:    score IA qui remplace le score provisoire
+    source:   fin d'une source (status, count, ms)
+    stats:    stats mises à jour
+    """
+    start = time.monotonic()
+    queue: asyncio.Queue = asyncio.Queue()
+    resolver = EntityResolver() if dedup else None
+    tasks = [asyncio.create_task(_run_source(s, queue, scorer, provisional, resolver)) for s in sources]
+    stats = ScanStats()
+    ids: Dict[int, int] = {}
+    collected: Dict[str, List[Prospect]] = {s.name: [] for s in sources}
+    finished = set()
+
+    async def flush(name: str):
+        if sink and collected[name]:
+            try:
+                with span("scan.sink", source=name):
+                    await sink(name, collected[name])
+            except Exception as e:
+                print(f"Erreur enregistrement source {name}: {e}")
+
+    try:
+        while len(finished) < len(sources):
+            try:
+                kind, name, payload = await asyncio.wait_for(queue.get(), deadline - (time.monotonic() - start))
+            except asyncio.TimeoutError:
+                break
+            if kind == "prospect":
+                ids[id(payload)] = len(ids)
+                collected[name].append(payload)
+                stats.add(payload)
+                source = next(s for s in sources if s.name == name)
+                yield {"type": "prospect", "id": ids[id(payload)], "source": name,
+                       "provisional": source.score and scorer is not None, "prospect": payload}
+            elif kind == "score":
+                prospect, score = payload
+                stats.rescore(prospect.score, score)
+                prospect.score = score
+                yield {"type": "score", "id": ids[id(prospect)], "score": score}
+            elif kind == "merge":
+                yield {"type": "update", "id": ids[id(payload)], "prospect": payload}
+                continue
+            else:
+                finished.add(name)
+                await flush(name)
+                yield {"type": "source", "name": name, "count": len(collected[name]), **payload}
+                continue
+            yield {"type": "stats", "stats": stats.as_dict()}
+
+        for source in sources:
+            if source.name not in finished:
+                await flush(source.name)
+                yield {"type": "source", "name": source.name, "status": "deadline", "count": len(collected[source.name]),
+                       "ms": round((time.monotonic() - start) * 1000, 1)}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def run_sources(sources: List[ScanSource], deadline: float = 20.0, scorer: Optional[Scorer] = None,
+                      provisional: Optional[Callable[[Prospect], int]] = None, sink: Optional[Sink] = None,
+                      on_event: Optional[Callable[[Dict], None]] = None) -> Tuple[List[Prospect], Dict[str, Dict]]:
+    """Version non streamée: résultats partiels à l'échéance globale (événements relayés à on_event)"""
+    prospects, status = [], {}
+    async for event in stream_sources(sources, deadline, scorer, provisional, sink):
+        if on_event:
+            on_event(event)
+        if event["type"] == "prospect":
+            prospects.append(event["prospect"])
+        elif event["type"] == "source":
+            status[event["name"]] = {k: v for k, v in event.items() if k not in ("type", "name")}
+    return prospects, status
+
+
+class ScanBroadcast:
+    """Événements du scan en cours, rejoués puis diffusés en direct à chaque flux abonné
+
+    Un flux rejoint le scan déjà lancé au lieu d'en démarrer un autre (un seul crawl
+    et un seul diff de snapshot d'annonces à la fois).
+    """
+
+    def __init__(self):
+        self.events: List[Dict] = []
+        self.running = False
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def begin(self):
+        self.events = []
+        self.running = True
+
+    def publish(self, event: Dict):
+        self.events.append(event)
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    def end(self):
+        self.running = False
+
+    async def subscribe(self, flight: asyncio.Future) -> AsyncIterator[Dict]:
+        """Événements déjà émis du scan en cours puis les suivants, jusqu'à la fin de flight"""
+        queue: asyncio.Queue = asyncio.Queue()
+        replay = list(self.events) if self.running else []
+        self._subscribers.add(queue)
+        flight.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            for event in replay:
+                yield event
+            while (event := await queue.get()) is not None:
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+def aggregate(prospects: List[Prospect], limit: int = 20) -> Tuple[List[Prospect], Dict]:
+    """Étape finale: tri par score, top N et stats"""
+    with span("scan.aggregate"):
+        prospects.sort(key=lambda x: x.score, reverse=True)
+        stats = ScanStats()
+        for prospect in prospects:
+            stats.add(prospect)
+    return prospects[:limit], stats.as_dict()
@@ -0,0 +1,160 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+from modules.shared import SharedState
+
+
+class SingleFlight:
+    """Un seul calcul en vol: les appels concurrents attendent le même résultat"""
+
+    def __init__(self, compute: Callable[[], Awaitable]):
+        self.compute = compute
+        self._inflight: Optional[asyncio.Future] = None
+
+    @property
+    def running(self) -> bool:
+        return self._inflight is not None and not self._inflight.done()
+
+    def start(self) -> asyncio.Future:
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self.compute())
+            # Évite "exception never retrieved" pour les rafraîchissements en fond
+            self._inflight.add_done_callback(lambda f: f.cancelled() or f.exception())
+        return self._inflight
+
+    async def run(self):
+        # shield: un client qui se déconnecte n'annule pas le calcul partagé
+        return await asyncio.shield(self.start())
+
+
+class SnapshotScheduler:
+    """Snapshot versionné rafraîchi en tâche de fond (stale-while-revalidate)
+
+    Avec un état partagé (plusieurs workers), un seul worker calcule sous bail et publie
+    le snapshot; les autres le reprennent au lieu de relancer le calcul.
+    """
+
+    def __init__(self, compute: Callable[[], Awaitable[Dict]], interval: float = 300.0, max_age: float = 120.0,
+                 shared: Optional[SharedState] = None, key: str = "scan.snapshot", lease: float = 120.0):
+        self.interval = interval
+        self.max_age = max_age
+        self.snapshot: Optional[Dict] = None
+        self.version = 0
+        self.computed_at = 0.0
+        self.duration_ms = 0.0
+        self.shared = shared
+        self.key = key
+        self.lease = lease  # durée max d'un calcul avant qu'un autre worker le reprenne
+        self._compute = compute
+        self._flight = SingleFlight(self._refresh)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.computed_at if self.snapshot is not None else float("inf")
+
+    @property
+    def stale(self) -> bool:
+        return self.age > self.max_age
+
+    async def _refresh(self) -> Dict:
+        if self.shared is not None and not await asyncio.to_thread(self.shared.acquire, self.key, self.lease):
+            # Un autre worker calcule: on attend sa publication plutôt que de relancer le calcul
+            if await self._follow(await asyncio.to_thread(self.shared.version, self.key)):
+                return self.snapshot
+        start = time.monotonic()
+        try:
+            snapshot = await self._compute()
+            self.snapshot = snapshot
+            self.version += 1
+            self.computed_at = time.monotonic()
+            self.duration_ms = (self.computed_at - start) * 1000
+            if self.shared is not None:
+                # Publication avant libération du bail: les workers en attente reprennent ce snapshot
+                self.version = await asyncio.to_thread(
+                    self.shared.put_json, self.key, {"snapshot": snapshot, "duration_ms": self.duration_ms})
+        finally:
+            if self.shared is not None:
+                await asyncio.to_thread(self.shared.release, self.key)
+        return snapshot
+
+    async def _follow(self, after: int) -> bool:
+        """Attend une version publiée après `after`; False si le calcul nous revient (bail libre)"""
+        deadline = time.monotonic() + self.lease
+        while time.monotonic() < deadline:
+            await asyncio.sleep(0.25)
+            if await asyncio.to_thread(self.shared.version, self.key) > after and await self._sync():
+                return True
+            await asyncio.to_thread(self.shared.reap)
+            if await asyncio.to_thread(self.shared.acquire, self.key, self.lease):
+                return False
+        return False
+
+    def _published(self, version: int):
+        """Snapshot publié s'il est plus récent que version (lecture SQLite, hors boucle)"""
+        if self.shared.version(self.key) <= version:
+            return None
+        return self.shared.get_json(self.key)
+
+    async def _sync(self) -> bool:
+        """Reprend le snapshot publié par un autre worker s'il est plus récent que le nôtre"""
+        published = await asyncio.to_thread(self._published, self.version)
+        if published is None or published[1] <= self.version:
+            return False
+        value, self.version, updated = published
+        self.snapshot = value["snapshot"]
+        self.duration_ms = value["duration_ms"]
+        self.computed_at = time.monotonic() - (time.time() - updated)
+        return True
+
+    async def refresh(self) -> Dict:
+        return await self._flight.run()
+
+    def start_refresh(self) -> asyncio.Future:
+        """Recalcul en fond, ou celui déjà en cours"""
+        return self._flight.start()
+
+    async def get(self, force: bool = False) -> Dict:
+        """Snapshot courant; recalcul en fond s'il est périmé"""
+        if self.shared is not None and not force:
+            await self._sync()
+        if self.snapshot is None or force:
+            await self.refresh()
+        elif self.stale:
+            self._flight.start()
+        return self.snapshot
+
+    def info(self) -> Dict:
+        return {
+            "version": self.version,
+            "age": round(self.age, 1) if self.snapshot is not None else None,
+            "stale": self.stale,
+            "refreshing": self._flight.running,
+            "duration_ms": round(self.duration_ms, 1),
+            "shared": self.shared is not None,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                # Multi-worker: pas de recalcul si un autre worker vient de publier
+                if self.shared is not None:
+                    await self._sync()
+                if self.shared is None or self.age > self.interval / 2:
+                    await self.refresh()
+            except Exception as e:
+                print(f"Erreur rafraîchissement snapshot: {e}")
+            await asyncio.sleep(self.interval)
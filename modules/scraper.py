@@ -1,13 +1,122 @@
-import requests
-from typing import List, Dict
+import asyncio
+import json
+import os
+from html.parser import HTMLParser
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import urljoin
 from datetime import datetime
+from modules.crawler import AsyncCrawler, CrawlReport, CrawlResult, ResponseCache
+from modules.listing_snapshot import ListingSnapshot, event_to_prospect
+
+# Types schema.org reconnus comme annonces dans le JSON-LD des pages
+LISTING_TYPES = {"RealEstateListing", "Offer", "Product", "Residence", "SingleFamilyResidence",
+                 "House", "Apartment", "Accommodation"}
+
+
+class _ListingPageParser(HTMLParser):
+    """Extrait les blocs JSON-LD et les liens rel=next d'une page de résultats"""
 
-class NinjaScraperLVI:
     def __init__(self):
-        self.session = requests.Session()
-        
+        super().__init__()
+        self.json_ld: List[str] = []
+        self.next_urls: List[str] = []
+        self._in_json_ld = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "script" and attrs.get("type") == "application/ld+json":
+            self._in_json_ld = True
+            self.json_ld.append("")
+        elif tag in ("a", "link") and "next" in (attrs.get("rel") or "").split() and attrs.get("href"):
+            self.next_urls.append(attrs["href"])
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self._in_json_ld = False
+
+    def handle_data(self, data):
+        if self._in_json_ld:
+            self.json_ld[-1] += data
+
+
+def _walk_json_ld(node):
+    if isinstance(node, list):
+        for item in node:
+            yield from _walk_json_ld(item)
+    elif isinstance(node, dict):
+        types = node.get("@type")
+        types = set(types) if isinstance(types, list) else {types}
+        if types & LISTING_TYPES:
+            yield node
+        for key in ("@graph", "itemListElement", "item"):
+            if key in node:
+                yield from _walk_json_ld(node[key])
+
+
+def _listing_from_json_ld(node: Dict, page_url: str) -> Optional[Dict]:
+    offers = node.get("offers") or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    address = node.get("address") or (node.get("itemOffered") or {}).get("address") or {}
+    if isinstance(address, dict):
+        address = ", ".join(filter(None, [address.get("streetAddress"), address.get("addressLocality")]))
+    seller = offers.get("seller") or node.get("seller") or {}
+    listing_id = node.get("@id") or node.get("url") or node.get("sku")
+    if not listing_id:
+        return None
+    return {
+        "id": str(listing_id),
+        "title": node.get("name", "Annonce"),
+        "price": str(offers.get("price") or node.get("price") or ""),
+        "address": address,
+        "agency": seller.get("name") if isinstance(seller, dict) else str(seller),
+        "url": urljoin(page_url, node.get("url") or ""),
+    }
+
+
+def parse_listing_page(result: CrawlResult) -> Tuple[List[Dict], List[str]]:
+    """(annonces, pages suivantes) d'une page de résultats"""
+    parser = _ListingPageParser()
+    parser.feed(result.text)
+    listings = []
+    for block in parser.json_ld:
+        try:
+            data = json.loads(block)
+        except ValueError:
+            continue
+        for node in _walk_json_ld(data):
+            listing = _listing_from_json_ld(node, result.url)
+            if listing:
+                listings.append(listing)
+    return listings, parser.next_urls
+
+
+class NinjaScraperLVI:
+    def __init__(self, start_urls: Optional[List[str]] = None, crawler: Optional[AsyncCrawler] = None,
+                 snapshot: Optional[ListingSnapshot] = None):
+        if start_urls is None:
+            start_urls = [u for u in os.environ.get("SCRAPER_URLS", "").split(",") if u.strip()]
+        self.start_urls = start_urls
+        self.crawler = crawler or AsyncCrawler(
+            concurrency=int(os.environ.get("SCRAPER_CONCURRENCY", 4)),
+            per_host_delay=float(os.environ.get("SCRAPER_HOST_DELAY", 1.0)),
+            cache=ResponseCache(os.environ.get("SCRAPER_CACHE", "data/http_cache.db")),
+        )
+        self.snapshot = snapshot or ListingSnapshot(os.environ.get("SCRAPER_SNAPSHOT", "data/listings.db"))
+
+    async def crawl_listings(self, max_pages: int = 50) -> CrawlReport:
+        """Annonces des pages configurées (pages inchangées servies par le cache HTTP) et complétude du crawl"""
+        return await self.crawler.crawl(self.start_urls, parse_listing_page, max_pages=max_pages)
+
     async def scrape_seloger_expired(self) -> List[Dict]:
-        """Détecte mandats expirés SeLoger"""
+        """Détecte mandats expirés SeLoger (diff avec le crawl précédent: seuls les changements)"""
+        if self.start_urls:
+            report = await self.crawl_listings()
+            # Crawl incomplet (page en erreur, bloquée par robots.txt ou au-delà de max_pages):
+            # pas de disparition déduite des pages manquantes
+            events = await asyncio.to_thread(self.snapshot.diff, report.items, complete=report.complete)
+            return [event_to_prospect(e) for e in events]
+
         prospects = [
             {
                 "title": "Villa 180m² - Jacou",
@@ -19,4 +128,13 @@ class NinjaScraperLVI:
         ]
         return prospects
 
+    async def recent_expired(self, limit: int = 50) -> List[Dict]:
+        """Derniers mandats expirés détectés, sans relancer de crawl"""
+        if self.start_urls:
+            return [event_to_prospect(e) for e in await asyncio.to_thread(self.snapshot.recent_events, limit)]
+        return await self.scrape_seloger_expired()
+
+    async def aclose(self):
+        await self.crawler.aclose()
+
 ninja_scraper = NinjaScraperLVI()
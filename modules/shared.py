@@ -0,0 +1,203 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Set, Tuple
+from modules.db import connect
+from modules.prospect import dumps
+
+
+def env_shared_state() -> Optional["SharedState"]:
+    """État partagé si l'application tourne sur plusieurs workers (WEB_CONCURRENCY > 1 ou SHARED_STATE_DB)"""
+    path = os.environ.get("SHARED_STATE_DB")
+    if path or int(os.environ.get("WEB_CONCURRENCY", 1)) > 1:
+        return SharedState(path or "data/shared.db")
+    return None
+
+
+def process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedState:
+    """État partagé entre les workers d'une même machine (SQLite WAL)
+
+    - valeurs versionnées (état de santé Ollama, snapshot de scan...)
+    - baux nommés: un seul worker à la fois tient un bail (élection du worker qui sonde,
+      préchauffe ou calcule), libéré à l'expiration ou à la mort du processus détenteur
+
+    Méthodes synchrones (une écriture peut attendre le verrou tenu par un autre worker):
+    depuis du code async, les appeler via asyncio.to_thread.
+    """
+
+    def __init__(self, path: str = "data/shared.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        # Une connexion par processus (jamais héritée d'un fork)
+        if self._conn is None or self._pid != os.getpid():
+            self._conn = connect(self.path)
+            self._pid = os.getpid()
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS state (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    version INTEGER NOT NULL,
+                    updated REAL NOT NULL
+                )""")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS leases (
+                    name TEXT PRIMARY KEY,
+                    owner INTEGER NOT NULL,
+                    expires REAL NOT NULL
+                )""")
+        return self._conn
+
+    def put(self, key: str, value: bytes) -> int:
+        """Publie une valeur, retourne sa nouvelle version"""
+        with self._lock:
+            return self.conn.execute(
+                "INSERT INTO state (key, value, version, updated) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, version = state.version + 1, "
+                "updated = excluded.updated RETURNING version",
+                (key, value, time.time()),
+            ).fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[bytes, int, float]]:
+        """(valeur, version, date de publication) ou None"""
+        with self._lock:
+            return self.conn.execute("SELECT value, version, updated FROM state WHERE key = ?", (key,)).fetchone()
+
+    def version(self, key: str) -> int:
+        with self._lock:
+            row = self.conn.execute("SELECT version FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def put_json(self, key: str, value) -> int:
+        return self.put(key, dumps(value))
+
+    def get_json(self, key: str) -> Optional[Tuple[object, int, float]]:
+        row = self.get(key)
+        return (json.loads(row[0]), row[1], row[2]) if row else None
+
+    def acquire(self, name: str, ttl: float, reentrant: bool = True) -> bool:
+        """Prend (ou prolonge, si reentrant et déjà détenu par ce processus) le bail pour ttl secondes"""
+        now = time.time()
+        condition = "leases.owner = excluded.owner OR leases.expires < ?" if reentrant else "leases.expires < ?"
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+                f"ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires WHERE {condition}",
+                (name, os.getpid(), now + ttl, now),
+            )
+            return cur.rowcount == 1
+
+    def release(self, name: str):
+        with self._lock:
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, os.getpid()))
+
+    def held(self, prefix: str) -> Set[str]:
+        """Baux en cours dont le nom commence par prefix"""
+        with self._lock:
+            rows = self.conn.execute("SELECT name FROM leases WHERE name LIKE ? AND expires >= ?",
+                                     (prefix + "%", time.time())).fetchall()
+        return {name for name, in rows}
+
+    def reap(self) -> int:
+        """Libère les baux des processus morts (worker tué en plein appel)"""
+        with self._lock:
+            owners = [owner for owner, in self.conn.execute("SELECT DISTINCT owner FROM leases").fetchall()]
+            dead = [owner for owner in owners if not process_alive(owner)]
+            for owner in dead:
+                self.conn.execute("DELETE FROM leases WHERE owner = ?", (owner,))
+        return len(dead)
+
+    def info(self) -> Dict:
+        with self._lock:
+            leases = self.conn.execute("SELECT name, owner, expires FROM leases WHERE expires >= ? ORDER BY name",
+                                       (time.time(),)).fetchall()
+        return {
+            "path": self.path,
+            "pid": os.getpid(),
+            "leases": {name: {"owner": owner, "expires_in": round(expires - time.time(), 1)}
+                       for name, owner, expires in leases},
+        }
+
+
+class ProcessLimiter:
+    """Appels simultanés bornés pour l'ensemble des workers (ex: slots parallèles d'Ollama)
+
+    Chaque slot est un bail non réentrant de l'état partagé; sans état partagé (un seul worker)
+    la limite est tenue par un sémaphore local. Un slot tenu par un worker mort est récupéré.
+    """
+
+    def __init__(self, shared: Optional[SharedState], name: str, slots: int, lease: float = 300.0):
+        self.shared = shared
+        self.name = name
+        self.slots = max(1, slots)
+        self.lease = lease
+        self.stats = {"acquired": 0, "waited": 0, "wait_ms": 0.0, "running": 0}
+        self._local: Optional[asyncio.Semaphore] = None
+        self._reaped_at = 0.0
+
+    def _try_acquire(self) -> Optional[str]:
+        held = self.shared.held(self.name + ":")
+        for i in range(self.slots):
+            slot = f"{self.name}:{i}"
+            if slot not in held and self.shared.acquire(slot, self.lease, reentrant=False):
+                return slot
+        return None
+
+    async def _acquire_shared(self) -> str:
+        # Écritures SQLite hors de la boucle: un autre worker peut tenir le verrou d'écriture
+        delay = 0.005
+        while True:
+            slot = await asyncio.to_thread(self._try_acquire)
+            if slot is not None:
+                return slot
+            if time.monotonic() - self._reaped_at > 1.0:
+                self._reaped_at = time.monotonic()
+                await asyncio.to_thread(self.shared.reap)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._local is None:
+            self._local = asyncio.Semaphore(self.slots)
+        start = time.monotonic()
+        async with self._local:
+            slot = await self._acquire_shared() if self.shared is not None else None
+            waited = (time.monotonic() - start) * 1000
+            self.stats["acquired"] += 1
+            self.stats["waited"] += waited > 1
+            self.stats["wait_ms"] += waited
+            self.stats["running"] += 1
+            try:
+                yield
+            finally:
+                self.stats["running"] -= 1
+                if slot is not None:
+                    await asyncio.to_thread(self.shared.release, slot)
+
+    def info(self) -> Dict:
+        """État des slots (lecture SQLite avec état partagé: à appeler hors de la boucle d'événements)"""
+        return {
+            "slots": self.slots,
+            "shared": self.shared is not None,
+            "in_use": len(self.shared.held(self.name + ":")) if self.shared is not None else self.stats["running"],
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in self.stats.items()},
+        }
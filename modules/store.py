@@ -0,0 +1,219 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from modules.db import connect
+from modules.prospect import Prospect, dumps
+from modules.zone import normalize_text
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prospects (
+    id TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    title TEXT,
+    address TEXT,
+    price INTEGER NOT NULL DEFAULT 0,
+    score INTEGER NOT NULL DEFAULT 0,
+    insee TEXT,
+    commune TEXT,
+    ai_powered INTEGER NOT NULL DEFAULT 0,
+    data TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_prospects_score ON prospects(score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_prospects_insee ON prospects(insee, score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_prospects_source ON prospects(source, score DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_prospects_first_seen ON prospects(first_seen);
+CREATE INDEX IF NOT EXISTS idx_prospects_last_seen ON prospects(last_seen);
+
+-- Agrégats maintenus par triggers: stats en O(1)
+CREATE TABLE IF NOT EXISTS prospect_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    total INTEGER NOT NULL DEFAULT 0,
+    ultra_hot INTEGER NOT NULL DEFAULT 0,
+    ai_active INTEGER NOT NULL DEFAULT 0,
+    score_sum INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO prospect_stats (id) VALUES (1);
+
+CREATE TRIGGER IF NOT EXISTS prospects_stats_insert AFTER INSERT ON prospects BEGIN
+    UPDATE prospect_stats SET
+        total = total + 1,
+        ultra_hot = ultra_hot + (NEW.score >= 90),
+        ai_active = ai_active + NEW.ai_powered,
+        score_sum = score_sum + NEW.score
+    WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS prospects_stats_update AFTER UPDATE ON prospects BEGIN
+    UPDATE prospect_stats SET
+        ultra_hot = ultra_hot + (NEW.score >= 90) - (OLD.score >= 90),
+        ai_active = ai_active + NEW.ai_powered - OLD.ai_powered,
+        score_sum = score_sum + NEW.score - OLD.score
+    WHERE id = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS prospects_stats_delete AFTER DELETE ON prospects BEGIN
+    UPDATE prospect_stats SET
+        total = total - 1,
+        ultra_hot = ultra_hot - (OLD.score >= 90),
+        ai_active = ai_active - OLD.ai_powered,
+        score_sum = score_sum - OLD.score
+    WHERE id = 1;
+END;
+"""
+
+COLUMNS = "id, source, title, address, price, score, insee, commune, ai_powered, data, first_seen, last_seen"
+
+
+def prospect_id(prospect: Prospect) -> str:
+    """Identifiant stable: source + titre + adresse + prix normalisés"""
+    raw = "|".join([
+        normalize_text(prospect.source or ''),
+        normalize_text(prospect.title or ''),
+        normalize_text(prospect.address or ''),
+        str(prospect.price),
+    ])
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+class ProspectStore:
+    """Stockage local indexé des prospects (SQLite WAL), upserts incrémentaux"""
+
+    def __init__(self, path: str = "data/prospects.db"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = connect(self.path)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def upsert(self, prospects: List) -> int:
+        """Insère ou met à jour (first_seen conservé, last_seen rafraîchi); Prospect ou dicts"""
+        now = time.time()
+        rows = []
+        for prospect in map(Prospect.from_dict, prospects):
+            rows.append((
+                prospect_id(prospect),
+                prospect.source or '',
+                prospect.title,
+                prospect.address,
+                prospect.price,
+                prospect.score,
+                prospect.insee,
+                prospect.commune,
+                int(prospect.ai_powered),
+                dumps(prospect).decode(),
+                now,
+                now,
+            ))
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(f"""
+                INSERT INTO prospects ({COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    score = excluded.score,
+                    ai_powered = excluded.ai_powered,
+                    data = excluded.data,
+                    last_seen = excluded.last_seen
+            """, rows)
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def query(self, min_score: Optional[int] = None, insee: Optional[str] = None, source: Optional[str] = None,
+              since: Optional[float] = None, limit: int = 50, cursor: Optional[str] = None) -> Tuple[List[Prospect], Optional[str]]:
+        """Page triée par score décroissant, pagination par curseur (keyset)"""
+        where, params = [], []
+        if min_score is not None:
+            where.append("score >= ?")
+            params.append(min_score)
+        if insee:
+            where.append("insee = ?")
+            params.append(insee)
+        if source:
+            where.append("source = ?")
+            params.append(source)
+        if since is not None:
+            where.append("first_seen >= ?")
+            params.append(since)
+        if cursor:
+            score, last_id = cursor.split(":", 1)
+            where.append("(score < ? OR (score = ? AND id < ?))")
+            params += [int(score), int(score), last_id]
+        sql = f"SELECT {COLUMNS} FROM prospects"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY score DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        items = [self._row_to_prospect(row) for row in rows[:limit]]
+        next_cursor = f"{rows[limit - 1][5]}:{rows[limit - 1][0]}" if len(rows) > limit else None
+        return items, next_cursor
+
+    def pages(self, min_score: Optional[int] = None, insee: Optional[str] = None, source: Optional[str] = None,
+              since: Optional[float] = None, page_size: int = 500) -> Iterator[List[Prospect]]:
+        """Sélection complète (score décroissant) page par page: une seule page en mémoire"""
+        cursor = None
+        while True:
+            page, cursor = self.query(min_score, insee, source, since, page_size, cursor)
+            if page:
+                yield page
+            if cursor is None:
+                return
+
+    def iter(self, min_score: Optional[int] = None, page_size: int = 500) -> Iterator[Prospect]:
+        """Tous les prospects (score décroissant), lus page par page"""
+        for page in self.pages(min_score=min_score, page_size=page_size):
+            yield from page
+
+    def get_many(self, ids: List[str]) -> Dict[str, Prospect]:
+        """Prospects par identifiant (ceux absents sont ignorés)"""
+        found = {}
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT {COLUMNS} FROM prospects WHERE id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+            for row in rows:
+                found[row[0]] = self._row_to_prospect(row)
+        return found
+
+    def top(self, k: int = 20) -> List[Prospect]:
+        return self.query(limit=k)[0]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total, ultra_hot, ai_active, score_sum = self.conn.execute(
+                "SELECT total, ultra_hot, ai_active, score_sum FROM prospect_stats WHERE id = 1"
+            ).fetchone()
+        return {
+            "total": total,
+            "ultra_hot": ultra_hot,
+            "ai_active": ai_active,
+            "avg_score": score_sum // total if total else 0
+        }
+
+    def _row_to_prospect(self, row) -> Prospect:
+        data = json.loads(row[9])
+        data.update({
+            "id": row[0],
+            "insee": row[6],
+            "commune": row[7],
+            "first_seen": row[10],
+            "last_seen": row[11],
+        })
+        return Prospect.from_dict(data)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,40 @@
+import unicodedata
+from typing import Optional, Tuple
+
+# Zone géographique Emmanuel
+ZONE_EMMANUEL = {
+    "34172": "Montpellier", "34057": "Castelnau-le-Lez", "34129": "Lattes",
+    "34192": "Pérols", "34120": "Jacou", "34077": "Clapiers", 
+    "34169": "Montferrier-sur-Lez", "34255": "Saint-Gély-du-Fesc",
+    "34308": "Teyran", "34010": "Assas", "34165": "Montaud"
+}
+
+# Appellations courantes dans les annonces
+ZONE_ALIASES = {
+    "castelnau": "34057",
+    "montferrier": "34169",
+    "saint gely": "34255",
+    "antigone": "34172",
+}
+
+
+def normalize_text(text: str) -> str:
+    """Minuscules, sans accents ni tirets"""
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return " ".join(text.lower().replace("-", " ").replace(",", " ").split())
+
+
+# Noms normalisés -> code INSEE, les plus longs d'abord
+_ZONE_NAMES = sorted(
+    [(normalize_text(name), code) for code, name in ZONE_EMMANUEL.items()] + list(ZONE_ALIASES.items()),
+    key=lambda item: -len(item[0]),
+)
+
+
+def resolve_commune(address: str) -> Tuple[Optional[str], Optional[str]]:
+    """(code INSEE, commune) trouvés dans une adresse libre, sinon (None, None)"""
+    text = f" {normalize_text(address)} "
+    for name, code in _ZONE_NAMES:
+        if f" {name} " in text:
+            return code, ZONE_EMMANUEL[code]
+    return None, None
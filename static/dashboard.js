@@ -0,0 +1,225 @@
+let ultraProspects = [];
+
+async function scanUltraProspects() {
+  const btn = document.getElementById('scan-btn');
+  btn.innerHTML = '⏳ SCANNING...';
+  btn.disabled = true;
+  
+  try {
+    const response = await fetch('/api/ultra/scan/stream');
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const byId = {};
+    let buffer = '';
+    ultraProspects = [];
+    
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      const lines = buffer.split('\n');
+      buffer = lines.pop();
+      lines.filter(line => line).forEach(line => handleScanEvent(JSON.parse(line), byId));
+      scheduleRender();
+    }
+    
+    btn.innerHTML = '✅ SCAN TERMINÉ';
+    setTimeout(() => {
+      btn.innerHTML = '🔥 SCAN ULTRA';
+      btn.disabled = false;
+    }, 2000);
+    
+  } catch (error) {
+    console.error('Erreur scan:', error);
+    btn.innerHTML = '❌ ERREUR';
+    setTimeout(() => {
+      btn.innerHTML = '🔥 SCAN ULTRA';
+      btn.disabled = false;
+    }, 2000);
+  }
+}
+
+function handleScanEvent(event, byId) {
+  if (event.type === 'prospect') {
+    byId[event.id] = event.prospect;
+    ultraProspects.push(event.prospect);
+  } else if (event.type === 'update') {
+    Object.assign(byId[event.id], event.prospect);
+  } else if (event.type === 'score') {
+    byId[event.id].score = event.score;
+  } else if (event.type === 'stats') {
+    updateMetrics(event.stats);
+  }
+}
+
+let renderPending = false;
+function scheduleRender() {
+  if (renderPending) return;
+  renderPending = true;
+  requestAnimationFrame(() => {
+    renderPending = false;
+    ultraProspects.sort((a, b) => (b.score || 0) - (a.score || 0));
+    displayProspects(ultraProspects);
+  });
+}
+
+async function scrapeExpiredMandates() {
+  try {
+    const response = await fetch('/api/scraping/expired');
+    const data = await response.json();
+    
+    displayProspects(data.prospects, 'Mandats expirés détectés');
+  } catch (error) {
+    console.error('Erreur scraping:', error);
+  }
+}
+
+async function aiPredictions() {
+  try {
+    const response = await fetch('/api/ai/predictions');
+    const data = await response.json();
+    
+    displayProspects(data.predictions, 'Prédictions IA');
+  } catch (error) {
+    console.error('Erreur IA:', error);
+  }
+}
+
+function updateMetrics(stats) {
+  document.getElementById('total-prospects').textContent = stats.total || 0;
+  document.getElementById('ultra-hot').textContent = stats.ultra_hot || 0;
+  document.getElementById('ai-predictions').textContent = stats.ai_active || 0;
+  document.getElementById('avg-score').textContent = stats.avg_score || 0;
+}
+
+// Liste virtualisée: seules les lignes visibles (+ marge) existent dans le DOM, recyclées au défilement
+// et mises à jour champ par champ uniquement quand le prospect affiché a changé
+const ROW_HEIGHT = 250;
+const ROW_PITCH = ROW_HEIGHT + 24;
+const ROW_OFFSET = 8;
+const OVERSCAN = 4;
+
+const container = document.getElementById('prospects-container');
+const spacer = document.getElementById('prospects-spacer');
+const titleEl = document.getElementById('prospects-title');
+const emptyEl = document.getElementById('prospects-empty');
+
+let shownProspects = [];
+const visibleRows = new Map();
+const rowPool = [];
+
+function createRow() {
+  const el = document.createElement('div');
+  el.style.height = ROW_HEIGHT + 'px';
+  el.innerHTML = `
+    <div class="ai-badge">AI POWERED</div>
+    <div class="prospect-header">
+      <div class="prospect-title"><span class="prospect-name"></span><span></span></div>
+      <div class="prospect-details"><div></div><div></div><div></div><div></div></div>
+      <div class="prospect-meta"><span></span><span class="score"></span></div>
+    </div>`;
+  const title = el.querySelector('.prospect-title');
+  const meta = el.querySelector('.prospect-meta');
+  return {
+    el,
+    badge: el.querySelector('.ai-badge'),
+    name: title.children[0],
+    priority: title.children[1],
+    details: el.querySelector('.prospect-details').children,
+    source: meta.children[0],
+    score: meta.children[1],
+    signature: null,
+    top: null,
+  };
+}
+
+function fillRow(row, prospect) {
+  const signature = [prospect.title, prospect.address, prospect.price, prospect.type, prospect.date, prospect.reason,
+                     prospect.prediction, prospect.source, prospect.score, prospect.ai_powered].join('\u0001');
+  if (row.signature === signature) return;
+  row.signature = signature;
+
+  const priority = prospect.score >= 90 ? 'ultra-hot' : prospect.score >= 75 ? 'hot' : 'warm';
+  const priorityLabel = priority === 'ultra-hot' ? '🔥 ULTRA' : priority === 'hot' ? '🟡 CHAUD' : '🟢 TIÈDE';
+  const scoreClass = priority === 'ultra-hot' ? 'ultra' : priority === 'hot' ? 'hot' : 'warm';
+
+  row.el.className = `prospect ${priority}`;
+  row.badge.hidden = !prospect.ai_powered;
+  row.name.textContent = prospect.title || 'Prospect';
+  row.priority.textContent = priorityLabel;
+  row.details[0].textContent = `📍 ${prospect.address || 'Localisation'}`;
+  row.details[1].textContent = `💰 ${prospect.price || 'Prix'} • 🏠 ${prospect.type || 'Type'}`;
+  row.details[2].textContent = `📅 ${prospect.date || 'Récent'} • 🎯 ${prospect.reason || 'Opportunité'}`;
+  row.details[3].textContent = prospect.prediction ? `🧠 ${prospect.prediction}` : '';
+  row.source.textContent = `Source: ${prospect.source || 'Veille'}`;
+  row.score.className = `score ${scoreClass}`;
+  row.score.textContent = `${prospect.score}/100`;
+}
+
+function renderVisible() {
+  const first = Math.max(0, Math.floor(container.scrollTop / ROW_PITCH) - OVERSCAN);
+  const last = Math.min(shownProspects.length,
+                        Math.ceil((container.scrollTop + container.clientHeight) / ROW_PITCH) + OVERSCAN);
+  const wanted = new Map();
+  for (let i = first; i < last; i++) {
+    wanted.set(shownProspects[i].id ?? i, i);
+  }
+  for (const [key, row] of visibleRows) {
+    if (!wanted.has(key)) {
+      row.el.remove();
+      rowPool.push(row);
+      visibleRows.delete(key);
+    }
+  }
+  for (const [key, i] of wanted) {
+    let row = visibleRows.get(key);
+    if (!row) {
+      row = rowPool.pop() || createRow();
+      visibleRows.set(key, row);
+      spacer.appendChild(row.el);
+    }
+    fillRow(row, shownProspects[i]);
+    const top = ROW_OFFSET + i * ROW_PITCH;
+    if (row.top !== top) {
+      row.el.style.top = top + 'px';
+      row.top = top;
+    }
+  }
+}
+
+let scrollPending = false;
+function onScroll() {
+  if (scrollPending) return;
+  scrollPending = true;
+  requestAnimationFrame(() => {
+    scrollPending = false;
+    renderVisible();
+  });
+}
+container.addEventListener('scroll', onScroll, { passive: true });
+window.addEventListener('resize', onScroll);
+
+function displayProspects(prospects, title = null) {
+  if (prospects !== shownProspects) {
+    container.scrollTop = 0;
+  }
+  shownProspects = prospects;
+  titleEl.textContent = title || '';
+  titleEl.hidden = !title;
+
+  if (prospects.length === 0) {
+    emptyEl.textContent = 'Aucun prospect détecté';
+    emptyEl.hidden = false;
+    container.hidden = true;
+    return;
+  }
+  emptyEl.hidden = true;
+  container.hidden = false;
+  spacer.style.height = (2 * ROW_OFFSET + prospects.length * ROW_PITCH) + 'px';
+  renderVisible();
+}
+
+function exportUltra() {
+  // Export complet généré et streamé par le serveur (CSV correctement échappé)
+  window.location.href = '/api/prospects/export?format=csv';
+}
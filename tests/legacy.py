@@ -0,0 +1,20 @@
+"""Implémentations historiques gardées comme référence (tests d'équivalence et benchmarks)"""
+
+
+def legacy_fallback_scoring(prospect: dict) -> int:
+    """fallback_scoring tel qu'il était codé en dur (référence)"""
+    score = 50
+    try:
+        price = int(str(prospect.get('price', '0')).replace('€', '').replace(' ', ''))
+        if price > 600000: score += 25
+        elif price > 500000: score += 20
+        elif price > 400000: score += 15
+    except: pass
+    location = str(prospect.get('location', '')).lower()
+    if any(zone in location for zone in ['jacou', 'castelnau', 'antigone']):
+        score += 15
+    signals = str(prospect.get('signals', [])).lower()
+    if 'urgent' in signals: score += 20
+    if 'expiré' in signals: score += 25
+    if 'déménagement' in signals: score += 15
+    return min(100, score)
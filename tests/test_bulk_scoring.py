@@ -0,0 +1,113 @@
+"""Scoring de secours: règles compilées et moteur vectorisé identiques à l'ancien fallback_scoring
+
+Prospects aléatoires, cas limites inclus (prix illisibles ou hors int64, textes Unicode,
+signaux non listes ou non hachables), règles par défaut de config/lvi_rules.json.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.bulk_scoring import BULK_MIN_SIZE, KeywordMatcher, bulk_fallback_scores, prospect_columns
+from modules.rules import RuleSet
+from tests.legacy import legacy_fallback_scoring
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "lvi_rules.json")
+
+WORDS = ["urgent", "URGENT", "expiré", "Expiré", "expire", "déménagement", "DÉMÉNAGEMENT", "demenagement",
+         "succession", "divorce", "mutation", "İ", "ß", "urgentexpiré", "\x00", "'", "Jacou", "castelnau",
+         "CASTELNAU-LE-LEZ", "Antigone", "antigon", "montpellier", "", " "]
+
+
+def random_price(rng: random.Random):
+    kind = rng.randrange(10)
+    if kind == 0:
+        return None
+    if kind == 1:
+        return rng.randint(0, 10 ** rng.randint(1, 25))
+    if kind == 2:
+        return f"{rng.randint(100, 999)} {rng.randint(0, 999):03d} €"
+    if kind == 3:
+        return rng.choice(["", "abc", "650,000", "650000.0", "-500001", "+600001", " 400001 ", "1_000_000",
+                           "600000", "600001", "500000", "500001", "400000", "400001", "٦٠٠٠٠١",
+                           "9" * 19, "9" * 30])
+    if kind == 4:
+        return float(rng.randint(300000, 700000))
+    return str(rng.randint(100000, 900000))
+
+
+def random_text(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 4)))
+
+
+def random_signals(rng: random.Random):
+    choice = rng.randrange(6)
+    if choice == 0:
+        return [random_text(rng) for _ in range(rng.randint(0, 3))]
+    if choice == 1:
+        return random_text(rng)
+    if choice == 2:
+        return None
+    if choice == 3:
+        return tuple(random_text(rng) for _ in range(rng.randint(0, 2)))
+    if choice == 4:
+        # 1 == True mais str(1) != str(True): ces listes ne doivent pas partager de texte
+        return [rng.choice([1, True, 1.0, "urgent"]) for _ in range(rng.randint(1, 2))]
+    return [random_text(rng), [rng.choice(WORDS)]]  # non hachable
+
+
+def random_prospect(rng: random.Random) -> dict:
+    prospect = {}
+    if rng.random() < 0.9:
+        prospect["price"] = random_price(rng)
+    if rng.random() < 0.8:
+        prospect["location"] = random_text(rng) if rng.random() < 0.9 else rng.choice([None, 1, True])
+    if rng.random() < 0.8:
+        prospect["signals"] = random_signals(rng)
+    return prospect
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return RuleSet(RULES_PATH).load()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_equivalence_aleatoire(rules, seed):
+    rng = random.Random(seed)
+    prospects = [random_prospect(rng) for _ in range(4000)]
+    expected = [legacy_fallback_scoring(p) for p in prospects]
+    assert [rules.score(p) for p in prospects] == expected
+    assert bulk_fallback_scores(prospects, rules) == expected
+
+
+def test_equivalence_valeurs_repetees(rules):
+    # Taille du passage en colonnes en production, localisations et signaux très répétés
+    rng = random.Random(42)
+    pool = [random_prospect(rng) for _ in range(50)]
+    prospects = [dict(rng.choice(pool)) for _ in range(BULK_MIN_SIZE)]
+    assert bulk_fallback_scores(prospects, rules) == [legacy_fallback_scoring(p) for p in prospects]
+
+
+def test_colonnes_factorisees(rules):
+    prospects = [{"location": "Jacou", "signals": ["urgent"]}, {"location": "Jacou", "signals": ["urgent"]},
+                 {"location": "Teyran", "signals": ["Mandat expiré"]}]
+    columns = prospect_columns(prospects)
+    codes, texts = columns["location"]
+    assert codes.tolist() == [0, 0, 1]
+    assert texts == ["jacou", "teyran"]
+    assert rules.score_columns(columns["price"], columns["location"], columns["signals"]).tolist() == \
+        rules.score_columns(columns["price"], [texts[c] for c in codes],
+                            [columns["signals"][1][c] for c in columns["signals"][0]]).tolist()
+
+
+def test_bulk_vide(rules):
+    assert bulk_fallback_scores([], rules) == []
+
+
+def test_keyword_matcher_ne_deborde_pas_sur_la_ligne_suivante():
+    matcher = KeywordMatcher(["ab", ""])
+    assert matcher.match(["xa", "bx", "ab"]).tolist() == [[False, True], [False, True], [True, True]]
@@ -0,0 +1,119 @@
+"""Disjoncteur Ollama: l'essai semi-ouvert est toujours rendu (annulation, flux abandonné, erreur hors HTTP)"""
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.health import CircuitBreaker
+from modules.ollama_ai import AsyncOllamaAILVI
+from modules.rules import RuleSet
+
+RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "lvi_rules.json")
+
+
+def half_open_client(handler) -> AsyncOllamaAILVI:
+    """Client sur un transport simulé, disjoncteur ouvert dont le délai de réessai est écoulé"""
+    ai = AsyncOllamaAILVI(base_url="http://ollama.test", rules=RuleSet(RULES_PATH), reset_timeout=30.0)
+    ai._client = httpx.AsyncClient(base_url=ai.base_url, transport=httpx.MockTransport(handler))
+    ai.breaker.state = CircuitBreaker.OPEN
+    ai.breaker.opened_at = time.monotonic() - 60
+    ai.health.available = True
+    ai.health.checked_at = time.monotonic()
+    return ai
+
+
+async def hang(request):
+    await asyncio.sleep(3600)
+
+
+def test_breaker_release_trial():
+    breaker = CircuitBreaker(reset_timeout=0)
+    breaker.record_failure()
+    breaker.state, breaker.opened_at = CircuitBreaker.OPEN, 0
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.release_trial()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_generate_annule_en_semi_ouvert_rend_l_essai():
+    async def run():
+        ai = half_open_client(hang)
+        task = asyncio.create_task(ai._generate("prompt", 60))
+        await asyncio.sleep(0.05)
+        assert ai.breaker.state == CircuitBreaker.HALF_OPEN
+        assert not ai.breaker.allow_request()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert ai.breaker.allow_request()
+        await ai.aclose()
+
+    asyncio.run(run())
+
+
+def test_generate_json_invalide_ne_bloque_pas_le_disjoncteur():
+    async def run():
+        ai = half_open_client(lambda request: httpx.Response(200, content=b"pas du json"))
+        try:
+            await ai._generate("prompt", 5)
+        except ValueError:
+            pass
+        assert ai.breaker.state == CircuitBreaker.CLOSED
+        assert ai.breaker.allow_request()
+        await ai.aclose()
+
+    asyncio.run(run())
+
+
+def test_flux_abandonne_rend_l_essai():
+    async def handler(request):
+        async def body():
+            yield b'{"response": "Bonjour", "done": false}\n'
+            await asyncio.sleep(3600)
+        return httpx.Response(200, content=body())
+
+    async def run():
+        ai = half_open_client(handler)
+        stream = ai.stream_personalized_message({"name": "Test"})
+        assert await stream.__anext__() == "Bonjour"
+        await stream.aclose()
+        assert ai.breaker.allow_request()
+        await ai.aclose()
+
+    asyncio.run(run())
+
+
+def test_embed_annule_rend_l_essai():
+    async def run():
+        ai = half_open_client(hang)
+        task = asyncio.create_task(ai.embed(["texte"]))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert ai.breaker.allow_request()
+        await ai.aclose()
+
+    asyncio.run(run())
+
+
+def test_sonde_reussie_referme_un_disjoncteur_semi_ouvert():
+    async def run():
+        ai = half_open_client(lambda request: httpx.Response(200, json={"models": []}))
+        assert ai.breaker.allow_request()  # essai pris (puis perdu)
+        assert await ai._probe()
+        assert ai.breaker.state == CircuitBreaker.CLOSED
+        assert ai.breaker.allow_request()
+        await ai.aclose()
+
+    asyncio.run(run())
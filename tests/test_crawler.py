@@ -0,0 +1,124 @@
+"""Crawler contre le site d'annonces local (benchmarks/fixture_site): pagination, 304, robots.txt, politesse, cache"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fixture_site import FixtureSite
+from modules.crawler import AsyncCrawler, ResponseCache
+from modules.scraper import parse_listing_page
+
+
+@pytest.fixture
+def site():
+    site = FixtureSite(listings=200, per_page=20).start()
+    yield site
+    site.stop()
+
+
+def counting_parser():
+    calls = []
+
+    def parse(result):
+        calls.append(result.url)
+        return parse_listing_page(result)
+
+    return parse, calls
+
+
+def crawl(crawler: AsyncCrawler, urls, parse, max_pages: int = 50):
+    async def run():
+        try:
+            return await crawler.crawl(urls, parse, max_pages=max_pages)
+        finally:
+            await crawler.aclose()
+
+    return asyncio.run(run())
+
+
+def test_crawl_complet_suit_la_pagination(site, tmp_path):
+    parse, calls = counting_parser()
+    crawler = AsyncCrawler(per_host_delay=0, cache=ResponseCache(str(tmp_path / "http.db")))
+    report = crawl(crawler, [site.url], parse)
+    assert report.complete
+    assert report.pages == 10
+    assert len(report.items) == 200
+    assert len({item["url"] for item in report.items}) == 200
+    assert len(calls) == 10
+    assert crawler.stats["fetched"] == 10
+
+
+def test_requetes_conditionnelles_304_et_parsing_en_cache(site, tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.db"))
+    parse, calls = counting_parser()
+    first = crawl(AsyncCrawler(per_host_delay=0, cache=cache), [site.url], parse)
+
+    # Nouveau crawler, même cache disque: toutes les pages en 304, aucun parsing
+    calls.clear()
+    crawler = AsyncCrawler(per_host_delay=0, cache=cache)
+    second = crawl(crawler, [site.url], parse)
+    assert calls == []
+    assert crawler.stats["not_modified"] == 10 and crawler.stats["fetched"] == 0
+    assert crawler.stats["bytes_saved"] > 0 and crawler.stats["bytes_downloaded"] == 0
+    assert second.complete
+    assert sorted(i["url"] for i in second.items) == sorted(i["url"] for i in first.items)
+
+    # Une annonce modifiée: seule sa page est retéléchargée et reparsée
+    site.update("L000000", price=1)
+    crawler = AsyncCrawler(per_host_delay=0, cache=cache)
+    third = crawl(crawler, [site.url], parse)
+    assert len(calls) == 1
+    assert crawler.stats["fetched"] == 1 and crawler.stats["not_modified"] == 9
+    assert next(i for i in third.items if i["url"].endswith("/annonce/L000000"))["price"] == "1"
+
+
+def test_cache_http(tmp_path):
+    cache = ResponseCache(str(tmp_path / "http.db"))
+    assert cache.get("http://x/a") is None
+    cache.put("http://x/a", '"e1"', "Mon, 01 Jan 2024 00:00:00 GMT", b"<html>")
+    cache.put_parsed("http://x/a", [[{"id": 1}], ["http://x/b"]])
+    hit = cache.get("http://x/a")
+    assert hit == {"etag": '"e1"', "last_modified": "Mon, 01 Jan 2024 00:00:00 GMT", "body": b"<html>",
+                   "parsed": [[{"id": 1}], ["http://x/b"]]}
+    # Nouveau contenu: le parsing en cache est invalidé
+    cache.put("http://x/a", '"e2"', None, b"<html>2")
+    assert cache.get("http://x/a")["parsed"] is None
+
+
+def test_robots_txt_bloque_et_rend_le_crawl_incomplet(site):
+    admin = site.url.replace("/annonces?page=1", "/admin")
+    parse, _ = counting_parser()
+    crawler = AsyncCrawler(per_host_delay=0)
+    report = crawl(crawler, [admin, site.url], parse)
+    assert report.blocked == 1
+    assert not report.complete
+    assert len(report.items) == 200
+    assert crawler.stats["blocked"] == 1
+
+    # robots.txt ignoré sur demande: /admin est demandé (404 -> erreur)
+    crawler = AsyncCrawler(per_host_delay=0, respect_robots=False)
+    report = crawl(crawler, [admin], parse)
+    assert report.blocked == 0 and report.errors == 1
+
+
+def test_politesse_delai_par_hote(site):
+    parse, _ = counting_parser()
+    urls = [site.url.replace("page=1", f"page={n}") for n in range(1, 5)]
+    crawler = AsyncCrawler(concurrency=8, per_host_delay=0.1)
+    start = time.monotonic()
+    report = crawl(crawler, urls, parse, max_pages=4)
+    # 4 pages du même hôte, au moins 0.1s entre deux requêtes malgré la concurrence
+    assert time.monotonic() - start >= 0.3
+    assert report.pages == 4
+
+
+def test_max_pages_tronque(site):
+    parse, _ = counting_parser()
+    report = crawl(AsyncCrawler(per_host_delay=0), [site.url], parse, max_pages=3)
+    assert report.pages == 3
+    assert report.truncated == 1
+    assert not report.complete
@@ -0,0 +1,91 @@
+"""EntityResolver: fusion des doublons inter-sources, blocage commune / prix / surface"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.dedup import PRICE_TOLERANCE, EntityResolver, resolve
+from modules.prospect import Prospect
+
+
+def prospect(**fields) -> Prospect:
+    return Prospect.from_dict(fields)
+
+
+def test_doublon_inter_sources_fusionne():
+    resolver = EntityResolver()
+    first = prospect(title="Maison 120m² - Jacou", address="12 rue des Lilas, Jacou", price="450 000 €",
+                     source="SeLoger", reason="Mandat expiré")
+    duplicate = prospect(title="Villa 120m2", address="12 rue des lilas 34830 Jacou", price="455000",
+                         source="LeBonCoin", signals=["urgent"], url="https://exemple.test/annonce")
+    assert resolver.add(first) == (first, True)
+    canonical, is_new = resolver.add(duplicate)
+    assert canonical is first and not is_new
+    assert first.sources == ["SeLoger", "LeBonCoin"]
+    assert first.signals == ["urgent"]
+    assert first.url == "https://exemple.test/annonce"
+    assert (resolver.entities, resolver.merged) == (1, 1)
+
+
+def test_biens_distincts_non_fusionnes():
+    base = dict(title="Maison 120m² - Jacou", address="12 rue des Lilas, Jacou", price="450000")
+    others = [
+        dict(base, address="14 rue des Lilas, Jacou"),            # autre numéro de rue
+        dict(base, price="480000"),                                # prix hors tolérance
+        dict(base, title="Maison 150m² - Jacou"),                  # surface hors tolérance
+        dict(base, address="12 rue des Lilas, Castelnau-le-Lez"),  # autre commune (autre bloc)
+        dict(base, address="3 impasse des Oliviers, Jacou"),       # autre adresse
+    ]
+    resolver = EntityResolver()
+    assert resolver.add(prospect(**base))[1]
+    for fields in others:
+        assert resolver.add(prospect(**fields))[1], fields
+    assert resolver.merged == 0
+
+
+def test_surface_inconnue_compatible():
+    resolver = EntityResolver()
+    first = prospect(title="Maison - Jacou", address="12 rue des Lilas, Jacou", price="450000")
+    second = prospect(title="Maison 120m² - Jacou", address="12 rue des Lilas, Jacou", price="450000")
+    resolver.add(first)
+    assert not resolver.add(second)[1]
+    assert first.surface == 120.0
+
+
+def test_sans_commune_ni_prix_jamais_fusionne():
+    resolver = EntityResolver()
+    fields = dict(title="Contact", address="Adresse inconnue", price="")
+    assert resolver.add(prospect(**fields))[1]
+    assert resolver.add(prospect(**fields))[1]
+    assert resolver.add(prospect(title="Villa", address="12 rue des Lilas, Jacou"))[1]
+    assert resolver.add(prospect(title="Villa", address="12 rue des Lilas, Jacou"))[1]
+
+
+def test_blocage_equivalent_a_la_comparaison_exhaustive():
+    """Les bandes voisines couvrent toute la tolérance: aucun doublon manqué par rapport à tout comparer à tout"""
+    rng = random.Random(0)
+    communes = ["Jacou", "Castelnau-le-Lez", "Clapiers"]
+    streets = ["rue des Lilas", "avenue de l'Europe", "chemin des Vignes"]
+    prospects = [dict(title=f"Maison {rng.choice([None, rng.randint(80, 130)]) or ''}m² ",
+                      address=f"{rng.randint(1, 4)} {rng.choice(streets)}, {rng.choice(communes)}",
+                      price=str(int(400000 * (1 + PRICE_TOLERANCE) ** rng.uniform(0, 6))))
+                 for _ in range(400)]
+
+    resolver = EntityResolver()
+    for fields in prospects:
+        item = prospect(**fields)
+        entity = resolver._describe(item)
+        every = [e for block in resolver.blocks.values() for entities in block.values() for e in entities]
+        expected_new = entity is None or not any(resolver._match(entity, e) for e in every)
+        assert resolver.add(item)[1] == expected_new, fields
+    assert 0 < resolver.merged < len(prospects)
+
+
+def test_resolve_conserve_l_ordre():
+    items = [prospect(title="Maison 120m²", address="12 rue des Lilas, Jacou", price="450000", source="A"),
+             prospect(title="Appartement", address="5 place de la Comédie, Montpellier", price="300000"),
+             prospect(title="Maison 120m²", address="12 rue des Lilas, Jacou", price="451000", source="B")]
+    result = resolve(items)
+    assert result == items[:2]
+    assert result[0].sources == ["A", "B"]
@@ -0,0 +1,147 @@
+"""BoundedExecutor: ordre d'entrée conservé, concurrence bornée, backpressure, annulation"""
+import asyncio
+import itertools
+import os
+import random
+import sys
+from contextlib import aclosing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.executor import BoundedExecutor
+
+
+class Tracker:
+    """fn(item) instrumentée: appels simultanés, pic de concurrence, annulations"""
+
+    def __init__(self, delay=lambda item: 0.0):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.started = []
+        self.cancelled = 0
+
+    async def __call__(self, item):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        self.started.append(item)
+        try:
+            await asyncio.sleep(self.delay(item))
+            if item == "boom":
+                raise ValueError("échec de l'item")
+            return f"r{item}"
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        finally:
+            self.running -= 1
+
+
+def test_resultats_dans_l_ordre_d_entree_et_concurrence_bornee():
+    async def run():
+        rng = random.Random(0)
+        delays = [rng.uniform(0, 0.01) for _ in range(60)]
+        fn = Tracker(lambda i: delays[i])
+        executor = BoundedExecutor(concurrency=4)
+        rows = [row async for row in executor.map(fn, range(60))]
+        assert [(i, item, result) for i, item, result, _, _ in rows] == [(i, i, f"r{i}") for i in range(60)]
+        assert fn.peak == 4
+        assert executor.stats == {"submitted": 60, "completed": 60, "errors": 0, "cancelled": 0, "running": 0}
+
+    asyncio.run(run())
+
+
+def test_erreur_par_item_sans_interrompre_le_flux():
+    async def run():
+        executor = BoundedExecutor(concurrency=2)
+        rows = [row async for row in executor.map(Tracker(), [1, "boom", 3])]
+        assert [(result, error) for _, _, result, error, _ in rows] == [("r1", None), (None, "échec de l'item"),
+                                                                        ("r3", None)]
+        assert executor.stats["errors"] == 1 and executor.stats["completed"] == 3
+
+    asyncio.run(run())
+
+
+def test_liste_vide():
+    async def run():
+        executor = BoundedExecutor()
+        assert [row async for row in executor.map(Tracker(), [])] == []
+
+    asyncio.run(run())
+
+
+def test_backpressure_flux_infini_et_consommateur_lent():
+    async def run():
+        pulled = []
+        items = (pulled.append(n) or n for n in itertools.count())
+        executor = BoundedExecutor(concurrency=2, window=6)
+        async with aclosing(executor.map(Tracker(), items)) as rows:
+            async for i, *_ in rows:
+                # Consommateur lent: la lecture des items reste bornée par la fenêtre
+                await asyncio.sleep(0.01)
+                assert len(pulled) <= i + 1 + 6 + 1
+                if i == 20:
+                    break
+        assert len(pulled) <= 21 + 6 + 1
+
+    asyncio.run(run())
+
+
+def test_item_lent_en_tete_bloque_la_lecture_a_la_fenetre():
+    async def run():
+        pulled = []
+        items = (pulled.append(n) or n for n in range(100))
+        fn = Tracker(lambda i: 0.2 if i == 0 else 0.0)
+        executor = BoundedExecutor(concurrency=3, window=5)
+        rows = executor.map(fn, items)
+        first = asyncio.create_task(rows.__anext__())
+        await asyncio.sleep(0.1)
+        # Les résultats 1..4 attendent le réordonnancement derrière l'item 0: plus rien n'est soumis
+        assert executor.stats["submitted"] == 5
+        assert len(pulled) <= 6
+        assert (await first)[:3] == (0, 0, "r0")
+        assert len([row async for row in rows]) == 99
+
+    asyncio.run(run())
+
+
+def test_fermeture_anticipee_annule_les_appels_en_cours():
+    async def run():
+        fn = Tracker(lambda i: 0.0 if i == 0 else 10.0)
+        executor = BoundedExecutor(concurrency=3)
+        async with aclosing(executor.map(fn, range(50))) as rows:
+            async for i, *_ in rows:
+                await asyncio.sleep(0.01)
+                break
+        # Client parti: les 3 appels en vol (items 1 à 3) sont annulés, aucun n'est plus en cours
+        assert fn.cancelled == 3 and fn.running == 0
+        assert executor.stats["running"] == 0
+        assert executor.stats["cancelled"] == executor.stats["submitted"] - 1
+        started = len(fn.started)
+        await asyncio.sleep(0.05)
+        assert len(fn.started) == started
+
+    asyncio.run(run())
+
+
+def test_annulation_du_consommateur():
+    async def run():
+        fn = Tracker(lambda i: 10.0)
+        executor = BoundedExecutor(concurrency=2)
+
+        async def consume():
+            async with aclosing(executor.map(fn, range(10))) as rows:
+                return [row async for row in rows]
+
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        assert fn.running == 2
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        assert fn.cancelled == 2 and fn.running == 0
+        assert executor.stats["running"] == 0 and executor.stats["completed"] == 0
+
+    asyncio.run(run())
@@ -0,0 +1,79 @@
+"""ListingSnapshot.diff: seuls les changements entre deux crawls, disparitions seulement sur crawl complet"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.listing_snapshot import (AGENCY_CHANGED, DISAPPEARED, PRICE_DROPPED, RELISTED, ListingSnapshot,
+                                      event_to_prospect)
+
+
+def listing(listing_id: str, price: int = 500000, agency: str = "Orpi", **fields):
+    return {"id": listing_id, "title": f"Maison {listing_id}", "price": str(price), "agency": agency,
+            "address": "Jacou", "url": f"/annonce/{listing_id}", **fields}
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    return ListingSnapshot(str(tmp_path / "listings.db"))
+
+
+def kinds(events):
+    return sorted((e["event"], e["listing"]["id"]) for e in events)
+
+
+def test_premier_crawl_puis_inchange_sans_evenement(snapshot):
+    crawl = [listing("A"), listing("B")]
+    assert snapshot.diff(crawl) == []
+    assert snapshot.diff(crawl) == []
+
+
+def test_changements_detectes(snapshot):
+    snapshot.diff([listing("A"), listing("B"), listing("C"), listing("D")])
+    events = snapshot.diff([listing("A", price=450000), listing("B", agency="Century21"), listing("C")])
+    assert kinds(events) == [(AGENCY_CHANGED, "B"), (DISAPPEARED, "D"), (PRICE_DROPPED, "A")]
+    by_kind = {e["event"]: e for e in events}
+    assert by_kind[PRICE_DROPPED]["previous_price"] == 500000
+    assert by_kind[AGENCY_CHANGED]["previous_agency"] == "Orpi"
+    assert by_kind[DISAPPEARED]["listing"] == {"id": "D", "agency": "Orpi", "price": "500000",
+                                               "title": "Maison D", "address": "Jacou", "url": "/annonce/D"}
+    # Hausse de prix: pas un signal
+    assert snapshot.diff([listing("A", price=600000), listing("B", agency="Century21"), listing("C")]) == []
+
+
+def test_crawl_incomplet_sans_disparition(snapshot):
+    snapshot.diff([listing("A"), listing("B")])
+    assert snapshot.diff([listing("A")], complete=False) == []
+    # B toujours active: disparition détectée au prochain crawl complet
+    assert kinds(snapshot.diff([listing("A")])) == [(DISAPPEARED, "B")]
+    assert snapshot.diff([listing("A")]) == []
+
+
+def test_remise_en_vente(snapshot):
+    snapshot.diff([listing("A"), listing("B")])
+    snapshot.diff([listing("A")])
+    events = snapshot.diff([listing("A"), listing("B", agency="Foncia")])
+    assert kinds(events) == [(RELISTED, "B")]
+    assert events[0]["previous_agency"] == "Orpi"
+
+
+def test_historique_et_conversion_en_prospect(snapshot):
+    snapshot.diff([listing("A"), listing("B")])
+    snapshot.diff([listing("A", price=400000)])
+    recent = snapshot.recent_events(10)
+    assert kinds(recent) == [(DISAPPEARED, "B"), (PRICE_DROPPED, "A")]
+    prospects = {p["event"]: p for p in map(event_to_prospect, recent)}
+    assert prospects[DISAPPEARED]["signals"] == ["Mandat expiré"]
+    assert prospects[PRICE_DROPPED]["reason"] == "Baisse de prix (500000 → 400000)"
+
+
+def test_grand_snapshot_lot_partiel(snapshot):
+    snapshot.diff([listing(f"L{i}") for i in range(5000)])
+    # Crawl partiel de quelques annonces: seules celles-ci comptent
+    events = snapshot.diff([listing("L1", price=1), listing("NEW")], complete=False)
+    assert kinds(events) == [(PRICE_DROPPED, "L1")]
+    # Crawl complet: toutes les autres annonces connues ont disparu
+    gone = kinds(snapshot.diff([listing("L1", price=1), listing("NEW")]))
+    assert len(gone) == 4999 and {kind for kind, _ in gone} == {DISAPPEARED}
@@ -0,0 +1,65 @@
+"""Scan multi-sources: sink asynchrone attendu une fois par source, erreurs et échéance globale"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.scan import ScanSource, run_sources
+
+
+def source(name: str, items, delay: float = 0.0, timeout: float = 10.0) -> ScanSource:
+    async def fetch():
+        await asyncio.sleep(delay)
+        return items
+    return ScanSource(name, fetch, timeout=timeout)
+
+
+def test_sink_attendu_une_fois_par_source():
+    async def run():
+        received = []
+
+        async def sink(name, prospects):
+            # Le sink rend la main à la boucle (upsert via asyncio.to_thread dans l'application)
+            await asyncio.to_thread(lambda: None)
+            received.append((name, [p.title for p in prospects]))
+
+        sources = [source("a", [{"title": "A1", "address": "1 rue A, Jacou"},
+                                {"title": "A2", "address": "2 rue A, Jacou"}]),
+                   source("b", [{"title": "B1", "address": "3 rue B, Clapiers"}], delay=0.01),
+                   source("vide", [])]
+        prospects, status = await run_sources(sources, sink=sink)
+        assert sorted(received) == [("a", ["A1", "A2"]), ("b", ["B1"])]
+        assert [p.title for p in prospects] == ["A1", "A2", "B1"]
+        assert {name: s["count"] for name, s in status.items()} == {"a": 2, "b": 1, "vide": 0}
+
+    asyncio.run(run())
+
+
+def test_erreur_du_sink_n_interrompt_pas_le_scan():
+    async def run():
+        async def sink(name, prospects):
+            raise RuntimeError("base verrouillée")
+
+        prospects, status = await run_sources([source("a", [{"title": "A1"}]), source("b", [{"title": "B1"}])],
+                                              sink=sink)
+        assert len(prospects) == 2
+        assert {s["status"] for s in status.values()} == {"ok"}
+
+    asyncio.run(run())
+
+
+def test_source_hors_echeance_enregistree_avec_ses_resultats_partiels():
+    async def run():
+        received = []
+
+        async def sink(name, prospects):
+            received.append(name)
+
+        sources = [source("rapide", [{"title": "R1"}]), source("lente", [{"title": "L1"}], delay=5)]
+        prospects, status = await run_sources(sources, deadline=0.1, sink=sink)
+        assert received == ["rapide"]
+        assert status["lente"]["status"] == "deadline" and status["lente"]["count"] == 0
+        assert [p.title for p in prospects] == ["R1"]
+
+    asyncio.run(run())
@@ -0,0 +1,137 @@
+"""SingleFlight et SnapshotScheduler: un seul calcul en vol, snapshot périmé servi pendant le recalcul"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.scheduler import SingleFlight, SnapshotScheduler
+from modules.shared import SharedState
+
+
+class Computation:
+    """Calcul compté, bloqué jusqu'à release()"""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.gate.wait()
+        return {"n": self.calls}
+
+    def release(self):
+        self.gate.set()
+
+
+def test_single_flight_partage_le_calcul():
+    async def run():
+        compute = Computation()
+        flight = SingleFlight(compute)
+        calls = [asyncio.create_task(flight.run()) for _ in range(5)]
+        await asyncio.sleep(0)
+        assert flight.running
+        compute.release()
+        assert await asyncio.gather(*calls) == [{"n": 1}] * 5
+        assert compute.calls == 1
+        assert not flight.running
+        # Calcul terminé: l'appel suivant en relance un
+        assert await flight.run() == {"n": 2}
+
+    asyncio.run(run())
+
+
+def test_single_flight_annulation_d_un_appelant_n_annule_pas_le_calcul():
+    async def run():
+        compute = Computation()
+        flight = SingleFlight(compute)
+        first = asyncio.create_task(flight.run())
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert flight.running
+        second = asyncio.create_task(flight.run())
+        compute.release()
+        assert await second == {"n": 1}
+        assert compute.calls == 1
+
+    asyncio.run(run())
+
+
+def test_snapshot_perime_servi_pendant_le_recalcul():
+    async def run():
+        compute = Computation()
+        compute.release()
+        scheduler = SnapshotScheduler(compute, interval=3600, max_age=0.05)
+        assert await scheduler.get() == {"n": 1}
+        assert scheduler.version == 1
+
+        # Frais: pas de recalcul
+        assert await scheduler.get() == {"n": 1}
+        assert compute.calls == 1
+
+        # Périmé: réponse immédiate avec l'ancien snapshot, un seul recalcul en fond
+        compute.gate.clear()
+        await asyncio.sleep(0.06)
+        assert scheduler.stale
+        assert await asyncio.gather(*(scheduler.get() for _ in range(5))) == [{"n": 1}] * 5
+        await asyncio.sleep(0)
+        assert scheduler.info()["refreshing"]
+        assert compute.calls == 2
+        compute.release()
+        await scheduler.start_refresh()
+        assert await scheduler.get() == {"n": 2}
+        assert scheduler.version == 2
+
+    asyncio.run(run())
+
+
+def test_refresh_force_attend_le_nouveau_snapshot():
+    async def run():
+        compute = Computation()
+        compute.release()
+        scheduler = SnapshotScheduler(compute, interval=3600, max_age=3600)
+        await scheduler.get()
+        assert await scheduler.get(force=True) == {"n": 2}
+
+    asyncio.run(run())
+
+
+def test_erreur_de_calcul_garde_l_ancien_snapshot():
+    async def run():
+        results = [{"n": 1}, RuntimeError("source en panne")]
+
+        async def compute():
+            result = results.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        scheduler = SnapshotScheduler(compute, interval=3600, max_age=0)
+        assert await scheduler.get() == {"n": 1}
+        try:
+            await scheduler.refresh()
+        except RuntimeError:
+            pass
+        assert scheduler.snapshot == {"n": 1}
+        assert scheduler.version == 1
+
+    asyncio.run(run())
+
+
+def test_snapshot_partage_entre_workers(tmp_path):
+    async def run():
+        path = str(tmp_path / "shared.db")
+        first_compute, second_compute = Computation(), Computation()
+        first_compute.release()
+        second_compute.release()
+        first = SnapshotScheduler(first_compute, interval=3600, max_age=3600, shared=SharedState(path))
+        second = SnapshotScheduler(second_compute, interval=3600, max_age=3600, shared=SharedState(path))
+        assert await first.get() == {"n": 1}
+        # Un autre worker reprend le snapshot publié au lieu de recalculer
+        assert await second.get() == {"n": 1}
+        assert second_compute.calls == 0
+        assert second.version == first.version
+
+    asyncio.run(run())